@@ -22,6 +22,8 @@ import random
 
 import re
 
+import sqlite3
+
 import uuid
 
 import unicodedata
@@ -65,6 +67,8 @@ def _extract_component_value(
 
 NAVIGATION_REDIRECT_KEY = "_navigation_redirect"
 HOME_WIZARD_SESSION_KEY = "_home_start_wizard_state"
+HISTORY_PAGE_SIZE = 50
+HISTORY_EXPORT_PAGE_SIZE = 500
 
 
 def _request_navigation(target: str) -> None:
@@ -82,6 +86,7 @@ import export_utils
 import keyword_analysis
 import mock_exam
 import personalized_recommendation
+import reminder_dispatcher
 import scoring
 from database import RecordedAnswer
 from scoring import QuestionSpec
@@ -391,22 +396,6 @@ SELF_EVALUATION_OPTIONS = [
     ("難しかった", 0.85),
 ]
 SELF_EVALUATION_LABELS = [SELF_EVALUATION_DEFAULT] + [label for label, _ in SELF_EVALUATION_OPTIONS]
-SELF_EVALUATION_SCORE_MAP = {label: score for label, score in SELF_EVALUATION_OPTIONS}
-
-
-def _self_evaluation_score(label: Optional[str]) -> Optional[float]:
-    if not label:
-        return None
-    return SELF_EVALUATION_SCORE_MAP.get(label)
-
-
-def _self_evaluation_label(score: Optional[float]) -> str:
-    if score is None:
-        return SELF_EVALUATION_DEFAULT
-    for label, threshold in reversed(SELF_EVALUATION_OPTIONS):
-        if score >= threshold - 1e-6:
-            return label
-    return SELF_EVALUATION_OPTIONS[0][0]
 
 
 PAST_EXAM_TEMPLATE_PATH = Path(__file__).resolve().parent / "data" / "past_exam_template.csv"
@@ -9161,39 +9150,24 @@ def dashboard_page(user: Dict) -> None:
         st.session_state[HOME_WIZARD_SESSION_KEY] = _reset_home_wizard_state()
 
     try:
-        attempts = database.list_attempts(user_id=user["id"])
-    except Exception:
-        logger.exception("Failed to load attempts for dashboard view")
-        attempts = []
-
-    try:
-        stats = database.aggregate_statistics(user["id"])
-    except Exception:
-        logger.exception("Failed to aggregate statistics for dashboard")
-        stats = {}
-
-    try:
-        keyword_records = database.fetch_keyword_performance(user["id"])
-    except Exception:
-        logger.exception("Failed to load keyword performance for dashboard")
-        keyword_records = []
-
-    try:
-        question_progress = database.get_question_progress_summary(user["id"], recent_limit=5)
-    except Exception:
-        logger.exception("Failed to load question progress summary for dashboard")
-        question_progress = {
-            "recent_questions": [],
-            "total_questions": 0,
-            "studied_questions": 0,
-            "progress_ratio": 0.0,
-        }
-
-    try:
-        problem_catalog = database.list_problems()
+        snapshot = database.get_dashboard_snapshot(user["id"], recent_limit=5, missed_keyword_limit=5)
     except Exception:
-        logger.exception("Failed to load problem catalog for dashboard")
-        problem_catalog = []
+        logger.exception("Failed to load dashboard snapshot")
+        snapshot = {}
+
+    attempts = snapshot.get("attempts") or []
+    stats = snapshot.get("stats") or {}
+    keyword_records = snapshot.get("keyword_records") or []
+    missed_keyword_rows = snapshot.get("missed_keywords") or []
+    question_progress = snapshot.get("question_progress") or {
+        "recent_questions": [],
+        "total_questions": 0,
+        "studied_questions": 0,
+        "progress_ratio": 0.0,
+    }
+    problem_catalog = snapshot.get("problem_catalog") or []
+    for section, reason in (snapshot.get("errors") or {}).items():
+        logger.warning("Dashboard section %s unavailable: %s", section, reason)
 
     try:
         personalized_bundle = personalized_recommendation.generate_personalised_learning_plan(
@@ -9202,6 +9176,8 @@ def dashboard_page(user: Dict) -> None:
             problem_catalog=problem_catalog,
             keyword_resource_map=KEYWORD_RESOURCE_MAP,
             default_resources=DEFAULT_KEYWORD_RESOURCES,
+            keyword_records=snapshot.get("keyword_records"),
+            rating_records=snapshot.get("rating_records"),
         )
     except Exception:
         logger.exception("Failed to generate personalised recommendations for dashboard")
@@ -9315,14 +9291,7 @@ def dashboard_page(user: Dict) -> None:
 
     has_attempts = total_attempts > 0
 
-    keyword_miss_counter: Counter[str] = Counter()
-    for record in keyword_records:
-        keyword_hits = record.get("keyword_hits") or {}
-        for keyword, hit in keyword_hits.items():
-            if keyword and not hit:
-                keyword_miss_counter[keyword] += 1
-
-    top_missed_keywords = [keyword for keyword, _count in keyword_miss_counter.most_common(5)]
+    top_missed_keywords = [row["keyword"] for row in missed_keyword_rows]
 
     summary_cards: List[Dict[str, Any]]
     if has_attempts:
@@ -13655,19 +13624,7 @@ def _parse_iso_datetime(value: Optional[str]) -> Optional[datetime]:
 
 
 def _calculate_next_reminder(reference: datetime, interval_days: int, reminder_time: dt_time) -> datetime:
-    interval_days = max(1, interval_days)
-    minimum_dt = reference + timedelta(days=interval_days)
-    candidate = datetime.combine(minimum_dt.date(), reminder_time)
-    if candidate < minimum_dt:
-        candidate += timedelta(days=1)
-
-    now = datetime.now()
-    if candidate <= now:
-        delta = now - candidate
-        periods = int(delta.total_seconds() // (interval_days * 24 * 60 * 60)) + 1
-        candidate += timedelta(days=interval_days * periods)
-
-    return candidate
+    return reminder_dispatcher.calculate_next_reminder(reference, interval_days, reminder_time)
 
 
 def _build_schedule_preview(
@@ -13887,176 +13844,6 @@ def _prepare_dashboard_analysis_data(records: List[Dict[str, Any]]) -> Dict[str,
     }
 
 
-def _analyze_keyword_records(records: List[Dict]) -> Dict[str, Any]:
-    if not records:
-        return {
-            "answers": pd.DataFrame(),
-            "summary": pd.DataFrame(),
-            "recommendations": [],
-        }
-
-    answer_rows: List[Dict[str, Any]] = []
-    keyword_stats: Dict[str, Dict[str, Any]] = {}
-
-    for record in records:
-        keyword_hits: Dict[str, bool] = record.get("keyword_hits") or {}
-        total_keywords = len(keyword_hits)
-        if total_keywords == 0:
-            coverage_ratio = None
-        else:
-            coverage_ratio = sum(1 for hit in keyword_hits.values() if hit) / total_keywords
-        score_ratio = None
-        if record.get("max_score"):
-            try:
-                score_ratio = (record.get("score") or 0) / record["max_score"]
-            except ZeroDivisionError:
-                score_ratio = None
-
-        matched_keywords = [kw for kw, hit in keyword_hits.items() if hit]
-        missing_keywords = [kw for kw, hit in keyword_hits.items() if not hit]
-
-        duration_seconds = record.get("duration_seconds")
-        try:
-            duration_minutes = (
-                float(duration_seconds) / 60.0 if duration_seconds is not None else None
-            )
-        except (TypeError, ValueError):
-            duration_minutes = None
-
-        self_eval_label = record.get("self_evaluation") or SELF_EVALUATION_DEFAULT
-        self_eval_score = _self_evaluation_score(record.get("self_evaluation"))
-
-        answer_rows.append(
-            {
-                "attempt_id": record["attempt_id"],
-                "年度": record["year"],
-                "事例": record["case_label"],
-                "タイトル": record["title"],
-                "設問": record["prompt"],
-                "回答日時": record["submitted_at"],
-                "キーワード網羅率": coverage_ratio * 100 if coverage_ratio is not None else None,
-                "得点率": score_ratio * 100 if score_ratio is not None else None,
-                "含まれたキーワード": matched_keywords,
-                "不足キーワード": missing_keywords,
-                "モード": _mode_label(record.get("mode", "practice")),
-                "自己評価": self_eval_label,
-                "所要時間(分)": duration_minutes,
-            }
-        )
-
-        for keyword, hit in keyword_hits.items():
-            stat = keyword_stats.setdefault(
-                keyword,
-                {
-                    "attempts": 0,
-                    "hits": 0,
-                    "cases": set(),
-                    "years": set(),
-                    "examples": [],
-                    "durations": [],
-                    "self_eval_scores": [],
-                },
-            )
-            stat["attempts"] += 1
-            if hit:
-                stat["hits"] += 1
-            stat["cases"].add(record["case_label"])
-            stat["years"].add(record["year"])
-            if len(stat["examples"]) < 3:
-                stat["examples"].append(
-                    {
-                        "year": record["year"],
-                        "case_label": record["case_label"],
-                        "title": record["title"],
-                        "prompt": record["prompt"],
-                        "hit": hit,
-                    }
-                )
-            stat["durations"].append(duration_minutes)
-            if self_eval_score is not None:
-                stat["self_eval_scores"].append(self_eval_score)
-
-    answers_df = pd.DataFrame(answer_rows)
-    if not answers_df.empty:
-        answers_df["回答日時"] = pd.to_datetime(answers_df["回答日時"], errors="coerce")
-        answers_df["不足キーワード表示"] = answers_df["不足キーワード"].apply(
-            lambda keywords: "、".join(keywords) if keywords else "-"
-        )
-        answers_df["含まれたキーワード表示"] = answers_df["含まれたキーワード"].apply(
-            lambda keywords: "、".join(keywords) if keywords else "-"
-        )
-
-    summary_rows: List[Dict[str, Any]] = []
-    recommendations: List[Dict[str, Any]] = []
-
-    def _mean(values: Iterable[Optional[float]]) -> Optional[float]:
-        filtered = [float(v) for v in values if v is not None]
-        if not filtered:
-            return None
-        return sum(filtered) / len(filtered)
-
-    for keyword, stat in keyword_stats.items():
-        attempts = stat["attempts"]
-        hits = stat["hits"]
-        hit_rate = hits / attempts if attempts else 0.0
-        avg_duration = _mean(stat.get("durations", []))
-        avg_eval_score = _mean(stat.get("self_eval_scores", []))
-        summary_rows.append(
-            {
-                "キーワード": keyword,
-                "出題数": attempts,
-                "達成率(%)": hit_rate * 100,
-                "主な事例": "、".join(sorted(stat["cases"])) if stat["cases"] else "-",
-                "出題年度": "、".join(sorted(stat["years"])) if stat["years"] else "-",
-                "平均所要時間(分)": round(avg_duration, 1) if avg_duration is not None else None,
-                "自己評価傾向": _self_evaluation_label(avg_eval_score),
-            }
-        )
-
-        reasons: List[str] = []
-        needs_focus = False
-        if attempts >= 1 and hit_rate < 0.6:
-            needs_focus = True
-            reasons.append("キーワード達成率が60%未満")
-        if avg_eval_score is not None and avg_eval_score >= 0.6:
-            needs_focus = True
-            reasons.append("自己評価が不安寄り")
-        if avg_duration is not None and avg_duration >= 8:
-            needs_focus = True
-            reasons.append(f"平均所要時間 {avg_duration:.1f}分")
-
-        if needs_focus:
-            example_entry = next((ex for ex in stat["examples"] if not ex["hit"]), None)
-            if example_entry is None and stat["examples"]:
-                example_entry = stat["examples"][0]
-            example_text = None
-            if example_entry:
-                example_text = (
-                    f"{example_entry['year']} {example_entry['case_label']}『{example_entry['title']}』"
-                )
-            recommendations.append(
-                {
-                    "keyword": keyword,
-                    "hit_rate": hit_rate,
-                    "attempts": attempts,
-                    "example": example_text,
-                    "reason": " / ".join(reasons) if reasons else None,
-                }
-            )
-
-    summary_df = pd.DataFrame(summary_rows)
-    if not summary_df.empty:
-        summary_df.sort_values(["出題数", "達成率(%)"], ascending=[False, False], inplace=True)
-
-    recommendations.sort(key=lambda item: (item["hit_rate"], -item["attempts"]))
-
-    return {
-        "answers": answers_df,
-        "summary": summary_df,
-        "recommendations": recommendations,
-    }
-
-
 def _apply_uploaded_text_overrides(problem: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if not problem:
         return problem
@@ -15602,13 +15389,16 @@ def _handle_case1_submission(
     activity_summary = _summarise_question_activity(problem, submitted_at)
     answers: List[RecordedAnswer] = []
     problem_id = problem.get("id")
-    for idx, (question, spec) in enumerate(zip(problem.get("questions", []), question_specs)):
+    questions = problem.get("questions", [])
+    texts: List[str] = []
+    for idx, question in enumerate(questions):
         try:
             draft_key = _draft_key(int(problem_id), int(question.get("id")))
         except (TypeError, ValueError, AttributeError):
             draft_key = _draft_key(int(problem_id or 0), int(-(idx + 1)))
-        text = st.session_state.drafts.get(draft_key, "")
-        result = scoring.score_answer(text, spec)
+        texts.append(st.session_state.drafts.get(draft_key, ""))
+    results = scoring.score_answers_batch(texts, question_specs)
+    for question, text, result in zip(questions, texts, results):
         answers.append(
             RecordedAnswer(
                 question_id=question.get("id"),
@@ -15627,20 +15417,19 @@ def _handle_case1_submission(
     total_max = sum(question.get("max_score") for question in problem.get("questions", []))
     score_ratio = (total_score / total_max) if total_max else 0.0
 
-    attempt_id = database.record_attempt(
+    (attempt_id,) = database.record_attempts_bulk(
         user_id=user.get("id"),
-        problem_id=problem_id,
         mode="practice",
-        answers=answers,
-        started_at=started_at,
-        submitted_at=submitted_at,
-        duration_seconds=duration,
-    )
-    database.update_spaced_review(
-        user_id=user.get("id"),
-        problem_id=problem_id,
-        score_ratio=score_ratio,
-        reviewed_at=submitted_at,
+        submissions=[
+            database.AttemptSubmission(
+                problem_id=problem_id,
+                answers=answers,
+                started_at=started_at,
+                submitted_at=submitted_at,
+                duration_seconds=duration,
+                score_ratio=score_ratio,
+            )
+        ],
     )
     st.session_state.practice_started = None
     st.session_state.question_activity = {}
@@ -18178,9 +17967,12 @@ def practice_page(user: Dict) -> None:
         submitted_at = datetime.now(timezone.utc)
         activity_summary = _summarise_question_activity(problem, submitted_at)
         answers = []
-        for question, spec in zip(problem["questions"], question_specs):
-            text = st.session_state.drafts.get(_draft_key(problem["id"], question["id"]), "")
-            result = scoring.score_answer(text, spec)
+        texts = [
+            st.session_state.drafts.get(_draft_key(problem["id"], question["id"]), "")
+            for question in problem["questions"]
+        ]
+        results = scoring.score_answers_batch(texts, question_specs)
+        for question, text, result in zip(problem["questions"], texts, results):
             answers.append(
                 RecordedAnswer(
                     question_id=question["id"],
@@ -18199,20 +17991,19 @@ def practice_page(user: Dict) -> None:
         total_max = sum(question["max_score"] for question in problem["questions"])
         score_ratio = (total_score / total_max) if total_max else 0.0
 
-        attempt_id = database.record_attempt(
+        (attempt_id,) = database.record_attempts_bulk(
             user_id=user["id"],
-            problem_id=problem["id"],
             mode="practice",
-            answers=answers,
-            started_at=started_at,
-            submitted_at=submitted_at,
-            duration_seconds=duration,
-        )
-        database.update_spaced_review(
-            user_id=user["id"],
-            problem_id=problem["id"],
-            score_ratio=score_ratio,
-            reviewed_at=submitted_at,
+            submissions=[
+                database.AttemptSubmission(
+                    problem_id=problem["id"],
+                    answers=answers,
+                    started_at=started_at,
+                    submitted_at=submitted_at,
+                    duration_seconds=duration,
+                    score_ratio=score_ratio,
+                )
+            ],
         )
         st.session_state.practice_started = None
         st.session_state.question_activity = {}
@@ -19287,6 +19078,12 @@ def _render_weakness_drill_section(summaries: List[Dict[str, Any]]) -> None:
 
 
 def render_attempt_results(attempt_id: int) -> None:
+    # Review notes and self evaluations go through the group-commit queue;
+    # make the latest ones visible before reading the attempt back.
+    try:
+        database.flush_pending_writes()
+    except sqlite3.Error:
+        logger.warning("Queued writes not flushed before showing attempt %s", attempt_id, exc_info=True)
     detail = database.fetch_attempt_detail(attempt_id)
     attempt = detail["attempt"]
     answers = detail["answers"]
@@ -20803,6 +20600,12 @@ def mock_exam_page(user: Dict) -> None:
 
         if st.button("模試を提出", type="primary"):
             overall_results = []
+            pending_cases: List[Tuple[Dict[str, Any], List[Dict[str, str]]]] = []
+            submissions: List[database.AttemptSubmission] = []
+            submitted_at = datetime.now(timezone.utc)
+            scorable_problems: List[Tuple[int, Dict[str, Any]]] = []
+            mock_texts: List[str] = []
+            mock_specs: List[QuestionSpec] = []
             for problem_id in exam.problem_ids:
                 problem = _apply_uploaded_text_overrides(
                     _load_problem_detail(problem_id, signature)
@@ -20810,8 +20613,6 @@ def mock_exam_page(user: Dict) -> None:
                 if not problem:
                     st.warning("一部の問題データが取得できなかったため採点をスキップしました。")
                     continue
-                answers: List[RecordedAnswer] = []
-                case_question_results: List[Dict[str, Any]] = []
                 missing_question_numbers = [
                     idx
                     for idx, question in enumerate(problem["questions"], start=1)
@@ -20837,20 +20638,29 @@ def mock_exam_page(user: Dict) -> None:
                         icon="⚠️",
                     )
                     continue
+                scorable_problems.append((problem_id, problem))
                 for question in problem["questions"]:
-                    text = st.session_state.drafts.get(
-                        _draft_key(problem_id, question["id"]), ""
+                    mock_texts.append(
+                        st.session_state.drafts.get(_draft_key(problem_id, question["id"]), "")
                     )
-                    result = scoring.score_answer(
-                        text,
+                    mock_specs.append(
                         QuestionSpec(
                             id=question["id"],
                             prompt=question["prompt"],
                             max_score=question["max_score"],
                             model_answer=question["model_answer"],
                             keywords=question["keywords"],
-                        ),
+                        )
                     )
+
+            mock_results = iter(
+                zip(mock_texts, scoring.score_answers_batch(mock_texts, mock_specs))
+            )
+            for problem_id, problem in scorable_problems:
+                answers: List[RecordedAnswer] = []
+                case_question_results: List[Dict[str, Any]] = []
+                for question in problem["questions"]:
+                    text, result = next(mock_results)
                     answers.append(
                         RecordedAnswer(
                             question_id=question["id"],
@@ -20864,30 +20674,32 @@ def mock_exam_page(user: Dict) -> None:
                     case_question_results.append(
                         {"question": question, "answer": text, "result": result}
                     )
-                submitted_at = datetime.now(timezone.utc)
                 activity_summary = _summarise_question_activity(problem, submitted_at)
                 for answer in answers:
                     if answer.question_id in activity_summary:
                         answer.activity = activity_summary[answer.question_id]
-                attempt_id = database.record_attempt(
-                    user_id=user["id"],
-                    problem_id=problem_id,
-                    mode="mock",
-                    answers=answers,
-                    started_at=start_time,
-                    submitted_at=submitted_at,
-                    duration_seconds=int((submitted_at - start_time).total_seconds()),
-                )
                 total_score = sum(answer.score for answer in answers)
                 total_max = sum(question["max_score"] for question in problem["questions"])
                 score_ratio = (total_score / total_max) if total_max else 0.0
-                database.update_spaced_review(
-                    user_id=user["id"],
-                    problem_id=problem_id,
-                    score_ratio=score_ratio,
-                    reviewed_at=submitted_at,
+                submissions.append(
+                    database.AttemptSubmission(
+                        problem_id=problem_id,
+                        answers=answers,
+                        started_at=start_time,
+                        submitted_at=submitted_at,
+                        duration_seconds=int((submitted_at - start_time).total_seconds()),
+                        score_ratio=score_ratio,
+                    )
                 )
                 weakness_tags = _infer_case_weakness_tags(problem, case_question_results)
+                pending_cases.append((problem, weakness_tags))
+
+            attempt_ids = database.record_attempts_bulk(
+                user_id=user["id"],
+                mode="mock",
+                submissions=submissions,
+            )
+            for (problem, weakness_tags), attempt_id in zip(pending_cases, attempt_ids):
                 overall_results.append((problem, attempt_id, weakness_tags))
 
             st.session_state.mock_session = None
@@ -20973,6 +20785,184 @@ def mock_exam_page(user: Dict) -> None:
 
     return
 
+def _load_history_window(user_id: int, *, load_more: bool) -> Dict[str, Any]:
+    """Return the history and keyword records loaded for the history page.
+
+    Loaded records (newest first) and the keyset cursor after the oldest of
+    them live in session state, so "load more" fetches one page instead of
+    re-reading the whole window.  The newest page is re-read on every render
+    so fresh submissions show up.
+    """
+
+    def fetch(cursor: Optional[Tuple[str, int]]) -> Tuple[List[Dict], List[Dict], Any]:
+        history_page_data = database.fetch_learning_history_page(
+            user_id, limit=HISTORY_PAGE_SIZE, cursor=cursor, descending=True
+        )
+        keyword_page_data = database.fetch_keyword_performance_page(
+            user_id, limit=HISTORY_PAGE_SIZE, cursor=cursor, descending=True
+        )
+        return (
+            history_page_data["items"],
+            keyword_page_data["items"],
+            history_page_data["next_cursor"],
+        )
+
+    head_history, head_keywords, head_cursor = fetch(None)
+    head_ids = {record["attempt_id"] for record in head_history}
+    window = st.session_state.get("history_window")
+    if (
+        not isinstance(window, dict)
+        or window.get("user_id") != user_id
+        or (
+            head_cursor is not None
+            and window["history"]
+            and not head_ids.intersection(record["attempt_id"] for record in window["history"])
+        )
+    ):
+        window = {
+            "user_id": user_id,
+            "history": head_history,
+            "keyword": head_keywords,
+            "cursor": head_cursor,
+        }
+    else:
+        window["history"] = head_history + [
+            record for record in window["history"] if record["attempt_id"] not in head_ids
+        ]
+        window["keyword"] = head_keywords + [
+            record for record in window["keyword"] if record.get("attempt_id") not in head_ids
+        ]
+
+    if load_more and window["cursor"] is not None:
+        more_history, more_keywords, window["cursor"] = fetch(window["cursor"])
+        window["history"] = window["history"] + more_history
+        window["keyword"] = window["keyword"] + more_keywords
+
+    st.session_state["history_window"] = window
+    return window
+
+
+def _fetch_full_history(user_id: int) -> Tuple[List[Dict], List[Dict]]:
+    """Page through every submitted attempt (oldest first) for the exports."""
+
+    history_records: List[Dict] = []
+    keyword_records: List[Dict] = []
+    cursor = None
+    while True:
+        history_page_data = database.fetch_learning_history_page(
+            user_id, limit=HISTORY_EXPORT_PAGE_SIZE, cursor=cursor
+        )
+        keyword_page_data = database.fetch_keyword_performance_page(
+            user_id, limit=HISTORY_EXPORT_PAGE_SIZE, cursor=cursor
+        )
+        history_records.extend(history_page_data["items"])
+        keyword_records.extend(keyword_page_data["items"])
+        cursor = history_page_data["next_cursor"]
+        if cursor is None:
+            return history_records, keyword_records
+
+
+def _history_records_frame(history_records: List[Dict]) -> pd.DataFrame:
+    history_df = pd.DataFrame(history_records)
+    if not history_df.empty:
+        history_df["日付"] = pd.to_datetime(history_df["日付"], errors="coerce")
+        history_df.sort_values("日付", inplace=True)
+        for column in ("得点", "満点", "平均得点", "設問数", "学習時間(分)"):
+            history_df[column] = pd.to_numeric(history_df[column], errors="coerce")
+        history_df["得点率(%)"] = history_df.apply(
+            lambda row: round(row["得点"] / row["満点"] * 100, 1)
+            if pd.notnull(row["得点"]) and pd.notnull(row["満点"]) and row["満点"]
+            else None,
+            axis=1,
+        )
+    return history_df
+
+
+def _filter_history_view(
+    history_df: pd.DataFrame,
+    keyword_records: List[Dict],
+    *,
+    years: Sequence[str],
+    cases: Sequence[str],
+    tags: Sequence[str],
+    period_start: Optional[datetime],
+    period_end: Optional[datetime],
+) -> Tuple[pd.DataFrame, List[Dict]]:
+    """Apply the history page filters; a ``None`` period bound is open-ended."""
+
+    filtered_history = history_df.copy()
+    if years:
+        filtered_history = filtered_history[
+            filtered_history["年度"].astype(str).isin(years)
+        ]
+    if cases:
+        filtered_history = filtered_history[
+            filtered_history["事例"].astype(str).isin(cases)
+        ]
+
+    attempt_tag_map: Dict[int, Set[str]] = {}
+    for record in keyword_records:
+        attempt_id = record.get("attempt_id")
+        if attempt_id is None:
+            continue
+        attempt_tags = attempt_tag_map.setdefault(int(attempt_id), set())
+        for keyword in (record.get("keyword_hits") or {}).keys():
+            if keyword:
+                attempt_tags.add(keyword)
+        for attr in ("themes", "tendencies", "topics", "skill_tags"):
+            values = record.get(attr)
+            if isinstance(values, list):
+                attempt_tags.update(tag for tag in values if tag)
+
+    if tags:
+        allowed_ids = {
+            attempt_id
+            for attempt_id, attempt_tags in attempt_tag_map.items()
+            if set(tags).issubset(attempt_tags)
+        }
+        filtered_history = filtered_history[
+            filtered_history["attempt_id"].isin(allowed_ids)
+        ]
+
+    if not filtered_history.empty:
+        if period_start is not None:
+            filtered_history = filtered_history[
+                filtered_history["日付"] >= pd.to_datetime(period_start)
+            ]
+        if period_end is not None:
+            filtered_history = filtered_history[
+                filtered_history["日付"] <= pd.to_datetime(period_end)
+            ]
+
+    filtered_keyword_records = [
+        record
+        for record in keyword_records
+        if not tags
+        or set(tags).issubset(
+            attempt_tag_map.get(int(record.get("attempt_id") or 0), set())
+        )
+    ]
+    return filtered_history, filtered_keyword_records
+
+
+def _history_export_files(
+    filtered_history: pd.DataFrame, filtered_keyword_records: List[Dict]
+) -> Optional[Tuple[bytes, Optional[bytes]]]:
+    """Return the score and answer CSVs, or ``None`` when there is nothing to export."""
+
+    if filtered_history.empty:
+        return None
+    export_history = _prepare_history_log_export(filtered_history)
+    answer_export = _prepare_answer_log_export(filtered_keyword_records)
+    score_csv = export_history.to_csv(index=False).encode("utf-8-sig")
+    answer_csv = (
+        answer_export.to_csv(index=False).encode("utf-8-sig")
+        if not answer_export.empty
+        else None
+    )
+    return score_csv, answer_csv
+
+
 def history_page(user: Dict) -> None:
     """Render the revamped learning history experience."""
 
@@ -20988,18 +20978,35 @@ def history_page(user: Dict) -> None:
 
     data_errors: Dict[str, str] = {}
 
+    load_more = bool(st.session_state.pop("history_load_more_requested", False))
+    history_has_more = False
     try:
-        history_records = database.fetch_learning_history(user["id"])
+        history_window = _load_history_window(user["id"], load_more=load_more)
+        history_records = list(reversed(history_window["history"]))
+        keyword_records = list(reversed(history_window["keyword"]))
+        history_has_more = history_window["cursor"] is not None
     except Exception as exc:  # pragma: no cover - defensive guard
         history_records = []
-        data_errors["history"] = str(exc)
-
-    try:
-        keyword_records = database.fetch_keyword_performance(user["id"])
-    except Exception as exc:  # pragma: no cover
         keyword_records = []
+        data_errors["history"] = str(exc)
         data_errors["keyword"] = str(exc)
 
+    if history_has_more:
+        try:
+            total_attempts = database.count_attempts(user["id"])
+        except Exception:  # pragma: no cover
+            total_attempts = None
+        loaded_label = f"直近{len(history_records)}件の演習を表示しています"
+        if total_attempts:
+            loaded_label = f"全{total_attempts}件中、直近{len(history_records)}件の演習を表示しています"
+        notice_col, more_col = st.columns([3, 1])
+        notice_col.caption(
+            loaded_label + "。グラフ・分析は表示中の範囲が対象です（エクスポートは全期間）。"
+        )
+        if more_col.button("過去の履歴をさらに読み込む", key="history_load_more"):
+            st.session_state["history_load_more_requested"] = True
+            st.rerun()
+
     try:
         question_history_summary = database.fetch_user_question_history_summary(user["id"]) or []
     except Exception as exc:  # pragma: no cover
@@ -21012,18 +21019,7 @@ def history_page(user: Dict) -> None:
         global_question_metrics = {}
         data_errors["master"] = str(exc)
 
-    history_df = pd.DataFrame(history_records)
-    if not history_df.empty:
-        history_df["日付"] = pd.to_datetime(history_df["日付"], errors="coerce")
-        history_df.sort_values("日付", inplace=True)
-        for column in ("得点", "満点", "平均得点", "設問数", "学習時間(分)"):
-            history_df[column] = pd.to_numeric(history_df[column], errors="coerce")
-        history_df["得点率(%)"] = history_df.apply(
-            lambda row: round(row["得点"] / row["満点"] * 100, 1)
-            if pd.notnull(row["得点"]) and pd.notnull(row["満点"]) and row["満点"]
-            else None,
-            axis=1,
-        )
+    history_df = _history_records_frame(history_records)
 
     available_years = (
         history_df["年度"].dropna().astype(str).sort_values().unique().tolist()
@@ -21156,54 +21152,15 @@ def history_page(user: Dict) -> None:
     )
     st.markdown(f"<div style='margin-bottom:0.5rem;'>{badges_html}</div>", unsafe_allow_html=True)
 
-    filtered_history = history_df.copy()
-    if selected_years:
-        filtered_history = filtered_history[
-            filtered_history["年度"].astype(str).isin(selected_years)
-        ]
-    if selected_cases:
-        filtered_history = filtered_history[
-            filtered_history["事例"].astype(str).isin(selected_cases)
-        ]
-
-    attempt_tag_map: Dict[int, Set[str]] = {}
-    for record in keyword_records:
-        attempt_id = record.get("attempt_id")
-        if attempt_id is None:
-            continue
-        attempt_tags = attempt_tag_map.setdefault(int(attempt_id), set())
-        for keyword in (record.get("keyword_hits") or {}).keys():
-            if keyword:
-                attempt_tags.add(keyword)
-        for attr in ("themes", "tendencies", "topics", "skill_tags"):
-            values = record.get(attr)
-            if isinstance(values, list):
-                attempt_tags.update(tag for tag in values if tag)
-
-    if selected_tags:
-        allowed_ids = {
-            attempt_id
-            for attempt_id, tags in attempt_tag_map.items()
-            if set(selected_tags).issubset(tags)
-        }
-        filtered_history = filtered_history[
-            filtered_history["attempt_id"].isin(allowed_ids)
-        ]
-
-    if not filtered_history.empty:
-        filtered_history = filtered_history[
-            (filtered_history["日付"] >= pd.to_datetime(range_start))
-            & (filtered_history["日付"] <= pd.to_datetime(range_end))
-        ]
-
-    filtered_keyword_records = [
-        record
-        for record in keyword_records
-        if not selected_tags
-        or set(selected_tags).issubset(
-            attempt_tag_map.get(int(record.get("attempt_id") or 0), set())
-        )
-    ]
+    filtered_history, filtered_keyword_records = _filter_history_view(
+        history_df,
+        keyword_records,
+        years=selected_years,
+        cases=selected_cases,
+        tags=selected_tags,
+        period_start=range_start,
+        period_end=range_end,
+    )
 
     tabs = st.tabs([
         "一覧",
@@ -21703,17 +21660,57 @@ def history_page(user: Dict) -> None:
 
     with tabs[5]:
         st.write("エクスポート (Alt+6) でCSV/PDFを取得します。")
-        if filtered_history.empty:
-            st.info("出力対象のデータがありません。")
+        export_files: Optional[Tuple[bytes, Optional[bytes]]] = None
+        export_ready = not history_has_more
+        if not history_has_more:
+            export_files = _history_export_files(filtered_history, filtered_keyword_records)
         else:
-            export_history = _prepare_history_log_export(filtered_history)
-            answer_export = _prepare_answer_log_export(filtered_keyword_records)
-            score_csv = export_history.to_csv(index=False).encode("utf-8-sig")
-            answer_csv = (
-                answer_export.to_csv(index=False).encode("utf-8-sig")
-                if not answer_export.empty
-                else None
+            # The slider only spans the loaded window, so a bound left at its
+            # edge means "no limit" for the full-history export.
+            export_period = (
+                None if range_start <= period_min else range_start,
+                None if range_end >= period_max else range_end,
+            )
+            export_signature = (
+                user["id"],
+                history_records[-1]["attempt_id"] if history_records else None,
+                tuple(selected_years),
+                tuple(selected_cases),
+                tuple(selected_tags),
+                export_period,
             )
+            full_export = st.session_state.get("history_full_export")
+            if isinstance(full_export, dict) and full_export.get("signature") == export_signature:
+                export_files = full_export["files"]
+                export_ready = True
+            else:
+                st.caption("表示中の範囲に関わらず、全期間の履歴からCSVを作成します。")
+                if st.button("全期間のCSVを作成", key="history_build_full_export"):
+                    try:
+                        all_history, all_keywords = _fetch_full_history(user["id"])
+                    except Exception as exc:  # pragma: no cover
+                        st.warning(f"全期間の履歴の取得に失敗しました: {exc}")
+                    else:
+                        export_files = _history_export_files(
+                            *_filter_history_view(
+                                _history_records_frame(all_history),
+                                all_keywords,
+                                years=selected_years,
+                                cases=selected_cases,
+                                tags=selected_tags,
+                                period_start=export_period[0],
+                                period_end=export_period[1],
+                            )
+                        )
+                        st.session_state["history_full_export"] = {
+                            "signature": export_signature,
+                            "files": export_files,
+                        }
+                        export_ready = True
+        if export_ready and export_files is None:
+            st.info("出力対象のデータがありません。")
+        elif export_files is not None:
+            score_csv, answer_csv = export_files
             archive_bytes = _build_learning_log_archive(score_csv, answer_csv)
             col_a, col_b, col_c = st.columns(3)
             with col_a:
@@ -21738,6 +21735,7 @@ def history_page(user: Dict) -> None:
                     file_name="learning_history_bundle.zip",
                     mime="application/zip",
                 )
+        if not filtered_history.empty:
             selected_attempt_id = st.session_state.get("history_selected_attempt")
             if selected_attempt_id:
                 try:
@@ -21846,7 +21844,7 @@ def settings_page(user: Dict) -> None:
         with action_col:
             if user["plan"] == "free":
                 if st.button("有料プランにアップグレードする"):
-                    database.update_user_plan(user_id=user["id"], plan="premium")
+                    database.update_user_plan(user_id=user["id"], plan="premium", sync=True)
                     st.session_state.user = dict(database.get_user_by_email(user["email"]))
                     st.success("プレミアムプランに変更しました。")
             else:
@@ -22241,12 +22239,59 @@ def settings_page(user: Dict) -> None:
             st.session_state.ui_theme = selected_theme
             st.success(f"テーマを『{selected_theme}』に変更しました。")
 
+        score_cache_stats = scoring.get_score_cache_stats()
+        st.caption(
+            f"採点キャッシュ: ヒット率 {score_cache_stats['hit_rate']:.1%}"
+            f"（メモリ {score_cache_stats['memory_hits']}件 / 共有 {score_cache_stats['sqlite_hits']}件 / "
+            f"未ヒット {score_cache_stats['misses']}件）"
+        )
+
+        query_metrics = database.get_query_metrics()
+        if query_metrics["enabled"]:
+            st.subheader("データベース計測")
+            function_rows = [
+                {
+                    "関数": name,
+                    "呼び出し回数": data["count"],
+                    "平均(ms)": data["mean_ms"],
+                    "最大(ms)": data["max_ms"],
+                    "行数": data["rows"],
+                }
+                for name, data in query_metrics["functions"].items()
+            ]
+            if function_rows:
+                st.dataframe(
+                    pd.DataFrame(function_rows).sort_values("平均(ms)", ascending=False),
+                    width="stretch",
+                    hide_index=True,
+                )
+            st.caption(
+                f"{query_metrics['slow_threshold_ms']:.0f}ms を超えたクエリ: "
+                f"{query_metrics['slow_query_count']}件（実行計画付きでスロークエリログに記録されます）"
+            )
+            json_col, prom_col = st.columns(2)
+            with json_col:
+                st.download_button(
+                    "計測結果をJSONでダウンロード",
+                    data=json.dumps(query_metrics, ensure_ascii=False, indent=2),
+                    file_name="db_metrics.json",
+                    mime="application/json",
+                )
+            with prom_col:
+                st.download_button(
+                    "Prometheus形式でダウンロード",
+                    data=database.render_query_metrics_prometheus(),
+                    file_name="db_metrics.prom",
+                    mime="text/plain",
+                )
+
 
 logger = logging.getLogger(__name__)
 
 
 if __name__ == "__main__":
     database.initialize_database()
+    scoring.configure_score_cache(sqlite_path=database.DB_PATH.with_name("score_cache.db"))
     _init_session_state()
     try:
         main_view()
@@ -7,54 +7,259 @@ scores.
 """
 from __future__ import annotations
 
+import atexit
+import hashlib
+import inspect
 import json
 import logging
+import os
+import pickle
 import re
 import sqlite3
+import tempfile
+import time
 import zlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
 from datetime import date as dt_date, datetime, time as dt_time, timedelta, timezone
-from functools import lru_cache
+from functools import lru_cache, wraps
 from pathlib import Path
-from threading import Lock
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from threading import Condition, Lock, Thread, local
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:  # POSIX advisory locks for the cross-process initialisation lock.
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
 
 DB_PATH = Path("data/app.db")
 SEED_PATH = Path("data/seed_problems.json")
 
+# Connection tuning. WAL lets readers proceed while a submission is being
+# written; busy_timeout makes writers wait instead of failing immediately with
+# "database is locked".
+CONNECTION_BUSY_TIMEOUT_MS = 5000
+CONNECTION_CACHE_SIZE_KIB = 16384
+CONNECTION_MMAP_SIZE_BYTES = 128 * 1024 * 1024
+CONNECTION_STATEMENT_CACHE_SIZE = 256
+CONNECTION_POOL_MAX_IDLE = 8
+
+# Upper bound on memoised problem lookups (problem detail, by year/case and the
+# list helpers).  Least recently used entries are evicted beyond this.
+PROBLEM_CACHE_MAX_ENTRIES = 256
+
+# get_dashboard_snapshot gives its sections this long in total to load before
+# the page renders without the remaining ones.
+DASHBOARD_SECTION_TIMEOUT_SECONDS = 5.0
+
+# SQLite virtual machine steps between deadline checks while a dashboard
+# section query runs.
+DASHBOARD_PROGRESS_CHECK_STEPS = 1000
+
+# Small single-row updates (review notes, self evaluations, plan and reminder
+# bookkeeping) are queued and committed together by a writer thread after
+# this window; repeated writes to the same row within it are coalesced.
+# Writes hitting a locked database are retried with exponential backoff (up
+# to WRITE_QUEUE_RETRY_MAX_DELAY_SECONDS between tries) and dropped after
+# WRITE_QUEUE_MAX_ATTEMPTS tries.
+WRITE_QUEUE_FLUSH_INTERVAL_SECONDS = 0.05
+WRITE_QUEUE_MAX_ATTEMPTS = 8
+WRITE_QUEUE_RETRY_MAX_DELAY_SECONDS = 5.0
+
+# compact_attempt_activity archives edit histories of attempts submitted more
+# than this many days ago.
+ACTIVITY_ARCHIVE_AFTER_DAYS = 30
+
+# Heavy cross-user analytics read from a copy of the database made with the
+# SQLite backup API instead of the live file.  The copy is rebuilt in the
+# background once it is older than ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS; each
+# function can be switched here or per call with the snapshot argument.
+# Per-learner queries stay on the live database so fresh answers show up.
+ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS = 60.0
+ANALYTICS_SNAPSHOT_FUNCTIONS: Dict[str, bool] = {
+    "fetch_all_attempt_scores": True,
+    "fetch_question_master_stats": True,
+    "fetch_user_question_history_summary": False,
+}
+
+# Opt-in query instrumentation (also switchable at runtime with
+# enable_query_instrumentation).  When enabled every public function and SQL
+# statement is timed; statements slower than SLOW_QUERY_THRESHOLD_MS are
+# appended with their EXPLAIN QUERY PLAN to SLOW_QUERY_LOG_PATH.
+QUERY_INSTRUMENTATION_ENABLED = os.environ.get("SHINDAN_DB_INSTRUMENTATION", "").lower() in {
+    "1",
+    "true",
+    "yes",
+}
+SLOW_QUERY_THRESHOLD_MS = 200.0
+SLOW_QUERY_LOG_PATH = Path("data/slow_queries.jsonl")
+QUERY_METRICS_MAX_STATEMENTS = 500
+
+# Bump when the structure stored in the compiled seed cache changes.
+_SEED_CACHE_FORMAT = 2
+
+# Bump when the seeder changes how a problem maps onto rows so that every
+# problem is rewritten once on the next start.
+_SEED_STATE_FORMAT = 1
+
 _INITIALIZE_LOCK = Lock()
 _DATABASE_INITIALISED = False
 
+# maintenance_state key recording the schema version and seed file digest the
+# database was last initialised with; processes that find a matching marker
+# skip migrations and seeding altogether.
+_INIT_MARKER_KEY = "initialized_marker"
+
+# maintenance_state key holding the progress of an interrupted re-scoring run.
+_RESCORING_CHECKPOINT_KEY = "rescoring_checkpoint"
+
 
 logger = logging.getLogger(__name__)
 
 
-_SEED_ONLY_ID_LOOKUP: Dict[int, Tuple[str, str]] = {}
+class _ProblemCache:
+    """Bounded LRU cache for problem lookups with per-problem invalidation.
+
+    Entries are keyed by ``(kind, key)``.  Each invalidation bumps
+    ``generation`` so a load that raced with it is returned to its caller but
+    not stored.  Before every lookup the cache compares the seed file
+    signature it last saw; when the seed changed only the problems whose seed
+    entry differs (plus the list helpers) are dropped, and switching
+    :data:`DB_PATH` drops everything.
+    """
+
+    _LIST_KINDS = ("problems", "years", "cases")
+
+    def __init__(self, *, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._entries: "OrderedDict[Tuple[str, Any], Any]" = OrderedDict()
+        self._generation = 0
+        self._db_path: Optional[str] = None
+        self._seed_signature: Optional[float] = None
+        self._seed_hashes: Dict[Tuple[str, str], str] = {}
+        self._stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get_or_load(self, kind: str, key: Any, loader: Callable[[], Any]) -> Any:
+        self._sync_sources()
+        cache_key = (kind, key)
+        with self._lock:
+            if cache_key in self._entries:
+                self._entries.move_to_end(cache_key)
+                self._stats["hits"] += 1
+                return self._entries[cache_key]
+            self._stats["misses"] += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[cache_key] = value
+                self._entries.move_to_end(cache_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return value
+
+    def _sync_sources(self) -> None:
+        db_path = str(DB_PATH)
+        signature = _seed_file_signature()
+        if db_path == self._db_path and signature == self._seed_signature:
+            return
+
+        seed_hashes = {
+            key: _problem_seed_hash([seed_problem])
+            for key, seed_problem in _load_seed_problem_lookup(signature).items()
+        }
+        with self._lock:
+            path_changed = db_path != self._db_path
+            previous_hashes = self._seed_hashes
+            self._db_path = db_path
+            self._seed_signature = signature
+            self._seed_hashes = seed_hashes
+
+        if path_changed:
+            self.invalidate_all()
+            return
+        changed = {
+            key
+            for key in set(previous_hashes) | set(seed_hashes)
+            if previous_hashes.get(key) != seed_hashes.get(key)
+        }
+        if changed:
+            self.invalidate_problems(changed)
+
+    def invalidate_problems(self, keys: Iterable[Tuple[str, str]]) -> int:
+        """Drop cached entries for the given ``(year, case_label)`` problems.
+
+        List entries and cached misses are dropped as well because either may
+        change when a problem does.  Returns the number of entries removed.
+        """
+
+        keys = set(keys)
+        if not keys:
+            return 0
+        years = {year for year, _case in keys}
+        with self._lock:
+            stale = []
+            for cache_key, value in self._entries.items():
+                kind, key = cache_key
+                if kind in self._LIST_KINDS:
+                    if kind != "cases" or key in years:
+                        stale.append(cache_key)
+                elif value is None or (value.get("year"), value.get("case_label")) in keys:
+                    stale.append(cache_key)
+            for cache_key in stale:
+                del self._entries[cache_key]
+            self._generation += 1
+            self._stats["invalidations"] += 1
+        return len(stale)
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot: Dict[str, Any] = dict(self._stats)
+            snapshot.update(
+                {
+                    "entries": len(self._entries),
+                    "max_entries": self.max_entries,
+                    "generation": self._generation,
+                }
+            )
+        return snapshot
+
+
+_PROBLEM_CACHE = _ProblemCache(max_entries=PROBLEM_CACHE_MAX_ENTRIES)
 
 
 def _clear_problem_caches() -> None:
-    """Reset memoized problem lookups after mutations or seeding."""
+    """Reset every memoized problem lookup."""
 
-    _SEED_ONLY_ID_LOOKUP.clear()
+    _PROBLEM_CACHE.invalidate_all()
+    _load_seed_index_cached.cache_clear()
 
-    for func_name in (
-        "list_problems",
-        "list_problem_years",
-        "list_problem_cases",
-        "fetch_problem",
-        "fetch_problem_by_year_case",
-    ):
-        func = globals().get(func_name)
-        if func is not None and hasattr(func, "cache_clear"):
-            func.cache_clear()  # type: ignore[call-arg]
-
-    for helper in (
-        _list_problems_impl,
-        _fetch_problem_impl,
-        _fetch_problem_by_year_case_impl,
-        _load_seed_problem_lookup_cached,
-    ):
-        if hasattr(helper, "cache_clear"):
-            helper.cache_clear()  # type: ignore[call-arg]
+
+def get_problem_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss/eviction counters of the problem cache for diagnostics."""
+
+    return _PROBLEM_CACHE.stats()
 
 
 def _seed_file_signature() -> float:
@@ -66,13 +271,9 @@ def _seed_file_signature() -> float:
         return 0.0
 
 
-def _load_seed_file_payload() -> Optional[Dict[str, Any]]:
-    """Return the normalised seed payload from disk if available."""
-
-    if not SEED_PATH.exists():
-        return None
+def _parse_seed_text(raw_text: str) -> Optional[Dict[str, Any]]:
+    """Parse seed JSON (allowing ``//`` comment lines) into the canonical shape."""
 
-    raw_text = SEED_PATH.read_text(encoding="utf-8")
     cleaned_lines: List[str] = []
     for line in raw_text.splitlines():
         stripped = line.lstrip()
@@ -93,18 +294,15 @@ def _load_seed_file_payload() -> Optional[Dict[str, Any]]:
     return _normalise_seed_payload(payload)
 
 
-@lru_cache(maxsize=1)
-def _load_seed_problem_lookup_cached(signature: float) -> Dict[Tuple[str, str], Dict[str, Any]]:
+def _build_seed_problem_lookup(payload: Optional[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
     """Return seed problem data keyed by ``(year, case_label)``."""
 
-    payload = _load_seed_file_payload()
     if not payload:
         return {}
 
-    normalised = payload
     lookup: Dict[Tuple[str, str], Dict[str, Any]] = {}
 
-    for problem in normalised.get("problems", []):
+    for problem in payload.get("problems", []):
         year = problem.get("year")
         case_label = problem.get("case") or problem.get("case_label")
         if not (isinstance(year, str) and isinstance(case_label, str)):
@@ -139,12 +337,155 @@ def _load_seed_problem_lookup_cached(signature: float) -> Dict[Tuple[str, str],
     return lookup
 
 
-def _load_seed_problem_lookup(signature: Optional[float] = None) -> Dict[Tuple[str, str], Dict[str, Any]]:
-    """Convenience wrapper that injects the current seed file signature."""
+def _seed_cache_path() -> Path:
+    """Return the location of the compiled seed cache next to the seed file."""
+
+    return SEED_PATH.with_name(SEED_PATH.name + ".cache")
+
+
+def _read_seed_cache(stat_result: os.stat_result) -> Tuple[Optional[Dict[str, Any]], Optional[bytes]]:
+    """Return ``(cache_entry, raw_seed_bytes)`` for the current seed file.
+
+    The cache is trusted as-is when its recorded mtime and size match the
+    seed file.  Otherwise the seed bytes are read and hashed; a matching
+    content hash still validates the cache (e.g. after a ``touch``).  The raw
+    bytes are returned whenever they had to be read so callers do not read
+    the file twice.
+    """
+
+    cache_path = _seed_cache_path()
+    try:
+        with cache_path.open("rb") as handle:
+            entry = pickle.load(handle)
+    except FileNotFoundError:
+        return None, None
+    except Exception as exc:  # corrupt or incompatible artefact: rebuild
+        logger.info("Ignoring unreadable seed cache %s: %s", cache_path, exc)
+        return None, None
+
+    if not isinstance(entry, dict) or entry.get("format") != _SEED_CACHE_FORMAT:
+        return None, None
+
+    if entry.get("mtime_ns") == stat_result.st_mtime_ns and entry.get("size") == stat_result.st_size:
+        return entry, None
+
+    raw_bytes = SEED_PATH.read_bytes()
+    if entry.get("sha1") == hashlib.sha1(raw_bytes).hexdigest():
+        entry["mtime_ns"] = stat_result.st_mtime_ns
+        entry["size"] = stat_result.st_size
+        _write_seed_cache(entry)
+        return entry, raw_bytes
+    return None, raw_bytes
+
+
+def _write_seed_cache(entry: Dict[str, Any]) -> None:
+    """Atomically replace the compiled seed cache; failures are non-fatal."""
+
+    cache_path = _seed_cache_path()
+    tmp_path: Optional[str] = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=cache_path.name + ".", suffix=".tmp", dir=str(cache_path.parent)
+        )
+        with os.fdopen(fd, "wb") as handle:
+            pickle.dump(entry, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+    except OSError as exc:
+        logger.info("Could not write seed cache %s: %s", cache_path, exc)
+    finally:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+def _load_compiled_seed() -> Optional[Dict[str, Any]]:
+    """Return the parsed seed payload, lookup and id index via the compiled cache.
+
+    The cache is a pickle written next to :data:`SEED_PATH` and keyed by the
+    seed file's mtime, size and SHA-1.  It is rebuilt (and atomically
+    replaced) whenever the seed file changes.
+    """
+
+    try:
+        stat_result = SEED_PATH.stat()
+    except FileNotFoundError:
+        return None
+
+    entry, raw_bytes = _read_seed_cache(stat_result)
+    if entry is not None:
+        return entry
+
+    if raw_bytes is None:
+        raw_bytes = SEED_PATH.read_bytes()
+    payload = _parse_seed_text(raw_bytes.decode("utf-8"))
+    if payload is None:
+        return {"payload": None, "lookup": {}, "seed_ids": {}}
+
+    lookup = _build_seed_problem_lookup(payload)
+    entry = {
+        "format": _SEED_CACHE_FORMAT,
+        "mtime_ns": stat_result.st_mtime_ns,
+        "size": stat_result.st_size,
+        "sha1": hashlib.sha1(raw_bytes).hexdigest(),
+        "payload": payload,
+        "lookup": lookup,
+        "seed_ids": _build_seed_problem_ids(lookup),
+    }
+    _write_seed_cache(entry)
+    return entry
+
+
+def _load_seed_file_payload() -> Optional[Dict[str, Any]]:
+    """Return the normalised seed payload from disk if available."""
+
+    compiled = _load_compiled_seed()
+    if compiled is None:
+        return None
+    return compiled["payload"]
+
+
+class _SeedIndex:
+    """Seed problems keyed by ``(year, case_label)`` plus the seed-only id index.
+
+    Both mappings are built together and never mutated afterwards, so readers
+    that hold one instance always see a consistent pair.
+    """
+
+    __slots__ = ("lookup", "ids")
+
+    def __init__(
+        self,
+        lookup: Dict[Tuple[str, str], Dict[str, Any]],
+        ids: Dict[int, Tuple[str, str]],
+    ) -> None:
+        self.lookup = lookup
+        self.ids = MappingProxyType(ids)
+
+
+@lru_cache(maxsize=1)
+def _load_seed_index_cached(signature: float) -> _SeedIndex:
+    """Return the seed index for the given seed file signature."""
+
+    compiled = _load_compiled_seed()
+    if not compiled:
+        return _SeedIndex({}, {})
+    return _SeedIndex(compiled["lookup"], compiled["seed_ids"])
 
+
+def _load_seed_index(signature: Optional[float] = None) -> _SeedIndex:
     if signature is None:
         signature = _seed_file_signature()
-    return _load_seed_problem_lookup_cached(signature)
+    return _load_seed_index_cached(signature)
+
+
+def _load_seed_problem_lookup(signature: Optional[float] = None) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Convenience wrapper that injects the current seed file signature."""
+
+    return _load_seed_index(signature).lookup
 
 
 def _make_seed_problem_id(year: str, case_label: str) -> int:
@@ -155,32 +496,29 @@ def _make_seed_problem_id(year: str, case_label: str) -> int:
     return -(zlib.crc32(key_bytes) + 1)
 
 
-def _register_seed_only_problem(year: str, case_label: str) -> int:
-    """Return a deterministic ID for the given seed problem and cache the mapping."""
+def _build_seed_problem_ids(
+    lookup: Dict[Tuple[str, str], Dict[str, Any]]
+) -> Dict[int, Tuple[str, str]]:
+    """Return the reverse index from seed-only problem id to ``(year, case_label)``."""
 
-    seed_id = _make_seed_problem_id(year, case_label)
-    _SEED_ONLY_ID_LOOKUP[seed_id] = (year, case_label)
-    return seed_id
+    ids: Dict[int, Tuple[str, str]] = {}
+    for key in lookup:
+        ids.setdefault(_make_seed_problem_id(*key), key)
+    return ids
 
 
 def _resolve_seed_problem_by_id(
-    problem_id: int, seed_lookup: Dict[Tuple[str, str], Dict[str, Any]]
+    problem_id: int, seed_index: _SeedIndex
 ) -> Optional[Tuple[str, str, Dict[str, Any]]]:
     """Return the seed problem metadata for the given identifier if available."""
 
-    mapping = _SEED_ONLY_ID_LOOKUP.get(problem_id)
-    if mapping:
-        year, case_label = mapping
-        seed_problem = seed_lookup.get((year, case_label))
-        if seed_problem:
-            return year, case_label, seed_problem
-
-    for (year, case_label), seed_problem in seed_lookup.items():
-        if _make_seed_problem_id(year, case_label) == problem_id:
-            _SEED_ONLY_ID_LOOKUP[problem_id] = (year, case_label)
-            return year, case_label, seed_problem
-
-    return None
+    key = seed_index.ids.get(problem_id)
+    if key is None:
+        return None
+    seed_problem = seed_index.lookup.get(key)
+    if not seed_problem:
+        return None
+    return key[0], key[1], seed_problem
 
 
 def _build_problem_from_seed(
@@ -271,371 +609,1436 @@ def _build_problem_from_seed(
     }
 
 
-def get_connection() -> sqlite3.Connection:
-    """Return a SQLite connection with row factory configured."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def initialize_database(*, force: bool = False) -> None:
-    """Create the SQLite database (if necessary) and seed master data."""
+class _MeteredConnection(sqlite3.Connection):
+    """SQLite connection that hands out instrumented cursors while metrics are on."""
 
-    global _DATABASE_INITIALISED
+    def cursor(self, factory: Any = None) -> sqlite3.Cursor:  # type: ignore[override]
+        if factory is None:
+            factory = _InstrumentedCursor if _QUERY_METRICS.enabled else sqlite3.Cursor
+        return sqlite3.Connection.cursor(self, factory)
 
-    if _DATABASE_INITIALISED and not force:
-        return
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:  # type: ignore[override]
+        if _QUERY_METRICS.enabled:
+            return self.cursor().execute(sql, parameters)
+        return sqlite3.Connection.execute(self, sql, parameters)
 
-    with _INITIALIZE_LOCK:
-        if _DATABASE_INITIALISED and not force:
-            return
+    def executemany(self, sql: str, parameters: Any) -> sqlite3.Cursor:  # type: ignore[override]
+        if _QUERY_METRICS.enabled:
+            return self.cursor().executemany(sql, parameters)
+        return sqlite3.Connection.executemany(self, sql, parameters)
 
-        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-        conn = get_connection()
-        try:
-            cur = conn.cursor()
+class _PooledConnection(_MeteredConnection):
+    """SQLite connection whose ``close`` hands it back to the pool.
 
-            cur.executescript(
-                """
-        PRAGMA foreign_keys = ON;
+    Helpers in this module follow a ``get_connection()`` → query → ``close()``
+    pattern.  Overriding ``close`` keeps that calling convention intact while
+    letting the physical connection (and its prepared statement cache) be
+    reused by the next helper call.
+    """
 
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            name TEXT NOT NULL,
-            password_hash TEXT,
-            plan TEXT NOT NULL DEFAULT 'free',
-            created_at TEXT NOT NULL
-        );
+    _pool_key: str = ""
+    _checkout_depth: int = 0
 
-        CREATE TABLE IF NOT EXISTS problems (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            year TEXT NOT NULL,
-            case_label TEXT NOT NULL,
-            title TEXT NOT NULL,
-            overview TEXT NOT NULL,
-            context_text TEXT,
-            difficulty TEXT,
-            theme_tags_json TEXT,
-            tendency_tags_json TEXT,
-            topic_tags_json TEXT,
-            source_url TEXT
-        );
+    def close(self) -> None:  # type: ignore[override]
+        _CONNECTION_POOL.release(self)
 
-        CREATE TABLE IF NOT EXISTS questions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            problem_id INTEGER NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
-            question_order INTEGER NOT NULL,
-            prompt TEXT NOT NULL,
-            character_limit INTEGER,
-            max_score REAL NOT NULL,
-            model_answer TEXT NOT NULL,
-            explanation TEXT NOT NULL,
-            keywords_json TEXT NOT NULL,
-            video_url TEXT,
-            diagram_path TEXT,
-            diagram_caption TEXT,
-            intent_cards_json TEXT DEFAULT '[]',
-            skill_tags_json TEXT,
-            question_difficulty TEXT
-        );
+    def _close_physical(self) -> None:
+        sqlite3.Connection.close(self)
 
-        CREATE TABLE IF NOT EXISTS attempts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-            problem_id INTEGER NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
-            mode TEXT NOT NULL,
-            started_at TEXT NOT NULL,
-            submitted_at TEXT,
-            duration_seconds INTEGER,
-            total_score REAL,
-            total_max_score REAL
-        );
 
-        CREATE TABLE IF NOT EXISTS attempt_answers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            attempt_id INTEGER NOT NULL REFERENCES attempts(id) ON DELETE CASCADE,
-            question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
-            answer_text TEXT NOT NULL,
-            score REAL,
-            feedback TEXT,
-            keyword_hits_json TEXT,
-            axis_breakdown_json TEXT
-        );
+class _ConnectionPool:
+    """Thread-aware pool of SQLite connections keyed by database path.
 
-        CREATE TABLE IF NOT EXISTS attempt_question_activity (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            attempt_id INTEGER NOT NULL REFERENCES attempts(id) ON DELETE CASCADE,
-            question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
-            opened_at TEXT,
-            first_input_at TEXT,
-            last_updated_at TEXT,
-            total_duration_seconds INTEGER,
-            revision_count INTEGER DEFAULT 0,
-            edit_history_json TEXT
-        );
+    A thread that already holds a connection for the same database receives
+    it again (re-entrant checkout), so nested helper calls never open a second
+    handle.  Released connections are kept idle for reuse by any thread up to
+    ``max_idle`` per database file; any uncommitted transaction is rolled back
+    before a connection becomes idle.
 
-        CREATE TABLE IF NOT EXISTS attempt_scoring_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            attempt_id INTEGER NOT NULL REFERENCES attempts(id) ON DELETE CASCADE,
-            question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
-            question_order INTEGER,
-            logged_at TEXT NOT NULL,
-            max_score REAL,
-            score REAL,
-            keyword_coverage REAL,
-            checkpoints_json TEXT,
-            axis_breakdown_json TEXT,
-            duration_seconds INTEGER,
-            self_evaluation TEXT,
-            notes TEXT
-        );
-        CREATE INDEX IF NOT EXISTS idx_attempt_scoring_logs_attempt
-            ON attempt_scoring_logs(attempt_id);
+    Helpers check connections out through :meth:`checkout`, which releases
+    them even when the helper raises.
+    """
 
-        CREATE TABLE IF NOT EXISTS reminders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-            cadence TEXT NOT NULL,
-            interval_days INTEGER NOT NULL,
-            preferred_channels_json TEXT NOT NULL,
-            reminder_time TEXT NOT NULL,
-            next_trigger_at TEXT NOT NULL,
-            last_notified_at TEXT
-        );
+    def __init__(self, *, max_idle: int) -> None:
+        self.max_idle = max_idle
+        self._lock = Lock()
+        self._local = local()
+        self._idle: Dict[str, List[_PooledConnection]] = {}
+        self._open_count = 0
+        self._stats: Dict[str, int] = {
+            "created": 0,
+            "reused": 0,
+            "reentrant": 0,
+            "released": 0,
+            "rolled_back": 0,
+            "discarded": 0,
+        }
 
-        CREATE TABLE IF NOT EXISTS spaced_reviews (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-            problem_id INTEGER NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
-            interval_days INTEGER NOT NULL,
-            due_at TEXT NOT NULL,
-            last_reviewed_at TEXT NOT NULL,
-            last_score_ratio REAL,
-            streak INTEGER NOT NULL DEFAULT 0,
-            UNIQUE(user_id, problem_id)
-        );
+    def _checked_out(self) -> Dict[str, _PooledConnection]:
+        checked_out = getattr(self._local, "connections", None)
+        if checked_out is None:
+            checked_out = {}
+            self._local.connections = checked_out
+        return checked_out
+
+    def acquire(self, path: Path) -> _PooledConnection:
+        key = str(path)
+        checked_out = self._checked_out()
+        conn = checked_out.get(key)
+        if conn is not None:
+            conn._checkout_depth += 1
+            with self._lock:
+                self._stats["reentrant"] += 1
+            return conn
+
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+            if conn is not None:
+                self._stats["reused"] += 1
+
+        if conn is None:
+            conn = _open_pooled_connection(path)
+            conn._pool_key = key
+            with self._lock:
+                self._stats["created"] += 1
+                self._open_count += 1
+
+        conn._checkout_depth = 1
+        checked_out[key] = conn
+        return conn
+
+    def release(self, conn: _PooledConnection) -> None:
+        if conn._checkout_depth > 1:
+            conn._checkout_depth -= 1
+            return
 
-        CREATE TABLE IF NOT EXISTS study_goals (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-            period_type TEXT NOT NULL,
-            start_date TEXT NOT NULL,
-            end_date TEXT NOT NULL,
-            target_practice_count INTEGER NOT NULL,
-            target_study_minutes INTEGER NOT NULL,
-            target_score REAL NOT NULL,
-            preferred_start_time TEXT,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL,
-            UNIQUE(user_id, period_type, start_date)
-        );
+        conn._checkout_depth = 0
+        checked_out = self._checked_out()
+        if checked_out.get(conn._pool_key) is conn:
+            del checked_out[conn._pool_key]
 
-        CREATE TABLE IF NOT EXISTS study_sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            goal_id INTEGER NOT NULL REFERENCES study_goals(id) ON DELETE CASCADE,
-            session_date TEXT NOT NULL,
-            start_time TEXT NOT NULL,
-            duration_minutes INTEGER NOT NULL,
-            description TEXT,
-            created_at TEXT NOT NULL,
-            UNIQUE(goal_id, session_date, start_time)
-        );
+        rolled_back = False
+        healthy = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+                rolled_back = True
+        except sqlite3.Error:
+            healthy = False
+
+        with self._lock:
+            self._stats["released"] += 1
+            if rolled_back:
+                self._stats["rolled_back"] += 1
+            idle = self._idle.setdefault(conn._pool_key, [])
+            keep = healthy and len(idle) < self.max_idle
+            if keep:
+                idle.append(conn)
+            else:
+                self._stats["discarded"] += 1
+                self._open_count -= 1
+
+        if not keep:
+            conn._close_physical()
+
+    @contextmanager
+    def checkout(self, path: Path) -> Iterator[_PooledConnection]:
+        """Check out a connection for the duration of a ``with`` block.
+
+        A block entered with no transaction open owns whatever transaction
+        it starts: it commits when the block exits normally and rolls back
+        when it raises.  A nested block entered while its caller has a
+        transaction open runs inside a savepoint instead, so it neither
+        commits the caller's work nor, when it fails, discards more than its
+        own.  The connection is released in every case.
         """
+
+        conn = self.acquire(path)
+        savepoint = None
+        if conn.in_transaction:
+            savepoint = f"pool_checkout_{conn._checkout_depth}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+        try:
+            yield conn
+            if savepoint is not None:
+                if conn.in_transaction:
+                    conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+            elif conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            try:
+                if savepoint is not None:
+                    if conn.in_transaction:
+                        conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                        conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+                elif conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error as exc:
+                logger.warning("Failed to roll back a failed checkout: %s", exc)
+            raise
+        finally:
+            self.release(conn)
+
+    def close_idle(self) -> int:
+        with self._lock:
+            idle_connections = [conn for bucket in self._idle.values() for conn in bucket]
+            self._idle.clear()
+            self._open_count -= len(idle_connections)
+        for conn in idle_connections:
+            conn._close_physical()
+        return len(idle_connections)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            idle = sum(len(bucket) for bucket in self._idle.values())
+            snapshot: Dict[str, Any] = dict(self._stats)
+            snapshot.update(
+                {
+                    "open": self._open_count,
+                    "idle": idle,
+                    "in_use": self._open_count - idle,
+                    "max_idle": self.max_idle,
+                }
             )
+        return snapshot
 
-            conn.commit()
 
-            if not SEED_PATH.exists():
-                seed_payload = _default_seed_payload()
-                SEED_PATH.write_text(
-                    json.dumps(seed_payload, ensure_ascii=False, indent=2),
-                    encoding="utf-8",
-                )
-                seed_payload = _normalise_seed_payload(seed_payload)
-            else:
-                seed_payload = _load_seed_file_payload()
-                if not seed_payload:
-                    logger.warning(
-                        "Falling back to bundled seed payload because %s could not be parsed.",
-                        SEED_PATH,
-                    )
-                    seed_payload = _normalise_seed_payload(_default_seed_payload())
+def _open_pooled_connection(path: Path) -> _PooledConnection:
+    """Open a physical connection and apply the performance pragmas."""
 
-            _ensure_question_multimedia_columns(conn)
-            _ensure_problem_context_columns(conn)
-            _ensure_problem_metadata_columns(conn)
-            _ensure_attempt_answer_axis_column(conn)
+    conn = sqlite3.connect(
+        path,
+        timeout=CONNECTION_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=CONNECTION_STATEMENT_CACHE_SIZE,
+        factory=_PooledConnection,
+    )
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {int(CONNECTION_BUSY_TIMEOUT_MS)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = {int(CONNECTION_CACHE_SIZE_KIB) * -1}")
+        conn.execute(f"PRAGMA mmap_size = {int(CONNECTION_MMAP_SIZE_BYTES)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+    except sqlite3.DatabaseError as exc:
+        logger.warning("Failed to apply connection pragmas for %s: %s", path, exc)
+    return conn
 
-            _seed_problems(conn, seed_payload)
-        finally:
-            conn.close()
 
-        _clear_problem_caches()
-        _DATABASE_INITIALISED = True
+_CONNECTION_POOL = _ConnectionPool(max_idle=CONNECTION_POOL_MAX_IDLE)
 
 
-def _seed_problems(conn: sqlite3.Connection, payload: Dict) -> None:
-    """Insert seed problems only when they are not already present."""
-    cursor = conn.cursor()
-    for problem in payload.get("problems", []):
-        cursor.execute(
-            "SELECT id FROM problems WHERE year = ? AND case_label = ?",
-            (problem["year"], problem["case"]),
-        )
-        row = cursor.fetchone()
-        context_text = problem.get("context")
+def get_connection() -> sqlite3.Connection:
+    """Return a pooled SQLite connection with row factory configured.
 
-        metadata_values = (
-            problem.get("difficulty"),
-            json.dumps(problem.get("themes", []), ensure_ascii=False) if problem.get("themes") else None,
-            json.dumps(problem.get("tendencies", []), ensure_ascii=False) if problem.get("tendencies") else None,
-            json.dumps(problem.get("tags", []), ensure_ascii=False) if problem.get("tags") else None,
-            problem.get("source_url"),
-        )
+    Calling ``close()`` on the returned connection releases it back to the
+    pool; use :func:`close_idle_connections` to drop the physical handles.
+    """
+    return _CONNECTION_POOL.acquire(DB_PATH)
 
-        if row:
-            problem_id = row["id"]
-            cursor.execute(
-                """
-                UPDATE problems
-                SET title = ?, overview = ?, context_text = ?, difficulty = ?,
-                    theme_tags_json = ?, tendency_tags_json = ?, topic_tags_json = ?,
-                    source_url = ?
-                WHERE id = ?
-                """,
-                (
-                    problem["title"],
-                    problem["overview"],
-                    context_text,
-                    *metadata_values,
-                    problem_id,
-                ),
-            )
-        else:
-            cursor.execute(
-                """
-                INSERT INTO problems (
-                    year, case_label, title, overview, context_text, difficulty,
-                    theme_tags_json, tendency_tags_json, topic_tags_json, source_url
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    problem["year"],
-                    problem["case"],
-                    problem["title"],
-                    problem["overview"],
-                    context_text,
-                    *metadata_values,
-                ),
-            )
-            problem_id = cursor.lastrowid
 
-        for order, question in enumerate(problem.get("questions", []), start=1):
-            cursor.execute(
-                "SELECT id FROM questions WHERE problem_id = ? AND question_order = ?",
-                (problem_id, order),
-            )
-            existing_question = cursor.fetchone()
-            payload_values = (
-                question["prompt"],
-                question.get("character_limit"),
-                question["max_score"],
-                question["model_answer"],
-                question["explanation"],
-                json.dumps(question.get("keywords", []), ensure_ascii=False),
-                json.dumps(question.get("intent_cards", []), ensure_ascii=False),
-                question.get("video_url"),
-                question.get("diagram_path"),
-                question.get("diagram_caption"),
-                json.dumps(question.get("skill_tags", []), ensure_ascii=False)
-                if question.get("skill_tags")
-                else None,
-                question.get("difficulty"),
-            )
+@contextmanager
+def _connection() -> Iterator[sqlite3.Connection]:
+    """Check out a pooled connection for a ``with`` block.
 
-            if existing_question:
-                cursor.execute(
-                    """
-                    UPDATE questions
-                    SET prompt = ?, character_limit = ?, max_score = ?, model_answer = ?,
-                        explanation = ?, keywords_json = ?, intent_cards_json = ?, video_url = ?,
-                        diagram_path = ?, diagram_caption = ?, skill_tags_json = ?,
-                        question_difficulty = ?
-                    WHERE id = ?
-                    """,
-                    (*payload_values, existing_question["id"]),
-                )
-            else:
-                cursor.execute(
-                    """
-                    INSERT INTO questions (
-                        problem_id, question_order, prompt, character_limit, max_score,
-                        model_answer, explanation, keywords_json, intent_cards_json, video_url,
-                        diagram_path, diagram_caption, skill_tags_json, question_difficulty
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        problem_id,
-                        order,
-                        *payload_values,
-                    ),
-                )
+    See :meth:`_ConnectionPool.checkout` for the commit/rollback rules.
+    """
 
-    conn.commit()
+    with _CONNECTION_POOL.checkout(DB_PATH) as conn:
+        yield conn
 
 
-def _normalise_seed_payload(payload: Any) -> Dict[str, Any]:
-    """Return seed data in the canonical structure used by the seeder.
+def get_connection_pool_stats() -> Dict[str, Any]:
+    """Return counters describing connection reuse for diagnostics."""
 
-    Historically the project stored the problem seeds as a flat list of
-    question records. Modern versions expect a dictionary with a top-level
-    ``"problems"`` key containing problem dictionaries, each with a nested
-    ``"questions"`` list. When the legacy shape is detected we convert it into
-    the new representation so that migrations remain backward compatible.
-    """
+    return _CONNECTION_POOL.stats()
 
-    if isinstance(payload, dict) and "problems" in payload:
-        return payload
 
-    if not isinstance(payload, list):
-        raise TypeError("Seed payload must be a dict or list of question records")
+def close_idle_connections() -> int:
+    """Close every idle pooled connection and return how many were closed."""
 
-    problems: Dict[tuple[str, str], Dict[str, Any]] = {}
+    return _CONNECTION_POOL.close_idle()
 
-    def _normalise_keywords(raw: Any) -> List[str]:
-        if isinstance(raw, list):
-            return [str(keyword).strip() for keyword in raw if str(keyword).strip()]
-        if isinstance(raw, str):
-            return [
-                keyword.strip()
-                for keyword in re.split(r"[|,]", raw)
-                if keyword.strip()
-            ]
-        return []
 
-    def _normalise_intent_cards(raw: Any) -> List[Dict[str, Any]]:
-        cards: List[Dict[str, Any]] = []
+_LATENCY_BUCKETS_SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
 
-        def _walk(value: Any) -> None:
-            if isinstance(value, dict):
-                label = value.get("label")
-                example = value.get("example")
-                if label and example:
-                    cards.append({"label": str(label), "example": str(example)})
-            elif isinstance(value, list):
-                for item in value:
-                    _walk(item)
 
-        _walk(raw)
-        if cards:
-            return cards
+class _LatencyHistogram:
+    """Cumulative-friendly latency histogram with fixed Prometheus buckets."""
 
-        if isinstance(raw, str) and raw.strip():
-            for chunk in raw.split("|"):
-                chunk = chunk.strip()
-                if not chunk:
+    __slots__ = ("counts", "count", "total", "maximum", "rows")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_LATENCY_BUCKETS_SECONDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.rows = 0
+
+    def observe(self, seconds: float, rows: int) -> None:
+        index = 0
+        while index < len(_LATENCY_BUCKETS_SECONDS) and seconds > _LATENCY_BUCKETS_SECONDS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.rows += rows
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets: Dict[str, int] = {}
+        for bound, count in zip(_LATENCY_BUCKETS_SECONDS + (float("inf"),), self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.maximum * 1000, 3),
+            "rows": self.rows,
+            "buckets": buckets,
+        }
+
+
+class _QueryMetrics:
+    """Per-function and per-statement timings collected while instrumentation is on.
+
+    Public functions are wrapped in place by :meth:`enable`, so internal calls
+    between helpers are measured too (times and row counts are inclusive of
+    nested helpers).  Statement timings come from :class:`_InstrumentedCursor`
+    and cover execution plus fetching; the rows a statement returns or changes
+    are credited to the innermost instrumented function on the same thread.
+    """
+
+    _EXCLUDED_FUNCTIONS = frozenset(
+        {
+            "main",
+            "get_connection",
+            "enable_query_instrumentation",
+            "disable_query_instrumentation",
+            "get_query_metrics",
+            "reset_query_metrics",
+            "render_query_metrics_prometheus",
+            "export_query_metrics",
+        }
+    )
+
+    def __init__(self, *, max_statements: int) -> None:
+        self.max_statements = max_statements
+        self.enabled = False
+        self.slow_threshold_ms = SLOW_QUERY_THRESHOLD_MS
+        self.slow_log_path: Optional[Path] = SLOW_QUERY_LOG_PATH
+        self._lock = Lock()
+        self._local = local()
+        self._originals: Dict[str, Callable[..., Any]] = {}
+        self._functions: Dict[str, _LatencyHistogram] = {}
+        self._statements: Dict[str, _LatencyHistogram] = {}
+        self._recent_slow: "deque[Dict[str, Any]]" = deque(maxlen=50)
+        self._slow_count = 0
+
+    def enable(
+        self,
+        namespace: Dict[str, Any],
+        *,
+        slow_threshold_ms: Optional[float],
+        slow_log_path: Optional[Path],
+    ) -> None:
+        with self._lock:
+            if slow_threshold_ms is not None:
+                self.slow_threshold_ms = slow_threshold_ms
+            if slow_log_path is not None:
+                self.slow_log_path = slow_log_path
+            if not self._originals:
+                for name, value in list(namespace.items()):
+                    if (
+                        name.startswith("_")
+                        or name in self._EXCLUDED_FUNCTIONS
+                        or not inspect.isfunction(value)
+                        or value.__module__ != __name__
+                        or inspect.isgeneratorfunction(value)
+                    ):
+                        continue
+                    self._originals[name] = value
+                    namespace[name] = self._wrap(name, value)
+            self.enabled = True
+
+    def disable(self, namespace: Dict[str, Any]) -> None:
+        with self._lock:
+            namespace.update(self._originals)
+            self._originals.clear()
+            self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._functions.clear()
+            self._statements.clear()
+            self._recent_slow.clear()
+            self._slow_count = 0
+
+    def _frames(self) -> List[List[Any]]:
+        frames = getattr(self._local, "frames", None)
+        if frames is None:
+            frames = []
+            self._local.frames = frames
+        return frames
+
+    def _wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(func)
+        def instrumented(*args: Any, **kwargs: Any) -> Any:
+            frames = self._frames()
+            frame = [name, 0]
+            frames.append(frame)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                frames.pop()
+                if frames:
+                    frames[-1][1] += frame[1]
+                with self._lock:
+                    histogram = self._functions.get(name)
+                    if histogram is None:
+                        histogram = self._functions[name] = _LatencyHistogram()
+                    histogram.observe(elapsed, frame[1])
+
+        return instrumented
+
+    def record_statement(
+        self,
+        conn: sqlite3.Connection,
+        sql: str,
+        parameters: Any,
+        seconds: float,
+        rows: int,
+    ) -> None:
+        frames = self._frames()
+        if frames:
+            frames[-1][1] += rows
+        key = " ".join(sql.split())
+        with self._lock:
+            histogram = self._statements.get(key)
+            if histogram is None:
+                if len(self._statements) >= self.max_statements:
+                    key = "<other>"
+                histogram = self._statements.setdefault(key, _LatencyHistogram())
+            histogram.observe(seconds, rows)
+        if seconds * 1000 >= self.slow_threshold_ms:
+            self._log_slow(conn, key, parameters, seconds, rows, frames[-1][0] if frames else None)
+
+    def _log_slow(
+        self,
+        conn: sqlite3.Connection,
+        sql: str,
+        parameters: Any,
+        seconds: float,
+        rows: int,
+        function: Optional[str],
+    ) -> None:
+        plan: List[str] = []
+        if parameters is not None:
+            try:
+                depth: Dict[int, int] = {}
+                explain = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+                for node_id, parent_id, _, detail in explain.fetchall():
+                    depth[node_id] = depth.get(parent_id, -1) + 1
+                    plan.append("  " * depth[node_id] + detail)
+            except sqlite3.Error as exc:
+                plan.append(f"<unavailable: {exc}>")
+        entry = {
+            "logged_at": datetime.utcnow().isoformat(),
+            "function": function,
+            "duration_ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "sql": sql,
+            "plan": plan,
+        }
+        logger.warning("Slow query (%.1f ms) in %s: %s", entry["duration_ms"], function, sql)
+        with self._lock:
+            self._slow_count += 1
+            self._recent_slow.append(entry)
+            path = self.slow_log_path
+            if path is not None:
+                try:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with path.open("a", encoding="utf-8") as handle:
+                        handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                except OSError as exc:
+                    logger.warning("Failed to write slow query log %s: %s", path, exc)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "slow_threshold_ms": self.slow_threshold_ms,
+                "slow_query_count": self._slow_count,
+                "functions": {
+                    name: histogram.as_dict() for name, histogram in sorted(self._functions.items())
+                },
+                "statements": {
+                    sql: histogram.as_dict()
+                    for sql, histogram in sorted(
+                        self._statements.items(), key=lambda item: item[1].total, reverse=True
+                    )
+                },
+                "recent_slow_queries": list(self._recent_slow),
+            }
+
+
+class _InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement to :data:`_QUERY_METRICS`.
+
+    A statement is reported once it is finished with: when ``fetchall`` or an
+    exhausted ``fetchone``/``fetchmany``/iteration returns, when the cursor
+    runs its next statement, or when it is closed or collected.
+    """
+
+    _pending: Optional[List[Any]] = None
+
+    def execute(self, sql: str, parameters: Any = ()) -> "_InstrumentedCursor":  # type: ignore[override]
+        self._finish()
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._pending = [sql, parameters, time.perf_counter() - started, 0]
+        if self.description is None:
+            self._pending[3] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> "_InstrumentedCursor":  # type: ignore[override]
+        self._finish()
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._pending = [sql, None, time.perf_counter() - started, max(self.rowcount, 0)]
+        self._finish()
+        return self
+
+    def _fetch(self, method: Callable[..., Any], *args: Any) -> Any:
+        started = time.perf_counter()
+        result = method(*args)
+        pending = self._pending
+        if pending is not None:
+            pending[2] += time.perf_counter() - started
+            if isinstance(result, list):
+                pending[3] += len(result)
+            elif result is not None:
+                pending[3] += 1
+        return result
+
+    def fetchone(self) -> Any:
+        row = self._fetch(super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Any]:
+        size = self.arraysize if size is None else size
+        rows = self._fetch(super().fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self) -> List[Any]:
+        rows = self._fetch(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self) -> Any:
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+    def __del__(self) -> None:
+        self._finish()
+
+    def _finish(self) -> None:
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        _QUERY_METRICS.record_statement(self.connection, pending[0], pending[1], pending[2], pending[3])
+
+
+_QUERY_METRICS = _QueryMetrics(max_statements=QUERY_METRICS_MAX_STATEMENTS)
+
+
+def enable_query_instrumentation(
+    *,
+    slow_threshold_ms: Optional[float] = None,
+    slow_log_path: Optional[Path] = None,
+) -> None:
+    """Start timing public database functions and SQL statements."""
+
+    _QUERY_METRICS.enable(
+        globals(), slow_threshold_ms=slow_threshold_ms, slow_log_path=slow_log_path
+    )
+
+
+def disable_query_instrumentation() -> None:
+    """Stop collecting metrics and restore the unwrapped functions."""
+
+    _QUERY_METRICS.disable(globals())
+
+
+def reset_query_metrics() -> None:
+    """Drop every collected timing and the in-memory slow query list."""
+
+    _QUERY_METRICS.reset()
+
+
+def get_query_metrics() -> Dict[str, Any]:
+    """Return collected function/statement latencies as JSON-serialisable data."""
+
+    return _QUERY_METRICS.snapshot()
+
+
+def render_query_metrics_prometheus() -> str:
+    """Render the collected metrics in the Prometheus text exposition format."""
+
+    metrics = _QUERY_METRICS.snapshot()
+    lines: List[str] = []
+
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+    for series, label, entries in (
+        ("shindan_db_function", "function", metrics["functions"]),
+        ("shindan_db_statement", "statement", metrics["statements"]),
+    ):
+        lines.append(f"# HELP {series}_duration_seconds Latency of instrumented database {label}s.")
+        lines.append(f"# TYPE {series}_duration_seconds histogram")
+        for name, data in entries.items():
+            labels = f'{label}="{escape(name)}"'
+            for bound, count in data["buckets"].items():
+                lines.append(f'{series}_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{series}_duration_seconds_sum{{{labels}}} {data['total_ms'] / 1000:.6f}")
+            lines.append(f"{series}_duration_seconds_count{{{labels}}} {data['count']}")
+        lines.append(f"# HELP {series}_rows_total Rows returned or changed per {label}.")
+        lines.append(f"# TYPE {series}_rows_total counter")
+        for name, data in entries.items():
+            lines.append(f'{series}_rows_total{{{label}="{escape(name)}"}} {data["rows"]}')
+    lines.append("# HELP shindan_db_slow_queries_total Statements slower than the slow query threshold.")
+    lines.append("# TYPE shindan_db_slow_queries_total counter")
+    lines.append(f"shindan_db_slow_queries_total {metrics['slow_query_count']}")
+    return "\n".join(lines) + "\n"
+
+
+def export_query_metrics(path: Path) -> Path:
+    """Write the metrics to ``path``; ``.json`` files get JSON, anything else Prometheus text."""
+
+    path = Path(path)
+    if path.suffix == ".json":
+        payload = json.dumps(get_query_metrics(), ensure_ascii=False, indent=2)
+    else:
+        payload = render_query_metrics_prometheus()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(payload, encoding="utf-8")
+    os.replace(tmp_path, path)
+    return path
+
+
+def _is_transient_write_error(exc: BaseException) -> bool:
+    """Return True for lock contention errors that are worth retrying."""
+
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+_WriteKey = Tuple[str, str, Any]
+
+
+class _WriteQueue:
+    """Coalescing group-commit queue for small single-row ``UPDATE`` statements.
+
+    Writes are keyed by ``(database path, statement, row key)``; a newer write
+    for the same key replaces the pending one.  A daemon thread commits
+    everything pending in one transaction per database once
+    ``flush_interval`` has passed since it woke up.  :meth:`flush` does the
+    same synchronously on the caller's thread, and a shared lock keeps
+    batches committed in the order they were taken.
+
+    Only lock contention is retried: the batch is requeued and the writer
+    thread backs off exponentially, dropping a write after ``max_attempts``
+    tries.  Any other error sends the batch through again one row at a time,
+    so only the failing rows are dropped.
+    """
+
+    def __init__(
+        self, *, flush_interval: float, max_attempts: int, retry_max_delay: float
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_max_delay = retry_max_delay
+        self._condition = Condition()
+        self._flush_lock = Lock()
+        self._pending: "OrderedDict[_WriteKey, Tuple[Any, ...]]" = OrderedDict()
+        self._attempts: Dict[_WriteKey, int] = {}
+        self._consecutive_retries = 0
+        self._thread: Optional[Thread] = None
+        self._stats: Dict[str, int] = {
+            "submitted": 0,
+            "coalesced": 0,
+            "written": 0,
+            "batches": 0,
+            "retried": 0,
+            "failed": 0,
+        }
+
+    def submit(self, sql: str, row_key: Any, params: Tuple[Any, ...]) -> None:
+        key = (str(DB_PATH), sql, row_key)
+        with self._condition:
+            if self._pending.pop(key, None) is not None:
+                self._stats["coalesced"] += 1
+            self._attempts.pop(key, None)
+            self._pending[key] = params
+            self._stats["submitted"] += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="database-write-queue", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _retry_delay(self) -> float:
+        if not self._consecutive_retries:
+            return 0.0
+        return min(self.flush_interval * 2 ** self._consecutive_retries, self.retry_max_delay)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                delay = self._retry_delay()
+            time.sleep(self.flush_interval + delay)
+            try:
+                self.flush()
+            except sqlite3.Error as exc:
+                logger.warning("Queued database writes failed: %s", exc)
+            except Exception:
+                logger.exception("Queued database writes failed")
+
+    def flush(self) -> int:
+        """Write everything pending and return how many rows were committed.
+
+        Raises the lock error after requeueing when the database was busy, or
+        the first row error after committing the other rows.
+        """
+
+        with self._flush_lock:
+            with self._condition:
+                batch = self._pending
+                self._pending = OrderedDict()
+            if not batch:
+                return 0
+
+            by_path: Dict[str, List[Tuple[_WriteKey, Tuple[Any, ...]]]] = {}
+            for key, params in batch.items():
+                by_path.setdefault(key[0], []).append((key, params))
+
+            written = 0
+            retry: List[_WriteKey] = []
+            failed: List[Tuple[_WriteKey, sqlite3.Error]] = []
+            transient_error: Optional[sqlite3.Error] = None
+            for path, entries in by_path.items():
+                try:
+                    path_failed = self._write(path, entries)
+                except sqlite3.Error as exc:
+                    if _is_transient_write_error(exc):
+                        transient_error = exc
+                        retry.extend(key for key, _params in entries)
+                    else:
+                        failed.extend((key, exc) for key, _params in entries)
+                    continue
+                failed.extend(path_failed)
+                written += len(entries) - len(path_failed)
+
+            with self._condition:
+                self._stats["written"] += written
+                if written:
+                    self._stats["batches"] += 1
+                retry_keys = set(retry)
+                for key in batch:
+                    if key not in retry_keys:
+                        self._attempts.pop(key, None)
+                requeue: "OrderedDict[_WriteKey, Tuple[Any, ...]]" = OrderedDict()
+                for key in retry:
+                    if key in self._pending:
+                        continue  # superseded by a newer write
+                    attempts = self._attempts.get(key, 0) + 1
+                    if attempts >= self.max_attempts:
+                        self._attempts.pop(key, None)
+                        self._stats["failed"] += 1
+                        logger.error("Dropped queued write after %s attempts: %s", attempts, key[1])
+                        continue
+                    self._attempts[key] = attempts
+                    requeue[key] = batch[key]
+                if requeue:
+                    requeue.update(self._pending)
+                    self._pending = requeue
+                    self._stats["retried"] += 1
+                    self._consecutive_retries += 1
+                else:
+                    self._consecutive_retries = 0
+                self._stats["failed"] += len(failed)
+
+            for key, exc in failed:
+                logger.error("Dropped queued write %s for %r: %s", key[1], key[2], exc)
+            if transient_error is not None:
+                raise transient_error
+            if failed:
+                raise failed[0][1]
+            return written
+
+    def _write(
+        self, path: str, entries: List[Tuple[_WriteKey, Tuple[Any, ...]]]
+    ) -> List[Tuple[_WriteKey, sqlite3.Error]]:
+        """Commit ``entries`` to ``path``; return the rows that had to be dropped."""
+
+        statements: Dict[str, List[Tuple[Any, ...]]] = {}
+        for (_path, sql, _row_key), params in entries:
+            statements.setdefault(sql, []).append(params)
+
+        conn = _CONNECTION_POOL.acquire(Path(path))
+        try:
+            try:
+                cur = conn.cursor()
+                for sql, rows in statements.items():
+                    cur.executemany(sql, rows)
+                conn.commit()
+                return []
+            except sqlite3.Error as exc:
+                conn.rollback()
+                if _is_transient_write_error(exc):
+                    raise
+            return self._write_rows(conn, entries)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write_rows(
+        conn: sqlite3.Connection, entries: List[Tuple[_WriteKey, Tuple[Any, ...]]]
+    ) -> List[Tuple[_WriteKey, sqlite3.Error]]:
+        failed: List[Tuple[_WriteKey, sqlite3.Error]] = []
+        try:
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            for key, params in entries:
+                conn.execute("SAVEPOINT write_queue_row")
+                try:
+                    conn.execute(key[1], params)
+                except sqlite3.Error as exc:
+                    conn.execute("ROLLBACK TO SAVEPOINT write_queue_row")
+                    if _is_transient_write_error(exc):
+                        raise
+                    failed.append((key, exc))
+                finally:
+                    conn.execute("RELEASE SAVEPOINT write_queue_row")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return failed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            snapshot: Dict[str, Any] = dict(self._stats)
+            snapshot["pending"] = len(self._pending)
+            snapshot["retry_delay"] = self._retry_delay()
+        snapshot["flush_interval"] = self.flush_interval
+        return snapshot
+
+
+_WRITE_QUEUE = _WriteQueue(
+    flush_interval=WRITE_QUEUE_FLUSH_INTERVAL_SECONDS,
+    max_attempts=WRITE_QUEUE_MAX_ATTEMPTS,
+    retry_max_delay=WRITE_QUEUE_RETRY_MAX_DELAY_SECONDS,
+)
+
+
+def flush_pending_writes() -> int:
+    """Commit every queued write now and return how many rows were written.
+
+    Call this before reading data that was just updated through one of the
+    queued helpers (read-your-writes).
+    """
+
+    return _WRITE_QUEUE.flush()
+
+
+def get_write_queue_stats() -> Dict[str, Any]:
+    """Return counters describing the group-commit write queue."""
+
+    return _WRITE_QUEUE.stats()
+
+
+def _flush_pending_writes_at_exit() -> None:
+    try:
+        _WRITE_QUEUE.flush()
+    except Exception:
+        logger.exception("Failed to flush queued database writes at exit")
+
+
+atexit.register(_flush_pending_writes_at_exit)
+
+
+class _AnalyticsSnapshot:
+    """Read-only copy of the database used for analytics queries.
+
+    The copy lives next to the database as ``<name>.analytics<suffix>``.  It is
+    written to a temporary file with ``Connection.backup`` (a WAL read
+    transaction, so submissions keep committing meanwhile) and swapped in
+    with ``os.replace``.  Readers open it with ``immutable=1`` and therefore
+    take no locks at all; connections opened before a swap keep reading the
+    previous copy.  Its age is the file's mtime, so worker processes sharing
+    the database also share the copy.
+
+    No request waits for a backup: a reader that finds the copy stale keeps
+    reading it and starts a rebuild on a daemon thread, and until the first
+    copy exists :meth:`connect` returns ``None`` so callers read the live
+    database.  Rebuilds take a non-blocking lock file next to the copy, so
+    only one worker process rebuilds at a time and the others skip theirs.
+    """
+
+    def __init__(self, *, max_age_seconds: float) -> None:
+        self.max_age_seconds = max_age_seconds
+        self._lock = Lock()
+        self._refreshing = False
+        self._stats: Dict[str, Any] = {
+            "reads": 0,
+            "live_reads": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "last_refresh_seconds": None,
+        }
+
+    @staticmethod
+    def path_for(db_path: Path) -> Path:
+        return db_path.with_name(f"{db_path.stem}.analytics{db_path.suffix}")
+
+    def connect(self) -> Optional[sqlite3.Connection]:
+        db_path = DB_PATH
+        snapshot_path = self.path_for(db_path)
+        age = self._age_seconds(snapshot_path)
+        if age > self.max_age_seconds:
+            self._refresh_in_background(db_path, snapshot_path)
+        if age == float("inf"):
+            with self._lock:
+                self._stats["live_reads"] += 1
+            return None
+        with self._lock:
+            self._stats["reads"] += 1
+        conn = sqlite3.connect(
+            f"{snapshot_path.resolve().as_uri()}?mode=ro&immutable=1",
+            uri=True,
+            check_same_thread=False,
+            factory=_MeteredConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def refresh(self) -> Path:
+        db_path = DB_PATH
+        snapshot_path = self.path_for(db_path)
+        self._refresh_locked(db_path, snapshot_path, force=True)
+        return snapshot_path
+
+    @staticmethod
+    def _age_seconds(snapshot_path: Path) -> float:
+        try:
+            return time.time() - snapshot_path.stat().st_mtime
+        except FileNotFoundError:
+            return float("inf")
+
+    def _refresh_in_background(self, db_path: Path, snapshot_path: Path) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        Thread(
+            target=self._background_refresh,
+            args=(db_path, snapshot_path),
+            name="analytics-snapshot",
+            daemon=True,
+        ).start()
+
+    def _background_refresh(self, db_path: Path, snapshot_path: Path) -> None:
+        try:
+            self._refresh_locked(db_path, snapshot_path, force=False)
+        except Exception:
+            logger.exception("Failed to refresh analytics snapshot %s", snapshot_path)
+            with self._lock:
+                self._stats["refresh_failures"] += 1
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _refresh_locked(self, db_path: Path, snapshot_path: Path, *, force: bool) -> None:
+        lock_path = snapshot_path.with_name(snapshot_path.name + ".lock")
+        with _interprocess_lock(lock_path, blocking=force) as acquired:
+            if not acquired:
+                return
+            if not force and self._age_seconds(snapshot_path) <= self.max_age_seconds:
+                return
+            self._refresh(db_path, snapshot_path)
+
+    def _refresh(self, db_path: Path, snapshot_path: Path) -> None:
+        started = time.monotonic()
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=snapshot_path.name + ".", suffix=".tmp", dir=str(snapshot_path.parent)
+        )
+        os.close(fd)
+        try:
+            source = _CONNECTION_POOL.acquire(db_path)
+            try:
+                target = sqlite3.connect(tmp_path)
+                try:
+                    source.backup(target)
+                    # A rollback-journal copy can be opened read-only without -wal/-shm files.
+                    target.execute("PRAGMA journal_mode = DELETE")
+                finally:
+                    target.close()
+            finally:
+                source.close()
+            os.replace(tmp_path, snapshot_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._stats["refreshes"] += 1
+            self._stats["last_refresh_seconds"] = elapsed
+        logger.info("Refreshed analytics snapshot %s in %.2fs", snapshot_path, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot: Dict[str, Any] = dict(self._stats)
+            snapshot["refreshing"] = self._refreshing
+        snapshot["max_age_seconds"] = self.max_age_seconds
+        snapshot["age_seconds"] = self._age_seconds(self.path_for(DB_PATH))
+        return snapshot
+
+
+_ANALYTICS_SNAPSHOT = _AnalyticsSnapshot(max_age_seconds=ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS)
+
+
+@contextmanager
+def _analytics_connection(
+    function_name: str, snapshot: Optional[bool]
+) -> Iterator[Tuple[sqlite3.Connection, bool]]:
+    """Yield ``(connection, from_snapshot)`` for an analytics query.
+
+    The connection reads the snapshot or, when it is not wanted or not built
+    yet, the live database; ``from_snapshot`` says which.  ``snapshot=None``
+    follows :data:`ANALYTICS_SNAPSHOT_FUNCTIONS`.
+    """
+
+    if snapshot is None:
+        snapshot = ANALYTICS_SNAPSHOT_FUNCTIONS.get(function_name, False)
+    conn = _ANALYTICS_SNAPSHOT.connect() if snapshot else None
+    from_snapshot = conn is not None
+    if conn is None:
+        conn = get_connection()
+    try:
+        yield conn, from_snapshot
+    finally:
+        conn.close()
+
+
+def refresh_analytics_snapshot() -> Path:
+    """Rebuild the analytics snapshot now and return its path."""
+
+    return _ANALYTICS_SNAPSHOT.refresh()
+
+
+def get_analytics_snapshot_stats() -> Dict[str, Any]:
+    """Return read/refresh counters and the current age of the analytics snapshot."""
+
+    return _ANALYTICS_SNAPSHOT.stats()
+
+
+@contextmanager
+def _interprocess_lock(path: Path, *, blocking: bool = True) -> Iterator[bool]:
+    """Hold an exclusive advisory lock on ``path`` shared by every process.
+
+    With ``blocking=False`` the lock is only tried once; the context then
+    yields whether it was acquired.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as handle:
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+        else:  # pragma: no cover - Windows
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if not blocking:
+                        yield False
+                        return
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:  # pragma: no cover - Windows
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _expected_init_marker() -> str:
+    """Return the marker a fully initialised database carries for this code and seed."""
+
+    try:
+        seed_digest = hashlib.sha1(SEED_PATH.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        seed_digest = "missing"
+    return f"schema={SCHEMA_VERSION};seed_format={_SEED_STATE_FORMAT};seed={seed_digest}"
+
+
+def _read_init_marker(conn: sqlite3.Connection) -> Optional[str]:
+    try:
+        return _get_maintenance_value(conn.cursor(), _INIT_MARKER_KEY)
+    except sqlite3.OperationalError:
+        # Fresh database without maintenance_state yet.
+        return None
+
+
+def initialize_database(*, force: bool = False) -> None:
+    """Create the SQLite database (if necessary) and seed master data.
+
+    Only one process migrates and seeds at a time: the work runs under a file
+    lock next to :data:`DB_PATH`, and a marker in ``maintenance_state`` lets
+    every later process (and every process that waited for the lock) return
+    after a single lookup when schema and seed file are unchanged.
+    """
+
+    global _DATABASE_INITIALISED
+
+    if _DATABASE_INITIALISED and not force:
+        return
+
+    with _INITIALIZE_LOCK:
+        if _DATABASE_INITIALISED and not force:
+            return
+
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        expected_marker = _expected_init_marker()
+
+        conn = get_connection()
+        try:
+            if not force and _read_init_marker(conn) == expected_marker:
+                _DATABASE_INITIALISED = True
+                return
+
+            with _interprocess_lock(DB_PATH.with_name(DB_PATH.name + ".init.lock")):
+                if not force and _read_init_marker(conn) == expected_marker:
+                    logger.info("Database was initialised by another process; skipping")
+                    _DATABASE_INITIALISED = True
+                    return
+
+                _apply_migrations(conn)
+
+                if not SEED_PATH.exists():
+                    seed_payload = _default_seed_payload()
+                    SEED_PATH.write_text(
+                        json.dumps(seed_payload, ensure_ascii=False, indent=2),
+                        encoding="utf-8",
+                    )
+                    seed_payload = _normalise_seed_payload(seed_payload)
+                    expected_marker = _expected_init_marker()
+                else:
+                    seed_payload = _load_seed_file_payload()
+                    if not seed_payload:
+                        logger.warning(
+                            "Falling back to bundled seed payload because %s could not be parsed.",
+                            SEED_PATH,
+                        )
+                        seed_payload = _normalise_seed_payload(_default_seed_payload())
+
+                seeded_keys = _seed_problems(conn, seed_payload)
+
+                cur = conn.cursor()
+                _set_maintenance_value(cur, _INIT_MARKER_KEY, expected_marker)
+                conn.commit()
+        finally:
+            conn.close()
+
+        _PROBLEM_CACHE.invalidate_problems(seeded_keys)
+        _DATABASE_INITIALISED = True
+
+
+def _problem_seed_hash(entries: Sequence[Dict[str, Any]]) -> str:
+    """Return a stable content hash for the seed entries of one problem."""
+
+    canonical = json.dumps(
+        [_SEED_STATE_FORMAT, list(entries)],
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def _seed_question_values(question: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Return the ``questions`` column values for a seed question."""
+
+    return (
+        question["prompt"],
+        question.get("character_limit"),
+        question["max_score"],
+        question["model_answer"],
+        question["explanation"],
+        json.dumps(question.get("keywords", []), ensure_ascii=False),
+        json.dumps(question.get("intent_cards", []), ensure_ascii=False),
+        question.get("video_url"),
+        question.get("diagram_path"),
+        question.get("diagram_caption"),
+        json.dumps(question.get("skill_tags", []), ensure_ascii=False)
+        if question.get("skill_tags")
+        else None,
+        question.get("difficulty"),
+    )
+
+
+def _seed_problems(conn: sqlite3.Connection, payload: Dict) -> List[Tuple[str, str]]:
+    """Insert or update seed problems whose content changed since the last run.
+
+    Each problem's content hash is stored in ``seed_state``; problems whose
+    hash (and database row) are unchanged are skipped entirely, and the rest
+    are written with batched statements.  Returns the ``(year, case_label)``
+    keys that were written.
+    """
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT year, case_label, content_hash, problem_id FROM seed_state")
+    seed_state = {
+        (row["year"], row["case_label"]): (row["content_hash"], row["problem_id"])
+        for row in cursor.fetchall()
+    }
+    cursor.execute("SELECT id, year, case_label FROM problems")
+    existing_problems: Dict[Tuple[str, str], int] = {}
+    for row in cursor.fetchall():
+        existing_problems.setdefault((row["year"], row["case_label"]), row["id"])
+    existing_ids = set(existing_problems.values())
+
+    # The seed file may list the same (year, case) more than once; later
+    # entries override earlier ones row by row, so hash and write each group
+    # as a unit.
+    grouped: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for problem in payload.get("problems", []):
+        grouped.setdefault((problem["year"], problem["case"]), []).append(problem)
+
+    changed: List[Tuple[Tuple[str, str], List[Dict[str, Any]], str]] = []
+    for key, entries in grouped.items():
+        content_hash = _problem_seed_hash(entries)
+        state = seed_state.get(key)
+        if state and state[0] == content_hash and state[1] in existing_ids:
+            continue
+        changed.append((key, entries, content_hash))
+
+    if not changed:
+        return []
+
+    problem_updates: List[Tuple[Any, ...]] = []
+    problem_ids: Dict[Tuple[str, str], int] = {}
+    for key, entries, _content_hash in changed:
+        problem = entries[-1]
+        metadata_values = (
+            problem.get("difficulty"),
+            json.dumps(problem.get("themes", []), ensure_ascii=False) if problem.get("themes") else None,
+            json.dumps(problem.get("tendencies", []), ensure_ascii=False) if problem.get("tendencies") else None,
+            json.dumps(problem.get("tags", []), ensure_ascii=False) if problem.get("tags") else None,
+            problem.get("source_url"),
+        )
+        problem_id = existing_problems.get(key)
+        if problem_id is not None:
+            problem_updates.append(
+                (
+                    problem["title"],
+                    problem["overview"],
+                    problem.get("context"),
+                    *metadata_values,
+                    problem_id,
+                )
+            )
+        else:
+            cursor.execute(
+                """
+                INSERT INTO problems (
+                    year, case_label, title, overview, context_text, difficulty,
+                    theme_tags_json, tendency_tags_json, topic_tags_json, source_url
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    problem["year"],
+                    problem["case"],
+                    problem["title"],
+                    problem["overview"],
+                    problem.get("context"),
+                    *metadata_values,
+                ),
+            )
+            problem_id = cursor.lastrowid
+            existing_problems[key] = problem_id
+        problem_ids[key] = problem_id
+
+    if problem_updates:
+        cursor.executemany(
+            """
+            UPDATE problems
+            SET title = ?, overview = ?, context_text = ?, difficulty = ?,
+                theme_tags_json = ?, tendency_tags_json = ?, topic_tags_json = ?,
+                source_url = ?
+            WHERE id = ?
+            """,
+            problem_updates,
+        )
+
+    changed_ids = sorted(set(problem_ids.values()))
+    existing_questions: Dict[Tuple[int, int], int] = {}
+    for offset in range(0, len(changed_ids), 500):
+        chunk = changed_ids[offset : offset + 500]
+        placeholders = ",".join("?" for _ in chunk)
+        cursor.execute(
+            f"SELECT id, problem_id, question_order FROM questions WHERE problem_id IN ({placeholders})",
+            tuple(chunk),
+        )
+        for row in cursor.fetchall():
+            existing_questions.setdefault((row["problem_id"], row["question_order"]), row["id"])
+
+    question_updates: List[Tuple[Any, ...]] = []
+    question_inserts: List[Tuple[Any, ...]] = []
+    for key, entries, _content_hash in changed:
+        problem_id = problem_ids[key]
+        question_values: Dict[int, Tuple[Any, ...]] = {}
+        for problem in entries:
+            for order, question in enumerate(problem.get("questions", []), start=1):
+                question_values[order] = _seed_question_values(question)
+        for order, payload_values in question_values.items():
+            question_id = existing_questions.get((problem_id, order))
+            if question_id is not None:
+                question_updates.append((*payload_values, question_id))
+            else:
+                question_inserts.append((problem_id, order, *payload_values))
+
+    if question_updates:
+        cursor.executemany(
+            """
+            UPDATE questions
+            SET prompt = ?, character_limit = ?, max_score = ?, model_answer = ?,
+                explanation = ?, keywords_json = ?, intent_cards_json = ?, video_url = ?,
+                diagram_path = ?, diagram_caption = ?, skill_tags_json = ?,
+                question_difficulty = ?
+            WHERE id = ?
+            """,
+            question_updates,
+        )
+    if question_inserts:
+        cursor.executemany(
+            """
+            INSERT INTO questions (
+                problem_id, question_order, prompt, character_limit, max_score,
+                model_answer, explanation, keywords_json, intent_cards_json, video_url,
+                diagram_path, diagram_caption, skill_tags_json, question_difficulty
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            question_inserts,
+        )
+
+    seeded_at = datetime.utcnow().isoformat()
+    cursor.executemany(
+        """
+        INSERT INTO seed_state (year, case_label, content_hash, problem_id, seeded_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(year, case_label) DO UPDATE SET
+            content_hash = excluded.content_hash,
+            problem_id = excluded.problem_id,
+            seeded_at = excluded.seeded_at
+        """,
+        [
+            (key[0], key[1], content_hash, problem_ids[key], seeded_at)
+            for key, _entries, content_hash in changed
+        ],
+    )
+
+    conn.commit()
+    logger.info("Seeded %s changed problem(s) from %s", len(changed), SEED_PATH)
+    return [key for key, _entries, _content_hash in changed]
+
+
+def _normalise_seed_payload(payload: Any) -> Dict[str, Any]:
+    """Return seed data in the canonical structure used by the seeder.
+
+    Historically the project stored the problem seeds as a flat list of
+    question records. Modern versions expect a dictionary with a top-level
+    ``"problems"`` key containing problem dictionaries, each with a nested
+    ``"questions"`` list. When the legacy shape is detected we convert it into
+    the new representation so that migrations remain backward compatible.
+    """
+
+    if isinstance(payload, dict) and "problems" in payload:
+        return payload
+
+    if not isinstance(payload, list):
+        raise TypeError("Seed payload must be a dict or list of question records")
+
+    problems: Dict[tuple[str, str], Dict[str, Any]] = {}
+
+    def _normalise_keywords(raw: Any) -> List[str]:
+        if isinstance(raw, list):
+            return [str(keyword).strip() for keyword in raw if str(keyword).strip()]
+        if isinstance(raw, str):
+            return [
+                keyword.strip()
+                for keyword in re.split(r"[|,]", raw)
+                if keyword.strip()
+            ]
+        return []
+
+    def _normalise_intent_cards(raw: Any) -> List[Dict[str, Any]]:
+        cards: List[Dict[str, Any]] = []
+
+        def _walk(value: Any) -> None:
+            if isinstance(value, dict):
+                label = value.get("label")
+                example = value.get("example")
+                if label and example:
+                    cards.append({"label": str(label), "example": str(example)})
+            elif isinstance(value, list):
+                for item in value:
+                    _walk(item)
+
+        _walk(raw)
+        if cards:
+            return cards
+
+        if isinstance(raw, str) and raw.strip():
+            for chunk in raw.split("|"):
+                chunk = chunk.strip()
+                if not chunk:
                     continue
                 try:
                     parsed = json.loads(chunk)
@@ -856,71 +2259,536 @@ def _ensure_attempt_answer_axis_column(conn: sqlite3.Connection) -> None:
         conn.commit()
 
 
-def create_user(email: str, name: str, password_hash: Optional[str]) -> int:
-    """Create a new user and return the primary key."""
-    conn = get_connection()
+_BASE_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    password_hash TEXT,
+    plan TEXT NOT NULL DEFAULT 'free',
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS problems (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year TEXT NOT NULL,
+    case_label TEXT NOT NULL,
+    title TEXT NOT NULL,
+    overview TEXT NOT NULL,
+    context_text TEXT,
+    difficulty TEXT,
+    theme_tags_json TEXT,
+    tendency_tags_json TEXT,
+    topic_tags_json TEXT,
+    source_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    problem_id INTEGER NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
+    question_order INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    character_limit INTEGER,
+    max_score REAL NOT NULL,
+    model_answer TEXT NOT NULL,
+    explanation TEXT NOT NULL,
+    keywords_json TEXT NOT NULL,
+    video_url TEXT,
+    diagram_path TEXT,
+    diagram_caption TEXT,
+    intent_cards_json TEXT DEFAULT '[]',
+    skill_tags_json TEXT,
+    question_difficulty TEXT
+);
+
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    problem_id INTEGER NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
+    mode TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    submitted_at TEXT,
+    duration_seconds INTEGER,
+    total_score REAL,
+    total_max_score REAL
+);
+
+CREATE TABLE IF NOT EXISTS attempt_answers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    attempt_id INTEGER NOT NULL REFERENCES attempts(id) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+    answer_text TEXT NOT NULL,
+    score REAL,
+    feedback TEXT,
+    keyword_hits_json TEXT,
+    axis_breakdown_json TEXT
+);
+
+CREATE TABLE IF NOT EXISTS attempt_question_activity (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    attempt_id INTEGER NOT NULL REFERENCES attempts(id) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+    opened_at TEXT,
+    first_input_at TEXT,
+    last_updated_at TEXT,
+    total_duration_seconds INTEGER,
+    revision_count INTEGER DEFAULT 0,
+    edit_history_json TEXT
+);
+
+CREATE TABLE IF NOT EXISTS attempt_scoring_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    attempt_id INTEGER NOT NULL REFERENCES attempts(id) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+    question_order INTEGER,
+    logged_at TEXT NOT NULL,
+    max_score REAL,
+    score REAL,
+    keyword_coverage REAL,
+    checkpoints_json TEXT,
+    axis_breakdown_json TEXT,
+    duration_seconds INTEGER,
+    self_evaluation TEXT,
+    notes TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_attempt_scoring_logs_attempt
+    ON attempt_scoring_logs(attempt_id);
+
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    cadence TEXT NOT NULL,
+    interval_days INTEGER NOT NULL,
+    preferred_channels_json TEXT NOT NULL,
+    reminder_time TEXT NOT NULL,
+    next_trigger_at TEXT NOT NULL,
+    last_notified_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS spaced_reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    problem_id INTEGER NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
+    interval_days INTEGER NOT NULL,
+    due_at TEXT NOT NULL,
+    last_reviewed_at TEXT NOT NULL,
+    last_score_ratio REAL,
+    streak INTEGER NOT NULL DEFAULT 0,
+    UNIQUE(user_id, problem_id)
+);
+
+CREATE TABLE IF NOT EXISTS study_goals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    period_type TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    target_practice_count INTEGER NOT NULL,
+    target_study_minutes INTEGER NOT NULL,
+    target_score REAL NOT NULL,
+    preferred_start_time TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE(user_id, period_type, start_date)
+);
+
+CREATE TABLE IF NOT EXISTS study_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    goal_id INTEGER NOT NULL REFERENCES study_goals(id) ON DELETE CASCADE,
+    session_date TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    duration_minutes INTEGER NOT NULL,
+    description TEXT,
+    created_at TEXT NOT NULL,
+    UNIQUE(goal_id, session_date, start_time)
+);
+"""
+
+
+def _migration_base_schema(conn: sqlite3.Connection) -> None:
+    """Create the original tables and back-fill columns added over time."""
+
+    conn.executescript(_BASE_SCHEMA_SQL)
+    _ensure_question_multimedia_columns(conn)
+    _ensure_problem_context_columns(conn)
+    _ensure_problem_metadata_columns(conn)
+    _ensure_attempt_answer_axis_column(conn)
+
+
+def _migration_seed_state(conn: sqlite3.Connection) -> None:
+    """Track per-problem seed content hashes for incremental seeding."""
+
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS seed_state (
+            year TEXT NOT NULL,
+            case_label TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            problem_id INTEGER NOT NULL,
+            seeded_at TEXT NOT NULL,
+            PRIMARY KEY (year, case_label)
+        );
+        """
+    )
+
+
+def _migration_user_question_stats(conn: sqlite3.Connection) -> None:
+    """Create the per-learner question aggregate table and back-fill it."""
+
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS user_question_stats (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+            attempt_count INTEGER NOT NULL DEFAULT 0,
+            ratio_count INTEGER NOT NULL DEFAULT 0,
+            ratio_total REAL NOT NULL DEFAULT 0,
+            best_ratio REAL,
+            last_ratio REAL,
+            last_score REAL,
+            last_submitted_at TEXT,
+            PRIMARY KEY (user_id, question_id)
+        ) WITHOUT ROWID;
+        """
+    )
+    rebuild_user_question_stats(conn=conn)
+
+
+def _migration_question_global_stats(conn: sqlite3.Connection) -> None:
+    """Create the materialised cross-user question statistics."""
+
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS maintenance_state (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            updated_at TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS question_global_stats (
+            question_id INTEGER PRIMARY KEY REFERENCES questions(id) ON DELETE CASCADE,
+            attempt_count INTEGER NOT NULL DEFAULT 0,
+            score_count INTEGER NOT NULL DEFAULT 0,
+            score_total REAL NOT NULL DEFAULT 0,
+            ratio_count INTEGER NOT NULL DEFAULT 0,
+            ratio_total REAL NOT NULL DEFAULT 0,
+            best_score REAL,
+            coverage_count INTEGER NOT NULL DEFAULT 0,
+            coverage_total REAL NOT NULL DEFAULT 0,
+            updated_at TEXT
+        );
+        """
+    )
+    refresh_question_global_stats(conn=conn)
+
+
+def _migration_answer_keyword_hits(conn: sqlite3.Connection) -> None:
+    """Normalise ``keyword_hits_json`` into a keyword dictionary and hit table."""
+
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS keyword_dictionary (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            keyword TEXT UNIQUE NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS answer_keyword_hits (
+            answer_id INTEGER NOT NULL REFERENCES attempt_answers(id) ON DELETE CASCADE,
+            keyword_id INTEGER NOT NULL REFERENCES keyword_dictionary(id),
+            hit INTEGER NOT NULL,
+            PRIMARY KEY (answer_id, keyword_id)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_answer_keyword_hits_keyword
+            ON answer_keyword_hits(keyword_id, hit);
+        """
+    )
+
+    read_cur = conn.cursor()
+    write_cur = conn.cursor()
+    read_cur.execute(
+        "SELECT id, keyword_hits_json FROM attempt_answers WHERE keyword_hits_json IS NOT NULL"
+    )
+    while True:
+        batch = read_cur.fetchmany(1000)
+        if not batch:
+            break
+        entries: List[Tuple[int, Dict[str, Any]]] = []
+        for row in batch:
+            try:
+                hits = json.loads(row["keyword_hits_json"])
+            except (TypeError, ValueError):
+                continue
+            entries.append((row["id"], hits))
+        _write_answer_keyword_hits(write_cur, entries)
+    conn.commit()
+
+
+def _migration_packed_feedback(conn: sqlite3.Connection) -> None:
+    """Store answer feedback dictionary-compressed in ``feedback_packed``."""
+
+    conn.execute("ALTER TABLE attempt_answers ADD COLUMN feedback_packed BLOB")
+
+    read_cur = conn.cursor()
+    write_cur = conn.cursor()
+    read_cur.execute(
+        "SELECT id, feedback FROM attempt_answers "
+        "WHERE feedback IS NOT NULL AND feedback_packed IS NULL"
+    )
+    while True:
+        batch = read_cur.fetchmany(1000)
+        if not batch:
+            break
+        updates = []
+        for row in batch:
+            feedback, packed = _pack_feedback(row["feedback"])
+            if packed is not None:
+                updates.append((feedback, packed, row["id"]))
+        write_cur.executemany(
+            "UPDATE attempt_answers SET feedback = ?, feedback_packed = ? WHERE id = ?",
+            updates,
+        )
+    conn.commit()
+
+
+def _migration_activity_archive(conn: sqlite3.Connection) -> None:
+    """Add the archive table used by :func:`compact_attempt_activity`."""
+
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS attempt_question_activity_archive (
+            activity_id INTEGER PRIMARY KEY
+                REFERENCES attempt_question_activity(id) ON DELETE CASCADE,
+            archived_at TEXT NOT NULL,
+            edit_history_packed BLOB NOT NULL
+        );
+        """
+    )
+
+
+def _add_column_if_missing(
+    conn: sqlite3.Connection, table: str, column: str, declaration: str
+) -> None:
+    """Add ``column`` to ``table`` unless an interrupted migration already did.
+
+    ``ALTER TABLE`` commits on its own, so a migration killed during its
+    backfill leaves the column behind while ``schema_version`` still points
+    at the previous step; the retry must not add it again.
+    """
+
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+def _migration_epoch_timestamps(conn: sqlite3.Connection) -> None:
+    """Add indexed epoch-second copies of ``due_at`` and ``submitted_at``."""
+
+    _add_column_if_missing(conn, "spaced_reviews", "due_epoch", "INTEGER")
+    _add_column_if_missing(conn, "attempts", "submitted_epoch", "INTEGER")
+
     cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO users (email, name, password_hash, created_at) VALUES (?, ?, ?, ?)",
-        (email, name, password_hash, datetime.utcnow().isoformat()),
+    cur.execute("SELECT id, due_at FROM spaced_reviews")
+    cur.executemany(
+        "UPDATE spaced_reviews SET due_epoch = ? WHERE id = ?",
+        [
+            (_to_epoch_seconds(row["due_at"], field="spaced_reviews.due_at"), row["id"])
+            for row in cur.fetchall()
+        ],
+    )
+    cur.execute("SELECT id, submitted_at FROM attempts WHERE submitted_at IS NOT NULL")
+    cur.executemany(
+        "UPDATE attempts SET submitted_epoch = ? WHERE id = ?",
+        [
+            (_to_epoch_seconds(row["submitted_at"], field="attempts.submitted_at"), row["id"])
+            for row in cur.fetchall()
+        ],
+    )
+
+    conn.executescript(
+        """
+        DROP INDEX IF EXISTS idx_spaced_reviews_user_due;
+        CREATE INDEX IF NOT EXISTS idx_spaced_reviews_user_due_epoch
+            ON spaced_reviews(user_id, due_epoch);
+        CREATE INDEX IF NOT EXISTS idx_spaced_reviews_due_epoch
+            ON spaced_reviews(due_epoch, id);
+        CREATE INDEX IF NOT EXISTS idx_attempts_submitted_epoch
+            ON attempts(submitted_epoch);
+        """
     )
     conn.commit()
-    user_id = cur.lastrowid
-    conn.close()
+
+
+def _migration_reminder_trigger_epoch(conn: sqlite3.Connection) -> None:
+    """Index reminders by an epoch-second copy of ``next_trigger_at``."""
+
+    _add_column_if_missing(conn, "reminders", "next_trigger_epoch", "INTEGER")
+    cur = conn.cursor()
+    cur.execute("SELECT id, next_trigger_at FROM reminders")
+    cur.executemany(
+        "UPDATE reminders SET next_trigger_epoch = ? WHERE id = ?",
+        [
+            (
+                _to_epoch_seconds(row["next_trigger_at"], field="reminders.next_trigger_at"),
+                row["id"],
+            )
+            for row in cur.fetchall()
+        ],
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_reminders_next_trigger_epoch
+            ON reminders(next_trigger_epoch, id)
+        """
+    )
+    conn.commit()
+
+
+def _migration_hot_path_indexes(conn: sqlite3.Connection) -> None:
+    """Add indexes used by the history, dashboard and keyword queries."""
+
+    conn.executescript(
+        """
+        CREATE INDEX IF NOT EXISTS idx_attempts_user_submitted
+            ON attempts(user_id, submitted_at);
+        CREATE INDEX IF NOT EXISTS idx_attempt_answers_attempt_question
+            ON attempt_answers(attempt_id, question_id);
+        CREATE INDEX IF NOT EXISTS idx_attempt_answers_question_score
+            ON attempt_answers(question_id, attempt_id, score);
+        CREATE INDEX IF NOT EXISTS idx_questions_problem_order
+            ON questions(problem_id, question_order);
+        CREATE INDEX IF NOT EXISTS idx_problems_year_case
+            ON problems(year, case_label);
+        CREATE INDEX IF NOT EXISTS idx_spaced_reviews_user_due
+            ON spaced_reviews(user_id, due_at);
+        CREATE INDEX IF NOT EXISTS idx_attempt_scoring_logs_attempt_question
+            ON attempt_scoring_logs(attempt_id, question_id, keyword_coverage);
+        DROP INDEX IF EXISTS idx_attempt_scoring_logs_attempt;
+        CREATE INDEX IF NOT EXISTS idx_attempt_question_activity_attempt
+            ON attempt_question_activity(attempt_id, question_id);
+        CREATE INDEX IF NOT EXISTS idx_reminders_user
+            ON reminders(user_id);
+        """
+    )
+
+
+# Ordered schema migrations. Append new steps to the end; never reorder or
+# edit a step that has shipped, because its position is its version number.
+_MIGRATIONS: Tuple[Tuple[str, Callable[[sqlite3.Connection], None]], ...] = (
+    ("base schema", _migration_base_schema),
+    ("hot path indexes", _migration_hot_path_indexes),
+    ("seed state", _migration_seed_state),
+    ("user question stats", _migration_user_question_stats),
+    ("question global stats", _migration_question_global_stats),
+    ("answer keyword hits", _migration_answer_keyword_hits),
+    ("packed answer feedback", _migration_packed_feedback),
+    ("activity archive", _migration_activity_archive),
+    ("epoch timestamps", _migration_epoch_timestamps),
+    ("reminder trigger epoch", _migration_reminder_trigger_epoch),
+)
+
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+def _get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the schema version recorded in ``schema_version`` (0 if absent)."""
+
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return int(row[0] or 0) if row else 0
+
+
+def _apply_migrations(conn: sqlite3.Connection) -> int:
+    """Run pending migrations in order and return the resulting version.
+
+    When the recorded version already matches :data:`SCHEMA_VERSION` no DDL is
+    executed at all, so warm starts only pay for a single ``SELECT``.
+    """
+
+    current = _get_schema_version(conn)
+    if current >= SCHEMA_VERSION:
+        return current
+
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+        """
+    )
+    for version, (description, migrate) in enumerate(_MIGRATIONS, start=1):
+        if version <= current:
+            continue
+        logger.info("Applying schema migration %s: %s", version, description)
+        migrate(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+            (version, description, datetime.utcnow().isoformat()),
+        )
+        conn.commit()
+        current = version
+    return current
+
+
+def create_user(email: str, name: str, password_hash: Optional[str]) -> int:
+    """Create a new user and return the primary key."""
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO users (email, name, password_hash, created_at) VALUES (?, ?, ?, ?)",
+            (email, name, password_hash, datetime.utcnow().isoformat()),
+        )
+        user_id = cur.lastrowid
     return user_id
 
 
 def get_user_by_email(email: str) -> Optional[sqlite3.Row]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM users WHERE email = ?", (email,))
-    row = cur.fetchone()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM users WHERE email = ?", (email,))
+        row = cur.fetchone()
     return row
 
 
 def get_or_create_guest_user() -> sqlite3.Row:
     """Return the shared guest user record, creating it on first use."""
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM users WHERE email = ?", ("guest@example.com",))
-    row = cur.fetchone()
-    if row:
-        conn.close()
-        return row
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM users WHERE email = ?", ("guest@example.com",))
+        row = cur.fetchone()
+        if row:
+            return row
 
-    cur.execute(
-        "INSERT INTO users (email, name, password_hash, created_at) VALUES (?, ?, ?, ?)",
-        ("guest@example.com", "ゲストユーザー", None, datetime.utcnow().isoformat()),
-    )
-    conn.commit()
-    cur.execute("SELECT * FROM users WHERE id = ?", (cur.lastrowid,))
-    row = cur.fetchone()
-    conn.close()
+        cur.execute(
+            "INSERT INTO users (email, name, password_hash, created_at) VALUES (?, ?, ?, ?)",
+            ("guest@example.com", "ゲストユーザー", None, datetime.utcnow().isoformat()),
+        )
+        cur.execute("SELECT * FROM users WHERE id = ?", (cur.lastrowid,))
+        row = cur.fetchone()
     return row
 
 
-def update_user_plan(user_id: int, plan: str) -> None:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("UPDATE users SET plan = ? WHERE id = ?", (plan, user_id))
-    conn.commit()
-    conn.close()
+def update_user_plan(user_id: int, plan: str, *, sync: bool = False) -> None:
+    _WRITE_QUEUE.submit("UPDATE users SET plan = ? WHERE id = ?", user_id, (plan, user_id))
+    if sync:
+        flush_pending_writes()
 
 
 def list_problems() -> List[Dict[str, Any]]:
-    return _list_problems_impl(_seed_file_signature())
+    return _PROBLEM_CACHE.get_or_load("problems", None, _list_problems_impl)
 
 
-@lru_cache(maxsize=1)
-def _list_problems_impl(seed_signature: float) -> List[Dict[str, Any]]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM problems ORDER BY year DESC, case_label ASC")
-    rows = [dict(row) for row in cur.fetchall()]
-    conn.close()
+def _list_problems_impl() -> List[Dict[str, Any]]:
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM problems ORDER BY year DESC, case_label ASC")
+        rows = [dict(row) for row in cur.fetchall()]
 
-    seed_lookup = _load_seed_problem_lookup_cached(seed_signature)
+    seed_lookup = _load_seed_problem_lookup()
     existing_keys = set()
     for row in rows:
         row["themes"] = json.loads(row.get("theme_tags_json") or "[]")
@@ -951,11 +2819,10 @@ def _list_problems_impl(seed_signature: float) -> List[Dict[str, Any]]:
         if seed_problem.get("source_url"):
             row["source_url"] = seed_problem.get("source_url")
 
-    _SEED_ONLY_ID_LOOKUP.clear()
     for (year, case_label), seed_problem in seed_lookup.items():
-        seed_id = _register_seed_only_problem(year, case_label)
         if (year, case_label) in existing_keys:
             continue
+        seed_id = _make_seed_problem_id(year, case_label)
         rows.append(
             {
                 "id": seed_id,
@@ -978,38 +2845,33 @@ def _list_problems_impl(seed_signature: float) -> List[Dict[str, Any]]:
     return rows
 
 
-@lru_cache(maxsize=1)
 def list_problem_years() -> List[str]:
-    return _list_problem_years_impl(_seed_file_signature())
+    return _PROBLEM_CACHE.get_or_load("years", None, _list_problem_years_impl)
 
 
-@lru_cache(maxsize=1)
-def _list_problem_years_impl(seed_signature: float) -> List[str]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT DISTINCT year FROM problems ORDER BY year DESC")
-    years = [row[0] for row in cur.fetchall()]
-    conn.close()
-    seed_years = {year for (year, _case) in _load_seed_problem_lookup_cached(seed_signature).keys()}
+def _list_problem_years_impl() -> List[str]:
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT year FROM problems ORDER BY year DESC")
+        years = [row[0] for row in cur.fetchall()]
+    seed_years = {year for (year, _case) in _load_seed_problem_lookup().keys()}
     merged_years = sorted(set(years) | seed_years, reverse=True)
     return merged_years
 
 
 def list_problem_cases(year: str) -> List[str]:
-    return _list_problem_cases_impl(year, _seed_file_signature())
+    return _PROBLEM_CACHE.get_or_load("cases", year, lambda: _list_problem_cases_impl(year))
 
 
-@lru_cache(maxsize=None)
-def _list_problem_cases_impl(year: str, seed_signature: float) -> List[str]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT DISTINCT case_label FROM problems WHERE year = ? ORDER BY case_label",
-        (year,),
-    )
-    cases = [row[0] for row in cur.fetchall()]
-    conn.close()
-    seed_lookup = _load_seed_problem_lookup_cached(seed_signature)
+def _list_problem_cases_impl(year: str) -> List[str]:
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT DISTINCT case_label FROM problems WHERE year = ? ORDER BY case_label",
+            (year,),
+        )
+        cases = [row[0] for row in cur.fetchall()]
+    seed_lookup = _load_seed_problem_lookup()
     seed_cases = [
         case_label
         for seed_year, case_label in seed_lookup.keys()
@@ -1020,32 +2882,14 @@ def _list_problem_cases_impl(year: str, seed_signature: float) -> List[str]:
 
 
 def fetch_problem(problem_id: int) -> Optional[Dict]:
-    return _fetch_problem_impl(problem_id, _seed_file_signature())
-
+    return _PROBLEM_CACHE.get_or_load(
+        "problem", problem_id, lambda: _fetch_problem_impl(problem_id)
+    )
 
-@lru_cache(maxsize=None)
-def _fetch_problem_impl(problem_id: int, seed_signature: float) -> Optional[Dict]:
-    if problem_id <= 0:
-        seed_lookup = _load_seed_problem_lookup_cached(seed_signature)
-        resolved = _resolve_seed_problem_by_id(problem_id, seed_lookup)
-        if not resolved:
-            return None
-        year, case_label, seed_problem = resolved
-        return _build_problem_from_seed(
-            problem_id=problem_id,
-            year=year,
-            case_label=case_label,
-            seed_problem=seed_problem,
-        )
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM problems WHERE id = ?", (problem_id,))
-    problem_row = cur.fetchone()
-    if not problem_row:
-        conn.close()
-        seed_lookup = _load_seed_problem_lookup_cached(seed_signature)
-        resolved = _resolve_seed_problem_by_id(problem_id, seed_lookup)
+def _fetch_problem_impl(problem_id: int) -> Optional[Dict]:
+    if problem_id <= 0:
+        resolved = _resolve_seed_problem_by_id(problem_id, _load_seed_index())
         if not resolved:
             return None
         year, case_label, seed_problem = resolved
@@ -1056,16 +2900,31 @@ def _fetch_problem_impl(problem_id: int, seed_signature: float) -> Optional[Dict
             seed_problem=seed_problem,
         )
 
-    cur.execute(
-        "SELECT * FROM questions WHERE problem_id = ? ORDER BY question_order",
-        (problem_id,),
-    )
-    question_rows = cur.fetchall()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM problems WHERE id = ?", (problem_id,))
+        problem_row = cur.fetchone()
+        if not problem_row:
+            resolved = _resolve_seed_problem_by_id(problem_id, _load_seed_index())
+            if not resolved:
+                return None
+            year, case_label, seed_problem = resolved
+            return _build_problem_from_seed(
+                problem_id=problem_id,
+                year=year,
+                case_label=case_label,
+                seed_problem=seed_problem,
+            )
+
+        cur.execute(
+            "SELECT * FROM questions WHERE problem_id = ? ORDER BY question_order",
+            (problem_id,),
+        )
+        question_rows = cur.fetchall()
 
     problem_data = dict(problem_row)
 
-    seed_lookup = _load_seed_problem_lookup_cached(seed_signature)
+    seed_lookup = _load_seed_problem_lookup()
     seed_problem = seed_lookup.get((problem_data["year"], problem_data["case_label"]))
     seed_questions: Dict[int, Dict[str, Any]] = {}
     if seed_problem:
@@ -1197,29 +3056,29 @@ def _fetch_problem_impl(problem_id: int, seed_signature: float) -> Optional[Dict
 
 
 def fetch_problem_by_year_case(year: str, case_label: str) -> Optional[Dict]:
-    return _fetch_problem_by_year_case_impl(year, case_label, _seed_file_signature())
-
-
-@lru_cache(maxsize=None)
-def _fetch_problem_by_year_case_impl(
-    year: str, case_label: str, seed_signature: float
-) -> Optional[Dict]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT id FROM problems WHERE year = ? AND case_label = ?",
+    return _PROBLEM_CACHE.get_or_load(
+        "problem_by_year_case",
         (year, case_label),
+        lambda: _fetch_problem_by_year_case_impl(year, case_label),
     )
-    row = cur.fetchone()
-    conn.close()
+
+
+def _fetch_problem_by_year_case_impl(year: str, case_label: str) -> Optional[Dict]:
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT id FROM problems WHERE year = ? AND case_label = ?",
+            (year, case_label),
+        )
+        row = cur.fetchone()
     if row:
-        return _fetch_problem_impl(row["id"], seed_signature)
+        return fetch_problem(row["id"])
 
-    seed_lookup = _load_seed_problem_lookup_cached(seed_signature)
+    seed_lookup = _load_seed_problem_lookup()
     seed_problem = seed_lookup.get((year, case_label))
     if not seed_problem:
         return None
-    seed_id = _register_seed_only_problem(year, case_label)
+    seed_id = _make_seed_problem_id(year, case_label)
     return _build_problem_from_seed(
         problem_id=seed_id,
         year=year,
@@ -1228,6 +3087,67 @@ def _fetch_problem_by_year_case_impl(
     )
 
 
+# Preset zlib dictionaries for ``attempt_answers.feedback_packed``, keyed by the
+# version byte that prefixes each packed value.  They hold the fixed phrases of
+# the report built by ``scoring.score_answer`` so a stored feedback costs little
+# more than its variable parts.  Any text still round-trips if the report
+# changes; it merely compresses less.  Never edit a published dictionary: add
+# a new version and keep the old one for decoding.
+_FEEDBACK_DICTIONARIES: Dict[int, bytes] = {
+    1: (
+        "平均文長は文字（全体文字）でした。"
+        "類似度、論理接続語件（文中）を検出しました。"
+        "件の採点キーワードを含みました。"
+        "回答が入力されていません。"
+        "自分の言葉で答案をまとめようとしている点は評価できます。"
+        "模範解答との方向性は合っています。表現を磨くとさらに良くなります。"
+        "模範解答と主旨が近く、論理展開も概ね整っています。"
+        "キーワードに件触れており、論点を一部捉えています。"
+        "主要キーワードをバランス良く押さえています。"
+        "細部の表現を磨くと、より説得力の高い答案になります。"
+        "模範解答と論点がずれている可能性があります。因果関係を意識した構成を意識してください。"
+        "解答内に重要キーワードが少ないため、設問要求を再確認しましょう。"
+        "」に触れると加点につながります。"
+        "【得点サマリー】総合スコア比率: 0.00 (類似度: 0.00 / キーワード網羅率: 0.00)\n\n"
+        "【観点別スコア】\n- キーワード含有率: 0.00 (\n- 構成の論理性: 0.00 (類似度0.00、論理接続語"
+        "\n- 表現の明快さ: 0.00 (平均文長は\n\n"
+        "【良かった点】\n- \n\n【改善が必要な点】\n- 「\n\n【学習すべきキーワード】\n- \n\n"
+        "【改善のヒント】\n- 設問文から与件企業の課題・強みを抜き出し、"
+        "キーワードを盛り込んだうえで因果を意識して記述しましょう。"
+    ).encode("utf-8"),
+}
+_FEEDBACK_DICTIONARY_VERSION = 1
+
+
+def _pack_feedback(feedback: Optional[str]) -> Tuple[Optional[str], Optional[bytes]]:
+    """Return the ``(feedback, feedback_packed)`` column values for a feedback text.
+
+    Text that does not get smaller when packed (e.g. short messages) is kept
+    as plain text.
+    """
+
+    if not feedback:
+        return feedback, None
+    raw = feedback.encode("utf-8")
+    compressor = zlib.compressobj(
+        9, zlib.DEFLATED, -15, zdict=_FEEDBACK_DICTIONARIES[_FEEDBACK_DICTIONARY_VERSION]
+    )
+    packed = bytes([_FEEDBACK_DICTIONARY_VERSION]) + compressor.compress(raw) + compressor.flush()
+    if len(packed) >= len(raw):
+        return feedback, None
+    return None, packed
+
+
+def _render_feedback(feedback: Optional[str], packed: Optional[bytes]) -> Optional[str]:
+    """Return the feedback text stored either verbatim or packed."""
+
+    if packed is None:
+        return feedback
+    decompressor = zlib.decompressobj(-15, zdict=_FEEDBACK_DICTIONARIES[packed[0]])
+    raw = decompressor.decompress(packed[1:]) + decompressor.flush()
+    return raw.decode("utf-8")
+
+
 class RecordedAnswer:
     """Container for a scored answer associated with a question."""
 
@@ -1272,20 +3192,62 @@ class RecordedAnswer:
         )
 
 
-def record_attempt(
+class AttemptSubmission:
+    """One case of a multi-case submission passed to :func:`record_attempts_bulk`."""
+
+    __slots__ = (
+        "problem_id",
+        "answers",
+        "started_at",
+        "submitted_at",
+        "duration_seconds",
+        "score_ratio",
+    )
+
+    def __init__(
+        self,
+        problem_id: int,
+        answers: Iterable[RecordedAnswer],
+        started_at: datetime,
+        submitted_at: datetime,
+        duration_seconds: Optional[int],
+        score_ratio: Optional[float] = None,
+    ) -> None:
+        self.problem_id = problem_id
+        self.answers = list(answers)
+        self.started_at = started_at
+        self.submitted_at = submitted_at
+        self.duration_seconds = duration_seconds
+        self.score_ratio = score_ratio
+
+    def __repr__(self) -> str:  # pragma: no cover - convenience representation
+        return (
+            "AttemptSubmission("
+            f"problem_id={self.problem_id!r}, "
+            f"answers={self.answers!r}, "
+            f"started_at={self.started_at!r}, "
+            f"submitted_at={self.submitted_at!r}, "
+            f"duration_seconds={self.duration_seconds!r}, "
+            f"score_ratio={self.score_ratio!r})"
+        )
+
+
+def _insert_attempt(
+    cur: sqlite3.Cursor,
+    *,
     user_id: int,
     problem_id: int,
     mode: str,
-    answers: Iterable[RecordedAnswer],
+    answers: Sequence[RecordedAnswer],
     started_at: datetime,
     submitted_at: datetime,
     duration_seconds: Optional[int],
-) -> int:
-    """Persist an attempt with its answers."""
-    conn = get_connection()
-    cur = conn.cursor()
+) -> Tuple[int, float, float]:
+    """Insert an attempt and its child rows without committing.
+
+    Returns ``(attempt_id, total_score, total_max_score)``.
+    """
 
-    answers = list(answers)
     total_score = sum(answer.score for answer in answers)
 
     cur.execute(
@@ -1307,9 +3269,9 @@ def record_attempt(
     cur.execute(
         """
         INSERT INTO attempts (
-            user_id, problem_id, mode, started_at, submitted_at, duration_seconds,
-            total_score, total_max_score
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            user_id, problem_id, mode, started_at, submitted_at, submitted_epoch,
+            duration_seconds, total_score, total_max_score
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         (
             user_id,
@@ -1317,30 +3279,30 @@ def record_attempt(
             mode,
             started_at.isoformat(),
             submitted_at.isoformat(),
+            _to_epoch_seconds(submitted_at),
             duration_seconds,
             total_score,
             total_max_score,
         ),
     )
     attempt_id = cur.lastrowid
+    submitted_value = submitted_at.isoformat()
 
+    answer_rows: List[Tuple[Any, ...]] = []
+    log_rows: List[Tuple[Any, ...]] = []
+    activity_rows: List[Tuple[Any, ...]] = []
     for answer in answers:
-        cur.execute(
-            """
-            INSERT INTO attempt_answers (
-                attempt_id, question_id, answer_text, score, feedback,
-                keyword_hits_json, axis_breakdown_json
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
+        axis_json = json.dumps(answer.axis_breakdown, ensure_ascii=False)
+        answer_rows.append(
             (
                 attempt_id,
                 answer.question_id,
                 answer.answer_text,
                 answer.score,
-                answer.feedback,
+                *_pack_feedback(answer.feedback),
                 json.dumps(answer.keyword_hits, ensure_ascii=False),
-                json.dumps(answer.axis_breakdown, ensure_ascii=False),
-            ),
+                axis_json,
+            )
         )
 
         activity = answer.activity or {}
@@ -1351,11 +3313,11 @@ def record_attempt(
         coverage_ratio = None
         if total_keywords:
             coverage_ratio = sum(1 for hit in keyword_hits.values() if hit) / total_keywords
-        duration_seconds = activity.get("total_duration_seconds") if activity else None
+        question_duration = activity.get("total_duration_seconds") if activity else None
         try:
             duration_value = (
-                int(duration_seconds)
-                if duration_seconds is not None
+                int(question_duration)
+                if question_duration is not None
                 else None
             )
         except (TypeError, ValueError):
@@ -1365,36 +3327,23 @@ def record_attempt(
         if answer.axis_breakdown:
             checkpoints["axes"] = answer.axis_breakdown
 
-        cur.execute(
-            """
-            INSERT INTO attempt_scoring_logs (
-                attempt_id, question_id, question_order, logged_at, max_score, score,
-                keyword_coverage, checkpoints_json, axis_breakdown_json,
-                duration_seconds, self_evaluation, notes
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)
-            """,
+        log_rows.append(
             (
                 attempt_id,
                 answer.question_id,
                 question_info.get("order"),
-                submitted_at.isoformat(),
+                submitted_value,
                 question_info.get("max_score"),
                 answer.score,
                 coverage_ratio,
                 json.dumps(checkpoints, ensure_ascii=False),
-                json.dumps(answer.axis_breakdown, ensure_ascii=False),
+                axis_json,
                 duration_value,
-            ),
+            )
         )
 
         if activity:
-            cur.execute(
-                """
-                INSERT INTO attempt_question_activity (
-                    attempt_id, question_id, opened_at, first_input_at, last_updated_at,
-                    total_duration_seconds, revision_count, edit_history_json
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
+            activity_rows.append(
                 (
                     attempt_id,
                     answer.question_id,
@@ -1406,40 +3355,686 @@ def record_attempt(
                     json.dumps(activity.get("edit_history", []), ensure_ascii=False)
                     if activity.get("edit_history")
                     else None,
-                ),
+                )
+            )
+
+    cur.executemany(
+        """
+        INSERT INTO attempt_answers (
+            attempt_id, question_id, answer_text, score, feedback, feedback_packed,
+            keyword_hits_json, axis_breakdown_json
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        answer_rows,
+    )
+    cur.executemany(
+        """
+        INSERT INTO attempt_scoring_logs (
+            attempt_id, question_id, question_order, logged_at, max_score, score,
+            keyword_coverage, checkpoints_json, axis_breakdown_json,
+            duration_seconds, self_evaluation, notes
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)
+        """,
+        log_rows,
+    )
+    if activity_rows:
+        cur.executemany(
+            """
+            INSERT INTO attempt_question_activity (
+                attempt_id, question_id, opened_at, first_input_at, last_updated_at,
+                total_duration_seconds, revision_count, edit_history_json
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            activity_rows,
+        )
+
+    cur.execute("SELECT id FROM attempt_answers WHERE attempt_id = ? ORDER BY id", (attempt_id,))
+    answer_ids = [row["id"] for row in cur.fetchall()]
+    _write_answer_keyword_hits(
+        cur,
+        (
+            (answer_id, answer.keyword_hits or {})
+            for answer_id, answer in zip(answer_ids, answers)
+        ),
+    )
+
+    max_scores = _question_max_scores(cur, answers, question_meta)
+    _accumulate_user_question_stats(
+        cur,
+        user_id=user_id,
+        answers=answers,
+        max_scores=max_scores,
+        submitted_at=submitted_value,
+    )
+    _accumulate_question_global_stats(
+        cur,
+        answers=answers,
+        max_scores=max_scores,
+        keyword_coverage={row[1]: row[6] for row in log_rows},
+        updated_at=submitted_value,
+    )
+
+    return attempt_id, total_score, total_max_score
+
+
+def _keyword_ids(cur: sqlite3.Cursor, keywords: Iterable[str]) -> Dict[str, int]:
+    """Return dictionary ids for ``keywords``, registering unseen ones."""
+
+    unique = sorted({str(keyword) for keyword in keywords})
+    if not unique:
+        return {}
+    cur.executemany(
+        "INSERT OR IGNORE INTO keyword_dictionary (keyword) VALUES (?)",
+        [(keyword,) for keyword in unique],
+    )
+    ids: Dict[str, int] = {}
+    for offset in range(0, len(unique), 500):
+        chunk = unique[offset : offset + 500]
+        placeholders = ",".join("?" for _ in chunk)
+        cur.execute(
+            f"SELECT id, keyword FROM keyword_dictionary WHERE keyword IN ({placeholders})",
+            tuple(chunk),
+        )
+        for row in cur.fetchall():
+            ids[row["keyword"]] = row["id"]
+    return ids
+
+
+def _write_answer_keyword_hits(
+    cur: sqlite3.Cursor, entries: Iterable[Tuple[int, Dict[str, Any]]]
+) -> int:
+    """Insert normalised keyword hit rows for ``(answer_id, keyword_hits)`` pairs."""
+
+    entries = [(answer_id, hits) for answer_id, hits in entries if isinstance(hits, dict) and hits]
+    if not entries:
+        return 0
+    keyword_ids = _keyword_ids(cur, (keyword for _answer_id, hits in entries for keyword in hits))
+    rows = [
+        (answer_id, keyword_ids[str(keyword)], 1 if hit else 0)
+        for answer_id, hits in entries
+        for keyword, hit in hits.items()
+    ]
+    cur.executemany(
+        "INSERT OR REPLACE INTO answer_keyword_hits (answer_id, keyword_id, hit) VALUES (?, ?, ?)",
+        rows,
+    )
+    return len(rows)
+
+
+def _question_max_scores(
+    cur: sqlite3.Cursor,
+    answers: Sequence[RecordedAnswer],
+    question_meta: Dict[int, Dict[str, Any]],
+) -> Dict[int, Optional[float]]:
+    """Return ``max_score`` for every answered question that exists."""
+
+    max_scores = {question_id: meta.get("max_score") for question_id, meta in question_meta.items()}
+    missing = sorted({answer.question_id for answer in answers} - set(max_scores))
+    if missing:
+        placeholders = ",".join("?" for _ in missing)
+        cur.execute(
+            f"SELECT id, max_score FROM questions WHERE id IN ({placeholders})",
+            tuple(missing),
+        )
+        for row in cur.fetchall():
+            max_scores[row["id"]] = row["max_score"]
+    return max_scores
+
+
+def _practice_ratio(score: Optional[float], max_score: Optional[float]) -> Optional[float]:
+    """Return the clamped score ratio used by the practice statistics."""
+
+    if score is None or not max_score:
+        return None
+    return max(min(score / max_score, 1.0), 0.0)
+
+
+def _accumulate_user_question_stats(
+    cur: sqlite3.Cursor,
+    *,
+    user_id: int,
+    answers: Sequence[RecordedAnswer],
+    max_scores: Dict[int, Optional[float]],
+    submitted_at: str,
+) -> None:
+    """Fold newly recorded answers into ``user_question_stats``."""
+
+    rows: List[Tuple[Any, ...]] = []
+    for answer in answers:
+        if answer.question_id not in max_scores:
+            continue
+        ratio = _practice_ratio(answer.score, max_scores[answer.question_id])
+        rows.append(
+            (
+                user_id,
+                answer.question_id,
+                1 if ratio is not None else 0,
+                ratio or 0.0,
+                ratio,
+                ratio,
+                answer.score,
+                submitted_at,
+            )
+        )
+    if not rows:
+        return
+
+    cur.executemany(
+        """
+        INSERT INTO user_question_stats (
+            user_id, question_id, attempt_count, ratio_count, ratio_total,
+            best_ratio, last_ratio, last_score, last_submitted_at
+        ) VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, question_id) DO UPDATE SET
+            attempt_count = attempt_count + 1,
+            ratio_count = ratio_count + excluded.ratio_count,
+            ratio_total = ratio_total + excluded.ratio_total,
+            best_ratio = CASE
+                WHEN excluded.best_ratio IS NULL THEN best_ratio
+                WHEN best_ratio IS NULL OR excluded.best_ratio > best_ratio THEN excluded.best_ratio
+                ELSE best_ratio
+            END,
+            last_ratio = CASE
+                WHEN excluded.last_ratio IS NOT NULL
+                    AND (last_submitted_at IS NULL OR excluded.last_submitted_at >= last_submitted_at)
+                THEN excluded.last_ratio
+                ELSE last_ratio
+            END,
+            last_score = CASE
+                WHEN last_submitted_at IS NULL OR excluded.last_submitted_at >= last_submitted_at
+                THEN excluded.last_score
+                ELSE last_score
+            END,
+            last_submitted_at = CASE
+                WHEN last_submitted_at IS NULL OR excluded.last_submitted_at >= last_submitted_at
+                THEN excluded.last_submitted_at
+                ELSE last_submitted_at
+            END
+        """,
+        rows,
+    )
+
+
+def _accumulate_question_global_stats(
+    cur: sqlite3.Cursor,
+    *,
+    answers: Sequence[RecordedAnswer],
+    max_scores: Dict[int, Optional[float]],
+    keyword_coverage: Dict[int, Optional[float]],
+    updated_at: str,
+) -> None:
+    """Fold newly recorded answers into ``question_global_stats``."""
+
+    rows: List[Tuple[Any, ...]] = []
+    for answer in answers:
+        if answer.question_id not in max_scores:
+            continue
+        max_score = max_scores[answer.question_id]
+        score = answer.score
+        ratio = score / max_score if score is not None and max_score and max_score > 0 else None
+        coverage = keyword_coverage.get(answer.question_id)
+        rows.append(
+            (
+                answer.question_id,
+                1 if score is not None else 0,
+                score or 0.0,
+                1 if ratio is not None else 0,
+                ratio or 0.0,
+                score,
+                1 if coverage is not None else 0,
+                coverage or 0.0,
+                updated_at,
+            )
+        )
+    if not rows:
+        return
+
+    cur.executemany(
+        """
+        INSERT INTO question_global_stats (
+            question_id, attempt_count, score_count, score_total, ratio_count,
+            ratio_total, best_score, coverage_count, coverage_total, updated_at
+        ) VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(question_id) DO UPDATE SET
+            attempt_count = attempt_count + 1,
+            score_count = score_count + excluded.score_count,
+            score_total = score_total + excluded.score_total,
+            ratio_count = ratio_count + excluded.ratio_count,
+            ratio_total = ratio_total + excluded.ratio_total,
+            best_score = CASE
+                WHEN excluded.best_score IS NULL THEN best_score
+                WHEN best_score IS NULL OR excluded.best_score > best_score THEN excluded.best_score
+                ELSE best_score
+            END,
+            coverage_count = coverage_count + excluded.coverage_count,
+            coverage_total = coverage_total + excluded.coverage_total,
+            updated_at = excluded.updated_at
+        """,
+        rows,
+    )
+
+
+def refresh_question_global_stats(*, conn: Optional[sqlite3.Connection] = None) -> int:
+    """Recompute ``question_global_stats`` from all recorded answers.
+
+    Incremental updates keep the table current between refreshes; a full
+    refresh corrects drift after answers are deleted or question maxima
+    change.  Records the refresh time under ``question_global_stats_refreshed_at``
+    in ``maintenance_state`` and returns the number of rows written.  A
+    passed ``conn`` is left for the caller to commit.
+    """
+
+    refreshed_at = datetime.utcnow().isoformat()
+    with _connection() if conn is None else nullcontext(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM question_global_stats")
+        cur.execute(
+            """
+            INSERT INTO question_global_stats (
+                question_id, attempt_count, score_count, score_total, ratio_count,
+                ratio_total, best_score, coverage_count, coverage_total, updated_at
+            )
+            SELECT
+                aa.question_id,
+                COUNT(*),
+                COUNT(aa.score),
+                COALESCE(SUM(aa.score), 0),
+                COUNT(CASE WHEN q.max_score > 0 THEN aa.score END),
+                COALESCE(SUM(CASE WHEN q.max_score > 0 THEN aa.score / q.max_score END), 0),
+                MAX(aa.score),
+                COUNT(log.keyword_coverage),
+                COALESCE(SUM(log.keyword_coverage), 0),
+                ?
+            FROM attempt_answers aa
+            JOIN questions q ON q.id = aa.question_id
+            LEFT JOIN attempt_scoring_logs log
+                ON log.attempt_id = aa.attempt_id AND log.question_id = aa.question_id
+            GROUP BY aa.question_id
+            """,
+            (refreshed_at,),
+        )
+        count = cur.rowcount
+        _set_maintenance_value(cur, "question_global_stats_refreshed_at", refreshed_at)
+    return int(count or 0)
+
+
+def _get_maintenance_value(cur: sqlite3.Cursor, key: str) -> Optional[str]:
+    """Return a value stored in ``maintenance_state`` (``None`` when unset)."""
+
+    cur.execute("SELECT value FROM maintenance_state WHERE key = ?", (key,))
+    row = cur.fetchone()
+    return row["value"] if row else None
+
+
+def _set_maintenance_value(cur: sqlite3.Cursor, key: str, value: Optional[str]) -> None:
+    """Store a value in ``maintenance_state`` without committing."""
+
+    cur.execute(
+        """
+        INSERT INTO maintenance_state (key, value, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+        """,
+        (key, value, datetime.utcnow().isoformat()),
+    )
+
+
+def rebuild_user_question_stats(
+    user_id: Optional[int] = None, *, conn: Optional[sqlite3.Connection] = None
+) -> int:
+    """Recompute ``user_question_stats`` from the raw answers.
+
+    Rebuilds a single learner when ``user_id`` is given, otherwise everyone.
+    Use after bulk imports or when question ``max_score`` values change, since
+    stored ratios are computed with the maximum in force when an answer was
+    recorded.  Returns the number of aggregated rows written.  A passed
+    ``conn`` is left for the caller to commit.
+    """
+
+    where_clause = "WHERE a.user_id = ?" if user_id is not None else ""
+    params: Tuple[Any, ...] = (user_id,) if user_id is not None else ()
+    with _connection() if conn is None else nullcontext(conn) as conn:
+        cur = conn.cursor()
+        if user_id is not None:
+            cur.execute("DELETE FROM user_question_stats WHERE user_id = ?", (user_id,))
+        else:
+            cur.execute("DELETE FROM user_question_stats")
+
+        cur.execute(
+            f"""
+            SELECT
+                a.user_id,
+                aa.question_id,
+                aa.score,
+                q.max_score,
+                COALESCE(a.submitted_at, a.started_at) AS submitted_at
+            FROM attempt_answers aa
+            JOIN attempts a ON a.id = aa.attempt_id
+            JOIN questions q ON q.id = aa.question_id
+            {where_clause}
+            ORDER BY a.user_id, aa.question_id, submitted_at ASC, aa.id ASC
+            """,
+            params,
+        )
+
+        aggregated: List[Tuple[Any, ...]] = []
+        current_key: Optional[Tuple[int, int]] = None
+        entry: Dict[str, Any] = {}
+
+        def _flush() -> None:
+            if current_key is None:
+                return
+            aggregated.append(
+                (
+                    current_key[0],
+                    current_key[1],
+                    entry["attempt_count"],
+                    entry["ratio_count"],
+                    entry["ratio_total"],
+                    entry["best_ratio"],
+                    entry["last_ratio"],
+                    entry["last_score"],
+                    entry["last_submitted_at"],
+                )
+            )
+
+        for row in cur.fetchall():
+            key = (row["user_id"], row["question_id"])
+            if key != current_key:
+                _flush()
+                current_key = key
+                entry = {
+                    "attempt_count": 0,
+                    "ratio_count": 0,
+                    "ratio_total": 0.0,
+                    "best_ratio": None,
+                    "last_ratio": None,
+                    "last_score": None,
+                    "last_submitted_at": None,
+                }
+            entry["attempt_count"] += 1
+            ratio = _practice_ratio(row["score"], row["max_score"])
+            if ratio is not None:
+                entry["ratio_count"] += 1
+                entry["ratio_total"] += ratio
+                entry["best_ratio"] = (
+                    ratio if entry["best_ratio"] is None else max(entry["best_ratio"], ratio)
+                )
+                entry["last_ratio"] = ratio
+            entry["last_score"] = row["score"]
+            entry["last_submitted_at"] = row["submitted_at"]
+        _flush()
+
+        cur.executemany(
+            """
+            INSERT INTO user_question_stats (
+                user_id, question_id, attempt_count, ratio_count, ratio_total,
+                best_ratio, last_ratio, last_score, last_submitted_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            aggregated,
+        )
+
+    return len(aggregated)
+
+
+def fetch_answers_for_rescoring(after_answer_id: int = 0, *, limit: int = 2000) -> List[Dict[str, Any]]:
+    """Return the next ``limit`` recorded answers with ``attempt_answers.id > after_answer_id``.
+
+    Rows are ordered by answer id so callers can stream the whole table in
+    keyset batches.
+    """
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT aa.id, aa.attempt_id, aa.question_id, aa.answer_text, aa.score,
+                   q.problem_id, q.max_score
+            FROM attempt_answers aa
+            JOIN questions q ON q.id = aa.question_id
+            WHERE aa.id > ?
+            ORDER BY aa.id
+            LIMIT ?
+            """,
+            (after_answer_id, limit),
+        )
+        rows = [dict(row) for row in cur.fetchall()]
+    return rows
+
+
+def apply_rescored_answers(
+    results: Sequence[Dict[str, Any]],
+    *,
+    checkpoint: Optional[Dict[str, Any]] = None,
+) -> int:
+    """Write re-scored answers back in one transaction and return how many changed.
+
+    Each result carries ``answer_id``, ``attempt_id``, ``question_id``,
+    ``score``, ``feedback``, ``keyword_hits`` and ``axis_breakdown``.  The
+    answer rows, their keyword hit rows and scoring logs are rewritten, the
+    affected attempts get their ``total_score`` recomputed, and ``checkpoint``
+    (when given) is stored in the same transaction so an interrupted run can
+    resume exactly after the last written batch.  Per-user and global question
+    stats are not touched; rebuild them once the run is complete.
+    """
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        answer_rows: List[Tuple[Any, ...]] = []
+        log_rows: List[Tuple[Any, ...]] = []
+        for result in results:
+            keyword_hits = result.get("keyword_hits") or {}
+            axis_json = json.dumps(result.get("axis_breakdown") or {}, ensure_ascii=False)
+            coverage_ratio = (
+                sum(1 for hit in keyword_hits.values() if hit) / len(keyword_hits)
+                if keyword_hits
+                else None
+            )
+            checkpoints: Dict[str, Any] = {"keywords": keyword_hits}
+            if result.get("axis_breakdown"):
+                checkpoints["axes"] = result["axis_breakdown"]
+            answer_rows.append(
+                (
+                    result["score"],
+                    *_pack_feedback(result.get("feedback")),
+                    json.dumps(keyword_hits, ensure_ascii=False),
+                    axis_json,
+                    result["answer_id"],
+                )
+            )
+            log_rows.append(
+                (
+                    result["score"],
+                    coverage_ratio,
+                    json.dumps(checkpoints, ensure_ascii=False),
+                    axis_json,
+                    result["attempt_id"],
+                    result["question_id"],
+                )
+            )
+
+        cur.executemany(
+            """
+            UPDATE attempt_answers
+            SET score = ?, feedback = ?, feedback_packed = ?, keyword_hits_json = ?,
+                axis_breakdown_json = ?
+            WHERE id = ?
+            """,
+            answer_rows,
+        )
+        cur.executemany(
+            """
+            UPDATE attempt_scoring_logs
+            SET score = ?, keyword_coverage = ?, checkpoints_json = ?, axis_breakdown_json = ?
+            WHERE attempt_id = ? AND question_id = ?
+            """,
+            log_rows,
+        )
+
+        answer_ids = [result["answer_id"] for result in results]
+        for offset in range(0, len(answer_ids), 500):
+            chunk = answer_ids[offset : offset + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            cur.execute(f"DELETE FROM answer_keyword_hits WHERE answer_id IN ({placeholders})", chunk)
+        _write_answer_keyword_hits(
+            cur, ((result["answer_id"], result.get("keyword_hits") or {}) for result in results)
+        )
+
+        attempt_ids = sorted({result["attempt_id"] for result in results})
+        for offset in range(0, len(attempt_ids), 500):
+            chunk = attempt_ids[offset : offset + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            cur.execute(
+                f"""
+                UPDATE attempts
+                SET total_score = (
+                    SELECT COALESCE(SUM(aa.score), 0) FROM attempt_answers aa
+                    WHERE aa.attempt_id = attempts.id
+                )
+                WHERE id IN ({placeholders})
+                """,
+                chunk,
             )
 
-    conn.commit()
-    conn.close()
+        if checkpoint is not None:
+            _set_maintenance_value(
+                cur, _RESCORING_CHECKPOINT_KEY, json.dumps(checkpoint, ensure_ascii=False)
+            )
+    return len(answer_rows)
+
+
+def get_rescoring_checkpoint() -> Optional[Dict[str, Any]]:
+    """Return the stored re-scoring progress, or ``None`` when no run is pending."""
+
+    with _connection() as conn:
+        value = _get_maintenance_value(conn.cursor(), _RESCORING_CHECKPOINT_KEY)
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        logger.warning("Ignoring unreadable re-scoring checkpoint: %r", value)
+        return None
+
+
+def clear_rescoring_checkpoint() -> None:
+    """Forget any stored re-scoring progress."""
+
+    with _connection() as conn:
+        _set_maintenance_value(conn.cursor(), _RESCORING_CHECKPOINT_KEY, None)
+
+
+def record_attempt(
+    user_id: int,
+    problem_id: int,
+    mode: str,
+    answers: Iterable[RecordedAnswer],
+    started_at: datetime,
+    submitted_at: datetime,
+    duration_seconds: Optional[int],
+) -> int:
+    """Persist an attempt with its answers."""
+    with _connection() as conn:
+        cur = conn.cursor()
+
+        attempt_id, _total_score, _total_max = _insert_attempt(
+            cur,
+            user_id=user_id,
+            problem_id=problem_id,
+            mode=mode,
+            answers=list(answers),
+            started_at=started_at,
+            submitted_at=submitted_at,
+            duration_seconds=duration_seconds,
+        )
+
     return attempt_id
 
 
-def update_scoring_log_self_evaluation(log_id: int, value: Optional[str]) -> None:
-    """Update the learner's self evaluation for a scoring log entry."""
+def record_attempts_bulk(
+    user_id: int,
+    mode: str,
+    submissions: Iterable[AttemptSubmission],
+    *,
+    update_reviews: bool = True,
+) -> List[int]:
+    """Persist several attempts (e.g. a whole mock exam) in one transaction.
+
+    Each submission is written exactly like :func:`record_attempt`; when
+    ``update_reviews`` is true the spaced-review schedule for every problem is
+    updated in the same transaction.  ``score_ratio`` on a submission overrides
+    the ratio derived from the stored question maxima.  Returns the attempt ids
+    in submission order.
+    """
+
+    submissions = list(submissions)
+    if not submissions:
+        return []
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        attempt_ids: List[int] = []
+        for submission in submissions:
+            attempt_id, total_score, total_max = _insert_attempt(
+                cur,
+                user_id=user_id,
+                problem_id=submission.problem_id,
+                mode=mode,
+                answers=submission.answers,
+                started_at=submission.started_at,
+                submitted_at=submission.submitted_at,
+                duration_seconds=submission.duration_seconds,
+            )
+            attempt_ids.append(attempt_id)
+
+            if update_reviews:
+                score_ratio = submission.score_ratio
+                if score_ratio is None:
+                    score_ratio = (total_score / total_max) if total_max else 0.0
+                _upsert_spaced_review(
+                    cur,
+                    user_id=user_id,
+                    problem_id=submission.problem_id,
+                    score_ratio=score_ratio,
+                    reviewed_at=submission.submitted_at,
+                )
+
+    return attempt_ids
+
+
+def update_scoring_log_self_evaluation(
+    log_id: int, value: Optional[str], *, sync: bool = False
+) -> None:
+    """Update the learner's self evaluation for a scoring log entry.
+
+    The update goes through the write queue; pass ``sync=True`` (or call
+    :func:`flush_pending_writes`) when it must be visible to the next read.
+    """
 
     normalized = (value or "").strip() or None
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+    _WRITE_QUEUE.submit(
         "UPDATE attempt_scoring_logs SET self_evaluation = ? WHERE id = ?",
+        log_id,
         (normalized, log_id),
     )
-    conn.commit()
-    conn.close()
+    if sync:
+        flush_pending_writes()
+
 
+def update_scoring_log_notes(log_id: int, notes: Optional[str], *, sync: bool = False) -> None:
+    """Persist a free-form review memo for the specified scoring log.
 
-def update_scoring_log_notes(log_id: int, notes: Optional[str]) -> None:
-    """Persist a free-form review memo for the specified scoring log."""
+    Queued like :func:`update_scoring_log_self_evaluation`.
+    """
 
     normalized = (notes or "").strip() or None
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+    _WRITE_QUEUE.submit(
         "UPDATE attempt_scoring_logs SET notes = ? WHERE id = ?",
+        log_id,
         (normalized, log_id),
     )
-    conn.commit()
-    conn.close()
+    if sync:
+        flush_pending_writes()
 
 
 def fetch_scoring_logs_for_attempts(
@@ -1489,11 +4084,10 @@ def fetch_scoring_logs_for_attempts(
         ORDER BY log.logged_at, log.id
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(query, tuple(ids))
-    rows = cur.fetchall()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(query, tuple(ids))
+        rows = cur.fetchall()
 
     results: List[Dict[str, Any]] = []
     for row in rows:
@@ -1578,17 +4172,16 @@ def _next_review_plan(
     return next_interval, new_streak
 
 
-def update_spaced_review(
+def _upsert_spaced_review(
+    cur: sqlite3.Cursor,
+    *,
     user_id: int,
     problem_id: int,
-    *,
     score_ratio: float,
     reviewed_at: datetime,
 ) -> None:
-    """Create or update spaced repetition schedule for a problem."""
+    """Create or advance the spaced-review row for a problem without committing."""
 
-    conn = get_connection()
-    cur = conn.cursor()
     cur.execute(
         "SELECT * FROM spaced_reviews WHERE user_id = ? AND problem_id = ?",
         (user_id, problem_id),
@@ -1609,13 +4202,14 @@ def update_spaced_review(
         cur.execute(
             """
             UPDATE spaced_reviews
-            SET interval_days = ?, due_at = ?, last_reviewed_at = ?,
+            SET interval_days = ?, due_at = ?, due_epoch = ?, last_reviewed_at = ?,
                 last_score_ratio = ?, streak = ?
             WHERE id = ?
             """,
             (
                 interval_days,
                 next_due.isoformat(),
+                _to_epoch_seconds(next_due),
                 reviewed_at.isoformat(),
                 score_ratio,
                 new_streak,
@@ -1626,23 +4220,41 @@ def update_spaced_review(
         cur.execute(
             """
             INSERT INTO spaced_reviews (
-                user_id, problem_id, interval_days, due_at,
+                user_id, problem_id, interval_days, due_at, due_epoch,
                 last_reviewed_at, last_score_ratio, streak
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 user_id,
                 problem_id,
                 interval_days,
                 next_due.isoformat(),
+                _to_epoch_seconds(next_due),
                 reviewed_at.isoformat(),
                 score_ratio,
                 new_streak,
             ),
         )
 
-    conn.commit()
-    conn.close()
+
+def update_spaced_review(
+    user_id: int,
+    problem_id: int,
+    *,
+    score_ratio: float,
+    reviewed_at: datetime,
+) -> None:
+    """Create or update spaced repetition schedule for a problem."""
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        _upsert_spaced_review(
+            cur,
+            user_id=user_id,
+            problem_id=problem_id,
+            score_ratio=score_ratio,
+            reviewed_at=reviewed_at,
+        )
 
 
 def _estimate_study_load(
@@ -1689,21 +4301,20 @@ def list_due_reviews(
     """Return review items whose due date is on or before the reference timestamp."""
 
     reference_dt = reference or datetime.utcnow()
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT sr.*, p.year, p.case_label, p.title
-        FROM spaced_reviews sr
-        JOIN problems p ON p.id = sr.problem_id
-        WHERE sr.user_id = ? AND sr.due_at <= ?
-        ORDER BY sr.due_at
-        LIMIT ?
-        """,
-        (user_id, reference_dt.isoformat(), limit),
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT sr.*, p.year, p.case_label, p.title
+            FROM spaced_reviews sr
+            JOIN problems p ON p.id = sr.problem_id
+            WHERE sr.user_id = ? AND sr.due_epoch <= ?
+            ORDER BY sr.due_epoch, sr.id
+            LIMIT ?
+            """,
+            (user_id, _to_epoch_seconds(reference_dt), limit),
+        )
+        rows = cur.fetchall()
 
     items: List[Dict] = []
     for row in rows:
@@ -1736,51 +4347,50 @@ def list_due_reviews(
 def get_question_progress_summary(user_id: int, *, recent_limit: int = 5) -> Dict[str, Any]:
     """Return coverage information for question-level practice progress."""
 
-    conn = get_connection()
-    cur = conn.cursor()
+    with _connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("SELECT COUNT(*) AS total FROM questions")
-    total_row = cur.fetchone()
-    total_questions = int(total_row["total"]) if total_row and total_row["total"] else 0
+        cur.execute("SELECT COUNT(*) AS total FROM questions")
+        total_row = cur.fetchone()
+        total_questions = int(total_row["total"]) if total_row and total_row["total"] else 0
 
-    cur.execute(
-        """
-        SELECT COUNT(DISTINCT aa.question_id) AS studied
-        FROM attempt_answers aa
-        JOIN attempts a ON a.id = aa.attempt_id
-        WHERE a.user_id = ?
-        """,
-        (user_id,),
-    )
-    studied_row = cur.fetchone()
-    studied_questions = int(studied_row["studied"]) if studied_row and studied_row["studied"] else 0
+        cur.execute(
+            """
+            SELECT COUNT(DISTINCT aa.question_id) AS studied
+            FROM attempt_answers aa
+            JOIN attempts a ON a.id = aa.attempt_id
+            WHERE a.user_id = ?
+            """,
+            (user_id,),
+        )
+        studied_row = cur.fetchone()
+        studied_questions = int(studied_row["studied"]) if studied_row and studied_row["studied"] else 0
 
-    cur.execute(
-        """
-        SELECT
-            q.id AS question_id,
-            q.question_order,
-            q.prompt,
-            p.id AS problem_id,
-            p.year,
-            p.case_label,
-            p.title,
-            MAX(COALESCE(a.submitted_at, a.started_at)) AS last_practiced_at,
-            MAX(sr.due_at) AS due_at
-        FROM attempt_answers aa
-        JOIN attempts a ON a.id = aa.attempt_id AND a.user_id = ?
-        JOIN questions q ON q.id = aa.question_id
-        JOIN problems p ON p.id = q.problem_id
-        LEFT JOIN spaced_reviews sr
-            ON sr.user_id = a.user_id AND sr.problem_id = p.id
-        GROUP BY q.id, q.question_order, q.prompt, p.id, p.year, p.case_label, p.title
-        ORDER BY last_practiced_at DESC
-        LIMIT ?
-        """,
-        (user_id, recent_limit),
-    )
-    rows = cur.fetchall()
-    conn.close()
+        cur.execute(
+            """
+            SELECT
+                q.id AS question_id,
+                q.question_order,
+                q.prompt,
+                p.id AS problem_id,
+                p.year,
+                p.case_label,
+                p.title,
+                MAX(COALESCE(a.submitted_at, a.started_at)) AS last_practiced_at,
+                MAX(sr.due_at) AS due_at
+            FROM attempt_answers aa
+            JOIN attempts a ON a.id = aa.attempt_id AND a.user_id = ?
+            JOIN questions q ON q.id = aa.question_id
+            JOIN problems p ON p.id = q.problem_id
+            LEFT JOIN spaced_reviews sr
+                ON sr.user_id = a.user_id AND sr.problem_id = p.id
+            GROUP BY q.id, q.question_order, q.prompt, p.id, p.year, p.case_label, p.title
+            ORDER BY last_practiced_at DESC
+            LIMIT ?
+            """,
+            (user_id, recent_limit),
+        )
+        rows = cur.fetchall()
 
     recent_questions: List[Dict[str, Any]] = []
     for row in rows:
@@ -1817,121 +4427,114 @@ def get_question_progress_summary(user_id: int, *, recent_limit: int = 5) -> Dic
 
 
 def fetch_question_practice_stats(user_id: int) -> Dict[int, Dict[str, Any]]:
-    """Return attempt statistics per question for the given user."""
+    """Return attempt statistics per question for the given user.
 
-    conn = get_connection()
-    cur = conn.cursor()
+    Reads the pre-aggregated ``user_question_stats`` rows maintained by
+    :func:`record_attempt`, so the cost is proportional to the number of
+    questions rather than the learner's answer history.
+    """
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT
+                q.id,
+                q.max_score,
+                s.attempt_count,
+                s.ratio_count,
+                s.ratio_total,
+                s.best_ratio,
+                s.last_ratio,
+                s.last_score,
+                s.last_submitted_at
+            FROM questions q
+            LEFT JOIN user_question_stats s
+                ON s.question_id = q.id AND s.user_id = ?
+            """,
+            (user_id,),
+        )
+        rows = cur.fetchall()
 
-    cur.execute("SELECT id, max_score FROM questions")
     stats: Dict[int, Dict[str, Any]] = {}
-    for row in cur.fetchall():
+    for row in rows:
+        ratio_count = row["ratio_count"] or 0
+        best_ratio = row["best_ratio"]
+        if best_ratio is None and row["last_ratio"] is not None:
+            best_ratio = row["last_ratio"]
         stats[row["id"]] = {
             "max_score": row["max_score"],
-            "attempt_count": 0,
-            "avg_ratio": None,
-            "best_ratio": None,
-            "last_ratio": None,
-            "last_score": None,
-            "last_submitted_at": None,
+            "attempt_count": int(row["attempt_count"] or 0),
+            "avg_ratio": (row["ratio_total"] / ratio_count) if ratio_count else None,
+            "best_ratio": best_ratio,
+            "last_ratio": row["last_ratio"],
+            "last_score": row["last_score"],
+            "last_submitted_at": row["last_submitted_at"],
         }
 
-    cur.execute(
-        """
-        SELECT
-            aa.question_id,
-            aa.score,
-            q.max_score,
-            COALESCE(a.submitted_at, a.started_at) AS submitted_at
-        FROM attempt_answers aa
-        JOIN attempts a ON a.id = aa.attempt_id
-        JOIN questions q ON q.id = aa.question_id
-        WHERE a.user_id = ?
-        ORDER BY submitted_at ASC
-        """,
-        (user_id,),
-    )
-
-    rows = cur.fetchall()
-    conn.close()
+    return stats
 
-    for row in rows:
-        question_id = row["question_id"]
-        max_score = row["max_score"]
-        entry = stats.setdefault(
-            question_id,
-            {
-                "max_score": max_score,
-                "attempt_count": 0,
-                "avg_ratio": None,
-                "best_ratio": None,
-                "last_ratio": None,
-                "last_score": None,
-                "last_submitted_at": None,
-            },
-        )
-        entry["max_score"] = max_score
-        entry["attempt_count"] = int(entry.get("attempt_count", 0)) + 1
-        score = row["score"]
-        ratio = None
-        if score is not None and max_score:
-            ratio = max(min(score / max_score, 1.0), 0.0)
-            entry["best_ratio"] = (
-                ratio
-                if entry.get("best_ratio") is None
-                else max(float(entry["best_ratio"]), ratio)
-            )
-            entry["_total_ratio"] = entry.get("_total_ratio", 0.0) + ratio
-            entry["_sample_count"] = int(entry.get("_sample_count", 0)) + 1
-            entry["last_ratio"] = ratio
-        entry["last_score"] = score
-        entry["last_submitted_at"] = row["submitted_at"]
-
-    for entry in stats.values():
-        total_ratio = entry.pop("_total_ratio", None)
-        sample_count = entry.pop("_sample_count", 0)
-        if sample_count and total_ratio is not None:
-            entry["avg_ratio"] = total_ratio / sample_count
-        else:
-            entry["avg_ratio"] = entry.get("avg_ratio")
-        if entry.get("best_ratio") is None and entry.get("last_ratio") is not None:
-            entry["best_ratio"] = entry["last_ratio"]
 
-    return stats
+def fetch_question_master_stats(
+    *, max_staleness: Optional[timedelta] = None, snapshot: Optional[bool] = None
+) -> Dict[int, Dict[str, Any]]:
+    """Return aggregated performance metrics for every question across all users.
 
+    Metrics come from ``question_global_stats``, which is updated as attempts
+    are recorded, and are read from the analytics snapshot by default.  When
+    ``max_staleness`` is given and the last full refresh is older than that
+    (or has never run), the table is recomputed first and the live database
+    is read.
+    """
 
-def fetch_question_master_stats() -> Dict[int, Dict[str, Any]]:
-    """Return aggregated performance metrics for every question across all users."""
+    if max_staleness is not None:
+        with _connection() as conn:
+            cur = conn.cursor()
+            refreshed_dt = _parse_iso_datetime(
+                _get_maintenance_value(cur, "question_global_stats_refreshed_at"),
+                field="maintenance_state.question_global_stats_refreshed_at",
+            )
+            if refreshed_dt is None or datetime.now(timezone.utc) - refreshed_dt > max_staleness:
+                refresh_question_global_stats(conn=conn)
+                snapshot = False
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT
-            q.id,
-            COUNT(aa.id) AS attempt_count,
-            AVG(CASE WHEN q.max_score > 0 THEN aa.score / q.max_score END) AS avg_ratio,
-            AVG(aa.score) AS avg_score,
-            MAX(aa.score) AS best_score,
-            AVG(log.keyword_coverage) AS avg_keyword_coverage
-        FROM questions q
-        LEFT JOIN attempt_answers aa ON aa.question_id = q.id
-        LEFT JOIN attempts a ON a.id = aa.attempt_id
-        LEFT JOIN attempt_scoring_logs log
-            ON log.attempt_id = a.id AND log.question_id = q.id
-        GROUP BY q.id
-        """,
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with _analytics_connection("fetch_question_master_stats", snapshot) as (conn, _from_snapshot):
+        cur = conn.cursor()
+        refreshed_at = _get_maintenance_value(cur, "question_global_stats_refreshed_at")
+        cur.execute(
+            """
+            SELECT
+                q.id,
+                s.attempt_count,
+                s.score_count,
+                s.score_total,
+                s.ratio_count,
+                s.ratio_total,
+                s.best_score,
+                s.coverage_count,
+                s.coverage_total,
+                s.updated_at
+            FROM questions q
+            LEFT JOIN question_global_stats s ON s.question_id = q.id
+            """,
+        )
+        rows = cur.fetchall()
 
     metrics: Dict[int, Dict[str, Any]] = {}
     for row in rows:
+        score_count = row["score_count"] or 0
+        ratio_count = row["ratio_count"] or 0
+        coverage_count = row["coverage_count"] or 0
         metrics[int(row["id"])] = {
             "attempt_count": int(row["attempt_count"] or 0),
-            "avg_ratio": row["avg_ratio"],
-            "avg_score": row["avg_score"],
+            "avg_ratio": (row["ratio_total"] / ratio_count) if ratio_count else None,
+            "avg_score": (row["score_total"] / score_count) if score_count else None,
             "best_score": row["best_score"],
-            "avg_keyword_coverage": row["avg_keyword_coverage"],
+            "avg_keyword_coverage": (row["coverage_total"] / coverage_count)
+            if coverage_count
+            else None,
+            "updated_at": row["updated_at"],
+            "refreshed_at": refreshed_at,
         }
     return metrics
 
@@ -1939,33 +4542,32 @@ def fetch_question_master_stats() -> Dict[int, Dict[str, Any]]:
 def list_unattempted_questions(user_id: int, *, limit: int = 5) -> List[Dict[str, Any]]:
     """Return questions the user has not attempted yet (or has no saved answers)."""
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT
-            q.id AS question_id,
-            q.question_order,
-            q.prompt,
-            p.id AS problem_id,
-            p.year,
-            p.case_label,
-            p.title
-        FROM questions q
-        JOIN problems p ON p.id = q.problem_id
-        WHERE NOT EXISTS (
-            SELECT 1
-            FROM attempt_answers aa
-            JOIN attempts a ON a.id = aa.attempt_id
-            WHERE a.user_id = ? AND aa.question_id = q.id
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT
+                q.id AS question_id,
+                q.question_order,
+                q.prompt,
+                p.id AS problem_id,
+                p.year,
+                p.case_label,
+                p.title
+            FROM questions q
+            JOIN problems p ON p.id = q.problem_id
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM attempt_answers aa
+                JOIN attempts a ON a.id = aa.attempt_id
+                WHERE a.user_id = ? AND aa.question_id = q.id
+            )
+            ORDER BY p.year DESC, q.question_order ASC
+            LIMIT ?
+            """,
+            (user_id, limit),
         )
-        ORDER BY p.year DESC, q.question_order ASC
-        LIMIT ?
-        """,
-        (user_id, limit),
-    )
-    rows = cur.fetchall()
-    conn.close()
+        rows = cur.fetchall()
 
     return [
         {
@@ -1984,21 +4586,20 @@ def list_unattempted_questions(user_id: int, *, limit: int = 5) -> List[Dict[str
 def list_upcoming_reviews(user_id: int, *, limit: int = 6) -> List[Dict]:
     """Return upcoming spaced repetition entries ordered by due date."""
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT sr.*, p.year, p.case_label, p.title
-        FROM spaced_reviews sr
-        JOIN problems p ON p.id = sr.problem_id
-        WHERE sr.user_id = ?
-        ORDER BY sr.due_at
-        LIMIT ?
-        """,
-        (user_id, limit),
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT sr.*, p.year, p.case_label, p.title
+            FROM spaced_reviews sr
+            JOIN problems p ON p.id = sr.problem_id
+            WHERE sr.user_id = ?
+            ORDER BY sr.due_epoch, sr.id
+            LIMIT ?
+            """,
+            (user_id, limit),
+        )
+        rows = cur.fetchall()
 
     items: List[Dict] = []
     for row in rows:
@@ -2032,33 +4633,75 @@ def count_due_reviews(user_id: int, *, reference: Optional[datetime] = None) ->
     """Return the number of spaced reviews whose due date has passed."""
 
     reference_dt = reference or datetime.utcnow()
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT COUNT(*) FROM spaced_reviews WHERE user_id = ? AND due_at <= ?",
-        (user_id, reference_dt.isoformat()),
-    )
-    count = cur.fetchone()[0]
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT COUNT(*) FROM spaced_reviews WHERE user_id = ? AND due_epoch <= ?",
+            (user_id, _to_epoch_seconds(reference_dt)),
+        )
+        count = cur.fetchone()[0]
     return int(count or 0)
 
 
+def list_due_reviews_all_users(
+    before: Optional[datetime] = None, *, batch_size: int = 500
+) -> Iterator[Dict[str, Any]]:
+    """Yield every spaced review due on or before ``before`` across all learners.
+
+    Items come in ``(due_epoch, id)`` order from ``idx_spaced_reviews_due_epoch``,
+    fetched ``batch_size`` at a time with a keyset cursor so no read
+    transaction is held between batches.  ``due_at`` is derived from the
+    epoch column (UTC) rather than parsed from text.
+    """
+
+    before_epoch = _to_epoch_seconds(before or datetime.utcnow())
+    last_key: Tuple[int, int] = (-(2 ** 63), 0)
+    while True:
+        with _connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT sr.id, sr.user_id, sr.problem_id, sr.due_epoch, sr.interval_days,
+                       sr.last_score_ratio, sr.streak
+                FROM spaced_reviews sr
+                WHERE sr.due_epoch <= ? AND (sr.due_epoch, sr.id) > (?, ?)
+                ORDER BY sr.due_epoch, sr.id
+                LIMIT ?
+                """,
+                (before_epoch, last_key[0], last_key[1], batch_size),
+            )
+            rows = cur.fetchall()
+        for row in rows:
+            yield {
+                "review_id": row["id"],
+                "user_id": row["user_id"],
+                "problem_id": row["problem_id"],
+                "due_at": datetime.fromtimestamp(row["due_epoch"], timezone.utc),
+                "due_epoch": row["due_epoch"],
+                "interval_days": row["interval_days"],
+                "last_score_ratio": row["last_score_ratio"],
+                "streak": row["streak"],
+            }
+        if len(rows) < batch_size:
+            return
+        last_key = (rows[-1]["due_epoch"], rows[-1]["id"])
+
+
 def get_spaced_review(user_id: int, problem_id: int) -> Optional[Dict]:
     """Fetch spaced repetition schedule for a particular problem, if it exists."""
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT sr.*, p.year, p.case_label, p.title
-        FROM spaced_reviews sr
-        JOIN problems p ON p.id = sr.problem_id
-        WHERE sr.user_id = ? AND sr.problem_id = ?
-        """,
-        (user_id, problem_id),
-    )
-    row = cur.fetchone()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT sr.*, p.year, p.case_label, p.title
+            FROM spaced_reviews sr
+            JOIN problems p ON p.id = sr.problem_id
+            WHERE sr.user_id = ? AND sr.problem_id = ?
+            """,
+            (user_id, problem_id),
+        )
+        row = cur.fetchone()
     if not row:
         return None
 
@@ -2109,68 +4752,66 @@ def upsert_study_goal(
 ) -> int:
     """Create or update a study goal for the specified period."""
 
-    conn = get_connection()
-    cur = conn.cursor()
-    now = datetime.utcnow().isoformat()
-    start_value = start_date.isoformat()
-    end_value = end_date.isoformat()
-    preferred_value = preferred_start_time.strftime("%H:%M") if preferred_start_time else None
-
-    cur.execute(
-        "SELECT id FROM study_goals WHERE user_id = ? AND period_type = ? AND start_date = ?",
-        (user_id, period_type, start_value),
-    )
-    row = cur.fetchone()
+    with _connection() as conn:
+        cur = conn.cursor()
+        now = datetime.utcnow().isoformat()
+        start_value = start_date.isoformat()
+        end_value = end_date.isoformat()
+        preferred_value = preferred_start_time.strftime("%H:%M") if preferred_start_time else None
 
-    if row:
-        goal_id = row["id"]
-        cur.execute(
-            """
-            UPDATE study_goals
-            SET end_date = ?,
-                target_practice_count = ?,
-                target_study_minutes = ?,
-                target_score = ?,
-                preferred_start_time = ?,
-                updated_at = ?
-            WHERE id = ?
-            """,
-            (
-                end_value,
-                int(target_practice_count),
-                int(target_study_minutes),
-                float(target_score),
-                preferred_value,
-                now,
-                goal_id,
-            ),
-        )
-    else:
         cur.execute(
-            """
-            INSERT INTO study_goals (
-                user_id, period_type, start_date, end_date,
-                target_practice_count, target_study_minutes, target_score,
-                preferred_start_time, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                user_id,
-                period_type,
-                start_value,
-                end_value,
-                int(target_practice_count),
-                int(target_study_minutes),
-                float(target_score),
-                preferred_value,
-                now,
-                now,
-            ),
+            "SELECT id FROM study_goals WHERE user_id = ? AND period_type = ? AND start_date = ?",
+            (user_id, period_type, start_value),
         )
-        goal_id = cur.lastrowid
+        row = cur.fetchone()
+
+        if row:
+            goal_id = row["id"]
+            cur.execute(
+                """
+                UPDATE study_goals
+                SET end_date = ?,
+                    target_practice_count = ?,
+                    target_study_minutes = ?,
+                    target_score = ?,
+                    preferred_start_time = ?,
+                    updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    end_value,
+                    int(target_practice_count),
+                    int(target_study_minutes),
+                    float(target_score),
+                    preferred_value,
+                    now,
+                    goal_id,
+                ),
+            )
+        else:
+            cur.execute(
+                """
+                INSERT INTO study_goals (
+                    user_id, period_type, start_date, end_date,
+                    target_practice_count, target_study_minutes, target_score,
+                    preferred_start_time, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    user_id,
+                    period_type,
+                    start_value,
+                    end_value,
+                    int(target_practice_count),
+                    int(target_study_minutes),
+                    float(target_score),
+                    preferred_value,
+                    now,
+                    now,
+                ),
+            )
+            goal_id = cur.lastrowid
 
-    conn.commit()
-    conn.close()
     return int(goal_id)
 
 
@@ -2179,24 +4820,23 @@ def get_current_study_goal(
 ) -> Optional[Dict]:
     """Return the active study goal covering the reference date."""
 
-    conn = get_connection()
-    cur = conn.cursor()
-    ref_value = reference_date.isoformat()
-    cur.execute(
-        """
-        SELECT *
-        FROM study_goals
-        WHERE user_id = ?
-          AND period_type = ?
-          AND start_date <= ?
-          AND end_date >= ?
-        ORDER BY start_date DESC
-        LIMIT 1
-        """,
-        (user_id, period_type, ref_value, ref_value),
-    )
-    row = cur.fetchone()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        ref_value = reference_date.isoformat()
+        cur.execute(
+            """
+            SELECT *
+            FROM study_goals
+            WHERE user_id = ?
+              AND period_type = ?
+              AND start_date <= ?
+              AND end_date >= ?
+            ORDER BY start_date DESC
+            LIMIT 1
+            """,
+            (user_id, period_type, ref_value, ref_value),
+        )
+        row = cur.fetchone()
 
     if not row:
         return None
@@ -2223,52 +4863,49 @@ def get_current_study_goal(
 def replace_study_sessions(goal_id: int, sessions: Iterable[Dict[str, Any]]) -> None:
     """Replace all sessions associated with a study goal."""
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM study_sessions WHERE goal_id = ?", (goal_id,))
-
-    now = datetime.utcnow().isoformat()
-    for session in sessions:
-        session_date: dt_date = session["session_date"]
-        start_time: dt_time = session["start_time"]
-        duration = int(session.get("duration_minutes", 0))
-        description = session.get("description")
-        cur.execute(
-            """
-            INSERT INTO study_sessions (
-                goal_id, session_date, start_time, duration_minutes, description, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (
-                goal_id,
-                session_date.isoformat(),
-                start_time.strftime("%H:%M"),
-                duration,
-                description,
-                now,
-            ),
-        )
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM study_sessions WHERE goal_id = ?", (goal_id,))
+
+        now = datetime.utcnow().isoformat()
+        for session in sessions:
+            session_date: dt_date = session["session_date"]
+            start_time: dt_time = session["start_time"]
+            duration = int(session.get("duration_minutes", 0))
+            description = session.get("description")
+            cur.execute(
+                """
+                INSERT INTO study_sessions (
+                    goal_id, session_date, start_time, duration_minutes, description, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    goal_id,
+                    session_date.isoformat(),
+                    start_time.strftime("%H:%M"),
+                    duration,
+                    description,
+                    now,
+                ),
+            )
 
-    conn.commit()
-    conn.close()
 
 
 def list_study_sessions(goal_id: int) -> List[Dict]:
     """Return study sessions associated with a study goal."""
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT session_date, start_time, duration_minutes, description
-        FROM study_sessions
-        WHERE goal_id = ?
-        ORDER BY session_date
-        """,
-        (goal_id,),
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT session_date, start_time, duration_minutes, description
+            FROM study_sessions
+            WHERE goal_id = ?
+            ORDER BY session_date
+            """,
+            (goal_id,),
+        )
+        rows = cur.fetchall()
 
     sessions: List[Dict] = []
     for row in rows:
@@ -2292,25 +4929,24 @@ def aggregate_attempts_between(
     start_dt = datetime.combine(start_date, datetime.min.time())
     end_dt = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT
-            COUNT(*) AS practice_count,
-            COALESCE(SUM(total_score), 0) AS total_score,
-            COALESCE(SUM(total_max_score), 0) AS total_max,
-            COALESCE(SUM(duration_seconds), 0) AS total_duration
-        FROM attempts
-        WHERE user_id = ?
-          AND submitted_at IS NOT NULL
-          AND submitted_at >= ?
-          AND submitted_at < ?
-        """,
-        (user_id, start_dt.isoformat(), end_dt.isoformat()),
-    )
-    row = cur.fetchone()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT
+                COUNT(*) AS practice_count,
+                COALESCE(SUM(total_score), 0) AS total_score,
+                COALESCE(SUM(total_max_score), 0) AS total_max,
+                COALESCE(SUM(duration_seconds), 0) AS total_duration
+            FROM attempts
+            WHERE user_id = ?
+              AND submitted_at IS NOT NULL
+              AND submitted_at >= ?
+              AND submitted_at < ?
+            """,
+            (user_id, start_dt.isoformat(), end_dt.isoformat()),
+        )
+        row = cur.fetchone()
 
     practice_count = row["practice_count"] or 0
     total_score = row["total_score"] or 0.0
@@ -2328,31 +4964,142 @@ def aggregate_attempts_between(
     }
 
 
-def list_attempts(user_id: int) -> List[Dict[str, Any]]:
-    conn = get_connection()
-    cur = conn.cursor()
+AttemptCursor = Tuple[str, int]
+"""Keyset position ``(submitted_at, attempt_id)`` used by the ``*_page`` helpers."""
+
+
+def _attempt_page_subquery(
+    user_id: int, *, limit: int, cursor: Optional[AttemptCursor], descending: bool
+) -> Tuple[str, Tuple[Any, ...]]:
+    """Return SQL selecting one page of submitted attempt ids plus its params.
+
+    The subquery walks ``idx_attempts_user_submitted`` so each page costs the
+    same no matter how many attempts precede it.
+    """
+
+    direction = "DESC" if descending else "ASC"
+    comparison = "<" if descending else ">"
+    params: List[Any] = [user_id]
+    cursor_clause = ""
+    if cursor is not None:
+        cursor_clause = f"AND (submitted_at, id) {comparison} (?, ?)"
+        params.extend([cursor[0], int(cursor[1])])
+    params.append(max(int(limit), 1))
+    sql = f"""
+        SELECT id FROM attempts
+        WHERE user_id = ? AND submitted_at IS NOT NULL {cursor_clause}
+        ORDER BY submitted_at {direction}, id {direction}
+        LIMIT ?
+    """
+    return sql, tuple(params)
+
+
+def _next_attempt_cursor(
+    keys: Sequence[AttemptCursor], *, limit: int
+) -> Optional[AttemptCursor]:
+    """Return the cursor after the last attempt of a page, or ``None`` at the end."""
+
+    distinct: List[AttemptCursor] = []
+    for key in keys:
+        if not distinct or distinct[-1] != key:
+            distinct.append(key)
+    if len(distinct) < max(int(limit), 1):
+        return None
+    return distinct[-1]
+
+
+def _select_attempt_rows(
+    cur: sqlite3.Cursor, where_sql: str, params: Tuple[Any, ...], order_sql: str
+) -> List[sqlite3.Row]:
     cur.execute(
-        """
+        f"""
         SELECT a.*, p.year, p.case_label, p.title
         FROM attempts a
         JOIN problems p ON p.id = a.problem_id
-        WHERE a.user_id = ?
-        ORDER BY a.submitted_at DESC
+        WHERE {where_sql}
+        ORDER BY {order_sql}
         """,
-        (user_id,),
+        params,
     )
-    rows = [dict(row) for row in cur.fetchall()]
-    conn.close()
+    return cur.fetchall()
+
+
+def list_attempts(user_id: int) -> List[Dict[str, Any]]:
+    with _connection() as conn:
+        cur = conn.cursor()
+        rows = [
+            dict(row)
+            for row in _select_attempt_rows(cur, "a.user_id = ?", (user_id,), "a.submitted_at DESC")
+        ]
     return rows
 
 
-def fetch_all_attempt_scores() -> List[Dict[str, Any]]:
-    """Return attempt scores for all users for collaborative analysis."""
+def list_attempts_page(
+    user_id: int, *, limit: int = 50, cursor: Optional[AttemptCursor] = None
+) -> Dict[str, Any]:
+    """Return one page of submitted attempts, newest first.
 
-    conn = get_connection()
-    cur = conn.cursor()
+    Pass the returned ``next_cursor`` back in to continue; it is ``None`` on
+    the last page.  Unlike :func:`list_attempts`, attempts without a
+    submission timestamp are not included.
+    """
+
+    subquery, params = _attempt_page_subquery(user_id, limit=limit, cursor=cursor, descending=True)
+    with _connection() as conn:
+        cur = conn.cursor()
+        rows = [
+            dict(row)
+            for row in _select_attempt_rows(
+                cur, f"a.id IN ({subquery})", params, "a.submitted_at DESC, a.id DESC"
+            )
+        ]
+    return {
+        "items": rows,
+        "next_cursor": _next_attempt_cursor(
+            [(row["submitted_at"], row["id"]) for row in rows], limit=limit
+        ),
+    }
+
+
+def count_attempts(user_id: int, *, submitted_only: bool = True) -> int:
+    """Return how many attempts a learner has (submitted ones by default)."""
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        if submitted_only:
+            cur.execute(
+                "SELECT COUNT(*) FROM attempts WHERE user_id = ? AND submitted_at IS NOT NULL",
+                (user_id,),
+            )
+        else:
+            cur.execute("SELECT COUNT(*) FROM attempts WHERE user_id = ?", (user_id,))
+        count = cur.fetchone()[0]
+    return int(count or 0)
+
+
+def count_answers(user_id: int) -> int:
+    """Return how many question answers a learner has submitted."""
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT COUNT(*)
+            FROM attempt_answers aa
+            JOIN attempts a ON a.id = aa.attempt_id
+            WHERE a.user_id = ? AND a.submitted_at IS NOT NULL
+            """,
+            (user_id,),
+        )
+        count = cur.fetchone()[0]
+    return int(count or 0)
+
+
+def _select_attempt_score_rows(
+    cur: sqlite3.Cursor, where_sql: str, params: Tuple[Any, ...]
+) -> List[Dict[str, Any]]:
     cur.execute(
-        """
+        f"""
         SELECT
             a.user_id,
             a.problem_id,
@@ -2367,22 +5114,42 @@ def fetch_all_attempt_scores() -> List[Dict[str, Any]]:
             p.title
         FROM attempts a
         JOIN problems p ON p.id = a.problem_id
-        WHERE a.total_score IS NOT NULL AND a.total_max_score IS NOT NULL
+        WHERE a.total_score IS NOT NULL AND a.total_max_score IS NOT NULL {where_sql}
         ORDER BY a.submitted_at
         """,
+        params,
     )
-    rows = [dict(row) for row in cur.fetchall()]
-    conn.close()
-    return rows
+    return [dict(row) for row in cur.fetchall()]
 
 
-def fetch_learning_history(user_id: int) -> List[Dict]:
-    """Return aggregated attempt records for analytics on the history page."""
+def fetch_all_attempt_scores(
+    *, snapshot: Optional[bool] = None, user_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Return attempt scores for all users for collaborative analysis.
 
-    conn = get_connection()
-    cur = conn.cursor()
+    Served from the analytics snapshot unless ``snapshot`` (or
+    :data:`ANALYTICS_SNAPSHOT_FUNCTIONS`) says otherwise.  The rows of
+    ``user_id`` always come from the live database, so the learner's latest
+    attempts are included even when the snapshot predates them.
+    """
+
+    with _analytics_connection("fetch_all_attempt_scores", snapshot) as (conn, from_snapshot):
+        if user_id is None or not from_snapshot:
+            return _select_attempt_score_rows(conn.cursor(), "", ())
+        rows = _select_attempt_score_rows(conn.cursor(), "AND a.user_id <> ?", (user_id,))
+
+    with _connection() as conn:
+        user_rows = _select_attempt_score_rows(conn.cursor(), "AND a.user_id = ?", (user_id,))
+    rows.extend(user_rows)
+    rows.sort(key=lambda row: row["submitted_at"] or "")
+    return rows
+
+
+def _select_learning_history_rows(
+    cur: sqlite3.Cursor, where_sql: str, params: Tuple[Any, ...], order_sql: str
+) -> List[sqlite3.Row]:
     cur.execute(
-        """
+        f"""
         SELECT
             a.id,
             a.submitted_at,
@@ -2399,56 +5166,94 @@ def fetch_learning_history(user_id: int) -> List[Dict]:
         JOIN problems p ON p.id = a.problem_id
         LEFT JOIN attempt_answers aa ON aa.attempt_id = a.id
         LEFT JOIN questions q ON q.id = aa.question_id
-        WHERE a.user_id = ? AND a.submitted_at IS NOT NULL
+        WHERE {where_sql}
         GROUP BY a.id, a.submitted_at, a.mode, a.duration_seconds, p.year, p.case_label, p.title
-        ORDER BY a.submitted_at
+        ORDER BY {order_sql}
         """,
-        (user_id,),
+        params,
     )
-    rows = cur.fetchall()
-    conn.close()
+    return cur.fetchall()
 
-    history: List[Dict] = []
-    for row in rows:
-        duration_seconds = row["duration_seconds"]
-        duration_minutes: Optional[float]
-        if duration_seconds is None:
+
+def _format_learning_history_row(row: sqlite3.Row) -> Dict[str, Any]:
+    duration_seconds = row["duration_seconds"]
+    duration_minutes: Optional[float]
+    if duration_seconds is None:
+        duration_minutes = None
+    else:
+        try:
+            duration_minutes = round(float(duration_seconds) / 60.0, 1)
+        except (TypeError, ValueError):
             duration_minutes = None
-        else:
-            try:
-                duration_minutes = round(float(duration_seconds) / 60.0, 1)
-            except (TypeError, ValueError):
-                duration_minutes = None
-        history.append(
-            {
-                "attempt_id": row["id"],
-                "日付": row["submitted_at"],
-                "年度": row["year"],
-                "事例": row["case_label"],
-                "タイトル": row["title"],
-                "得点": row["total_score"],
-                "平均得点": row["average_score"],
-                "設問数": row["answered_questions"],
-                "満点": row["total_max_score"],
-                "学習時間(分)": duration_minutes,
-                "モード": "模試" if row["mode"] == "mock" else "演習",
-            }
+    return {
+        "attempt_id": row["id"],
+        "日付": row["submitted_at"],
+        "年度": row["year"],
+        "事例": row["case_label"],
+        "タイトル": row["title"],
+        "得点": row["total_score"],
+        "平均得点": row["average_score"],
+        "設問数": row["answered_questions"],
+        "満点": row["total_max_score"],
+        "学習時間(分)": duration_minutes,
+        "モード": "模試" if row["mode"] == "mock" else "演習",
+    }
+
+
+def fetch_learning_history(user_id: int) -> List[Dict]:
+    """Return aggregated attempt records for analytics on the history page."""
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        rows = _select_learning_history_rows(
+            cur,
+            "a.user_id = ? AND a.submitted_at IS NOT NULL",
+            (user_id,),
+            "a.submitted_at",
         )
 
-    return history
+    return [_format_learning_history_row(row) for row in rows]
+
+
+def fetch_learning_history_page(
+    user_id: int,
+    *,
+    limit: int = 50,
+    cursor: Optional[AttemptCursor] = None,
+    descending: bool = False,
+) -> Dict[str, Any]:
+    """Return one keyset page of :func:`fetch_learning_history` records.
+
+    ``limit`` counts attempts.  Returns ``{"items": [...], "next_cursor": ...}``.
+    """
+
+    subquery, params = _attempt_page_subquery(
+        user_id, limit=limit, cursor=cursor, descending=descending
+    )
+    direction = "DESC" if descending else "ASC"
+    with _connection() as conn:
+        cur = conn.cursor()
+        rows = _select_learning_history_rows(
+            cur, f"a.id IN ({subquery})", params, f"a.submitted_at {direction}, a.id {direction}"
+        )
+    return {
+        "items": [_format_learning_history_row(row) for row in rows],
+        "next_cursor": _next_attempt_cursor(
+            [(row["submitted_at"], row["id"]) for row in rows], limit=limit
+        ),
+    }
 
 
 def get_reminder_settings(user_id: int) -> Optional[Dict]:
     """Return reminder configuration for a user, if it exists."""
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT * FROM reminders WHERE user_id = ?",
-        (user_id,),
-    )
-    row = cur.fetchone()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT * FROM reminders WHERE user_id = ?",
+            (user_id,),
+        )
+        row = cur.fetchone()
 
     if not row:
         return None
@@ -2464,20 +5269,19 @@ def get_reminder_settings(user_id: int) -> Optional[Dict]:
     }
 
 
-def fetch_keyword_performance(user_id: int) -> List[Dict]:
-    """Return answer-level keyword performance for the specified user."""
-
-    conn = get_connection()
-    cur = conn.cursor()
+def _select_keyword_performance_rows(
+    cur: sqlite3.Cursor, where_sql: str, params: Tuple[Any, ...], order_sql: str
+) -> List[sqlite3.Row]:
     cur.execute(
-        """
+        f"""
         SELECT
             aa.attempt_id,
             aa.answer_text,
             aa.score,
             aa.feedback,
-            aa.keyword_hits_json,
+            aa.feedback_packed,
             aa.axis_breakdown_json,
+            aa.id AS answer_id,
             a.mode,
             a.submitted_at,
             p.year,
@@ -2487,145 +5291,466 @@ def fetch_keyword_performance(user_id: int) -> List[Dict]:
             q.prompt,
             q.max_score,
             q.question_order,
+            q.keywords_json,
             log.duration_seconds,
             log.self_evaluation,
-            log.keyword_coverage
+            COALESCE(
+                log.keyword_coverage,
+                (
+                    SELECT CAST(SUM(akh.hit) AS REAL) / COUNT(*)
+                    FROM answer_keyword_hits akh
+                    WHERE akh.answer_id = aa.id
+                )
+            ) AS keyword_coverage
         FROM attempt_answers aa
         JOIN attempts a ON a.id = aa.attempt_id
         JOIN questions q ON q.id = aa.question_id
         JOIN problems p ON p.id = a.problem_id
         LEFT JOIN attempt_scoring_logs log
             ON log.attempt_id = aa.attempt_id AND log.question_id = aa.question_id
-        WHERE a.user_id = ? AND a.submitted_at IS NOT NULL
-        ORDER BY a.submitted_at
+        WHERE {where_sql}
+        ORDER BY {order_sql}
         """,
-        (user_id,),
+        params,
+    )
+    return cur.fetchall()
+
+
+def _load_answer_keyword_hits(
+    cur: sqlite3.Cursor, rows: Sequence[sqlite3.Row]
+) -> Dict[int, Dict[str, bool]]:
+    """Return ``{answer_id: keyword_hits}`` for ``rows`` from ``answer_keyword_hits``.
+
+    Keywords are ordered as the question lists them, which is the order the
+    scorer reported them in; keywords the question no longer lists follow.
+    """
+
+    answer_ids = [row["answer_id"] for row in rows]
+    hit_rows: Dict[int, List[Tuple[str, bool]]] = {}
+    for offset in range(0, len(answer_ids), 500):
+        chunk = tuple(answer_ids[offset : offset + 500])
+        placeholders = ",".join("?" for _ in chunk)
+        cur.execute(
+            f"""
+            SELECT akh.answer_id, kd.keyword, akh.hit
+            FROM answer_keyword_hits akh
+            JOIN keyword_dictionary kd ON kd.id = akh.keyword_id
+            WHERE akh.answer_id IN ({placeholders})
+            ORDER BY akh.answer_id, akh.keyword_id
+            """,
+            chunk,
+        )
+        for hit_row in cur.fetchall():
+            hit_rows.setdefault(hit_row["answer_id"], []).append(
+                (hit_row["keyword"], bool(hit_row["hit"]))
+            )
+
+    keyword_order: Dict[int, Dict[str, int]] = {}
+    keyword_hits: Dict[int, Dict[str, bool]] = {}
+    for row in rows:
+        hits = hit_rows.get(row["answer_id"])
+        if not hits:
+            keyword_hits[row["answer_id"]] = {}
+            continue
+        order = keyword_order.get(row["question_id"])
+        if order is None:
+            try:
+                keywords = json.loads(row["keywords_json"] or "[]")
+            except (TypeError, ValueError):
+                keywords = []
+            order = {}
+            for keyword in keywords if isinstance(keywords, list) else []:
+                order.setdefault(str(keyword), len(order))
+            keyword_order[row["question_id"]] = order
+        hits.sort(key=lambda item: order.get(item[0], len(order)))
+        keyword_hits[row["answer_id"]] = dict(hits)
+    return keyword_hits
+
+
+def _format_keyword_performance_rows(
+    cur: sqlite3.Cursor, rows: Sequence[sqlite3.Row]
+) -> List[Dict[str, Any]]:
+    keyword_hits = _load_answer_keyword_hits(cur, rows)
+    return [_format_keyword_performance_row(row, keyword_hits[row["answer_id"]]) for row in rows]
+
+
+def _format_keyword_performance_row(
+    row: sqlite3.Row, keyword_hits: Dict[str, bool]
+) -> Dict[str, Any]:
+    return {
+        "attempt_id": row["attempt_id"],
+        "answer_text": row["answer_text"],
+        "score": row["score"],
+        "feedback": _render_feedback(row["feedback"], row["feedback_packed"]),
+        "keyword_hits": keyword_hits,
+        "axis_breakdown": json.loads(row["axis_breakdown_json"]) if row["axis_breakdown_json"] else {},
+        "mode": row["mode"],
+        "submitted_at": row["submitted_at"],
+        "year": row["year"],
+        "case_label": row["case_label"],
+        "title": row["title"],
+        "question_id": row["question_id"],
+        "prompt": row["prompt"],
+        "max_score": row["max_score"],
+        "question_order": row["question_order"],
+        "duration_seconds": row["duration_seconds"],
+        "self_evaluation": row["self_evaluation"],
+        "keyword_coverage": row["keyword_coverage"],
+    }
+
+
+def fetch_keyword_performance(user_id: int) -> List[Dict]:
+    """Return answer-level keyword performance for the specified user."""
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        rows = _select_keyword_performance_rows(
+            cur,
+            "a.user_id = ? AND a.submitted_at IS NOT NULL",
+            (user_id,),
+            "a.submitted_at",
+        )
+        records = _format_keyword_performance_rows(cur, rows)
+
+    return records
+
+
+def fetch_keyword_performance_page(
+    user_id: int,
+    *,
+    limit: int = 50,
+    cursor: Optional[AttemptCursor] = None,
+    descending: bool = False,
+) -> Dict[str, Any]:
+    """Return answer-level keyword records for one keyset page of attempts.
+
+    ``limit`` counts attempts, so every answer of an attempt lands on the
+    same page.  Returns ``{"items": [...], "next_cursor": ...}``.
+    """
+
+    subquery, params = _attempt_page_subquery(
+        user_id, limit=limit, cursor=cursor, descending=descending
     )
+    direction = "DESC" if descending else "ASC"
+    with _connection() as conn:
+        cur = conn.cursor()
+        rows = _select_keyword_performance_rows(
+            cur,
+            f"a.id IN ({subquery})",
+            params,
+            f"a.submitted_at {direction}, a.id {direction}, aa.id",
+        )
+        items = _format_keyword_performance_rows(cur, rows)
+    return {
+        "items": items,
+        "next_cursor": _next_attempt_cursor(
+            [(row["submitted_at"], row["attempt_id"]) for row in rows], limit=limit
+        ),
+    }
+
+
+def fetch_keyword_mastery(user_id: int) -> List[Dict[str, Any]]:
+    """Return per-keyword hit statistics for a learner, computed in SQL.
+
+    Each entry contains ``attempts`` (answers scored against the keyword),
+    ``hits``, ``misses``, ``hit_ratio`` and the number of distinct cases and
+    years the keyword appeared in.  Sorted by ascending hit ratio.
+    """
 
-    rows = cur.fetchall()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT
+                kd.keyword,
+                COUNT(*) AS attempts,
+                SUM(akh.hit) AS hits,
+                COUNT(DISTINCT p.case_label) AS case_count,
+                COUNT(DISTINCT p.year) AS year_count,
+                MAX(a.submitted_at) AS last_seen_at
+            FROM answer_keyword_hits akh
+            JOIN keyword_dictionary kd ON kd.id = akh.keyword_id
+            JOIN attempt_answers aa ON aa.id = akh.answer_id
+            JOIN attempts a ON a.id = aa.attempt_id
+            JOIN problems p ON p.id = a.problem_id
+            WHERE a.user_id = ? AND a.submitted_at IS NOT NULL
+            GROUP BY akh.keyword_id
+            ORDER BY CAST(SUM(akh.hit) AS REAL) / COUNT(*) ASC, COUNT(*) DESC, kd.keyword
+            """,
+            (user_id,),
+        )
+        rows = cur.fetchall()
 
-    keyword_records: List[Dict] = []
+    mastery: List[Dict[str, Any]] = []
     for row in rows:
-        keyword_records.append(
+        attempts = int(row["attempts"] or 0)
+        hits = int(row["hits"] or 0)
+        mastery.append(
             {
-                "attempt_id": row["attempt_id"],
-                "answer_text": row["answer_text"],
-                "score": row["score"],
-                "feedback": row["feedback"],
-                "keyword_hits": json.loads(row["keyword_hits_json"]) if row["keyword_hits_json"] else {},
-                "axis_breakdown": json.loads(row["axis_breakdown_json"]) if row["axis_breakdown_json"] else {},
-                "mode": row["mode"],
-                "submitted_at": row["submitted_at"],
-                "year": row["year"],
-                "case_label": row["case_label"],
-                "title": row["title"],
-                "question_id": row["question_id"],
-                "prompt": row["prompt"],
-                "max_score": row["max_score"],
-                "question_order": row["question_order"],
-                "duration_seconds": row["duration_seconds"],
-                "self_evaluation": row["self_evaluation"],
-                "keyword_coverage": row["keyword_coverage"],
+                "keyword": row["keyword"],
+                "attempts": attempts,
+                "hits": hits,
+                "misses": attempts - hits,
+                "hit_ratio": hits / attempts if attempts else None,
+                "case_count": int(row["case_count"] or 0),
+                "year_count": int(row["year_count"] or 0),
+                "last_seen_at": row["last_seen_at"],
             }
         )
+    return mastery
+
+
+def fetch_most_missed_keywords(user_id: int, *, limit: int = 5) -> List[Dict[str, Any]]:
+    """Return the keywords a learner missed most often (most misses first)."""
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT kd.keyword, COUNT(*) AS misses, MIN(a.submitted_at) AS first_missed_at
+            FROM answer_keyword_hits akh
+            JOIN keyword_dictionary kd ON kd.id = akh.keyword_id
+            JOIN attempt_answers aa ON aa.id = akh.answer_id
+            JOIN attempts a ON a.id = aa.attempt_id
+            WHERE a.user_id = ? AND a.submitted_at IS NOT NULL
+              AND akh.hit = 0 AND kd.keyword <> ''
+            GROUP BY akh.keyword_id
+            ORDER BY misses DESC, first_missed_at ASC, kd.keyword
+            LIMIT ?
+            """,
+            (user_id, limit),
+        )
+        rows = cur.fetchall()
+    return [{"keyword": row["keyword"], "misses": int(row["misses"])} for row in rows]
+
+
+def fetch_keyword_coverage_by_answer(user_id: int) -> Dict[int, Dict[str, Any]]:
+    """Return ``{answer_id: {"hits", "total", "coverage"}}`` for a learner."""
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT akh.answer_id, SUM(akh.hit) AS hits, COUNT(*) AS total
+            FROM answer_keyword_hits akh
+            JOIN attempt_answers aa ON aa.id = akh.answer_id
+            JOIN attempts a ON a.id = aa.attempt_id
+            WHERE a.user_id = ?
+            GROUP BY akh.answer_id
+            """,
+            (user_id,),
+        )
+        rows = cur.fetchall()
+    return {
+        int(row["answer_id"]): {
+            "hits": int(row["hits"] or 0),
+            "total": int(row["total"] or 0),
+            "coverage": (row["hits"] or 0) / row["total"] if row["total"] else None,
+        }
+        for row in rows
+    }
+
+
+def upsert_reminder_settings(
+    *,
+    user_id: int,
+    cadence: str,
+    interval_days: int,
+    preferred_channels: Iterable[str],
+    reminder_time: str,
+    next_trigger_at: datetime,
+) -> None:
+    """Create or update reminder settings for a user."""
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        channels_json = json.dumps(list(preferred_channels), ensure_ascii=False)
+        next_trigger_value = next_trigger_at.isoformat()
+        next_trigger_epoch = _to_epoch_seconds(next_trigger_at)
+
+        cur.execute("SELECT id FROM reminders WHERE user_id = ?", (user_id,))
+        row = cur.fetchone()
+
+        if row:
+            cur.execute(
+                """
+                UPDATE reminders
+                SET cadence = ?, interval_days = ?, preferred_channels_json = ?,
+                    reminder_time = ?, next_trigger_at = ?, next_trigger_epoch = ?
+                WHERE user_id = ?
+                """,
+                (
+                    cadence,
+                    interval_days,
+                    channels_json,
+                    reminder_time,
+                    next_trigger_value,
+                    next_trigger_epoch,
+                    user_id,
+                ),
+            )
+        else:
+            cur.execute(
+                """
+                INSERT INTO reminders (
+                    user_id, cadence, interval_days, preferred_channels_json,
+                    reminder_time, next_trigger_at, next_trigger_epoch
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    user_id,
+                    cadence,
+                    interval_days,
+                    channels_json,
+                    reminder_time,
+                    next_trigger_value,
+                    next_trigger_epoch,
+                ),
+            )
 
-    return keyword_records
 
 
-def upsert_reminder_settings(
+def mark_reminder_sent(
+    reminder_id: int, *, next_trigger_at: datetime, sync: bool = False
+) -> None:
+    """Update reminder record when a notification has been (virtually) sent.
+
+    Queued through the write queue unless ``sync`` is set.
+    """
+
+    _WRITE_QUEUE.submit(
+        """
+        UPDATE reminders
+        SET last_notified_at = ?, next_trigger_at = ?, next_trigger_epoch = ?
+        WHERE id = ?
+        """,
+        reminder_id,
+        (
+            datetime.utcnow().isoformat(),
+            next_trigger_at.isoformat(),
+            _to_epoch_seconds(next_trigger_at),
+            reminder_id,
+        ),
+    )
+    if sync:
+        flush_pending_writes()
+
+
+def fetch_due_reminders(
+    before: datetime,
     *,
-    user_id: int,
-    cadence: str,
-    interval_days: int,
-    preferred_channels: Iterable[str],
-    reminder_time: str,
-    next_trigger_at: datetime,
-) -> None:
-    """Create or update reminder settings for a user."""
-
-    conn = get_connection()
-    cur = conn.cursor()
-    channels_json = json.dumps(list(preferred_channels), ensure_ascii=False)
-    next_trigger_value = next_trigger_at.isoformat()
+    limit: int = 500,
+    after: Optional[Tuple[int, int]] = None,
+) -> List[Dict[str, Any]]:
+    """Return up to ``limit`` reminders whose next trigger is at or before ``before``.
 
-    cur.execute("SELECT id FROM reminders WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
+    Rows come in ``(next_trigger_epoch, id)`` order from
+    ``idx_reminders_next_trigger_epoch``; pass the ``(next_trigger_epoch, id)``
+    of the last row as ``after`` to fetch the following batch.
+    """
 
-    if row:
-        cur.execute(
-            """
-            UPDATE reminders
-            SET cadence = ?, interval_days = ?, preferred_channels_json = ?,
-                reminder_time = ?, next_trigger_at = ?
-            WHERE user_id = ?
-            """,
-            (cadence, interval_days, channels_json, reminder_time, next_trigger_value, user_id),
-        )
-    else:
+    after_key = after or (-(2 ** 63), 0)
+    with _connection() as conn:
+        cur = conn.cursor()
         cur.execute(
             """
-            INSERT INTO reminders (
-                user_id, cadence, interval_days, preferred_channels_json,
-                reminder_time, next_trigger_at
-            ) VALUES (?, ?, ?, ?, ?, ?)
+            SELECT r.*, u.email, u.name
+            FROM reminders r
+            JOIN users u ON u.id = r.user_id
+            WHERE r.next_trigger_epoch <= ? AND (r.next_trigger_epoch, r.id) > (?, ?)
+            ORDER BY r.next_trigger_epoch, r.id
+            LIMIT ?
             """,
-            (user_id, cadence, interval_days, channels_json, reminder_time, next_trigger_value),
+            (_to_epoch_seconds(before), after_key[0], after_key[1], limit),
         )
+        rows = cur.fetchall()
 
-    conn.commit()
-    conn.close()
+    return [
+        {
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "email": row["email"],
+            "name": row["name"],
+            "cadence": row["cadence"],
+            "interval_days": row["interval_days"],
+            "preferred_channels": json.loads(row["preferred_channels_json"]),
+            "reminder_time": row["reminder_time"],
+            "next_trigger_at": row["next_trigger_at"],
+            "next_trigger_epoch": row["next_trigger_epoch"],
+            "last_notified_at": row["last_notified_at"],
+        }
+        for row in rows
+    ]
 
 
-def mark_reminder_sent(reminder_id: int, *, next_trigger_at: datetime) -> None:
-    """Update reminder record when a notification has been (virtually) sent."""
+def mark_reminders_sent(
+    deliveries: Sequence[Tuple[int, str, datetime]],
+    *,
+    notified_at: Optional[datetime] = None,
+) -> int:
+    """Advance several reminders in one transaction and return how many moved.
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        UPDATE reminders
-        SET last_notified_at = ?, next_trigger_at = ?
-        WHERE id = ?
-        """,
-        (datetime.utcnow().isoformat(), next_trigger_at.isoformat(), reminder_id),
-    )
-    conn.commit()
-    conn.close()
+    Each delivery is ``(reminder_id, delivered_trigger_at, next_trigger_at)``
+    where ``delivered_trigger_at`` is the ``next_trigger_at`` text that was
+    sent.  A reminder whose trigger changed in the meantime (settings edited,
+    or another dispatcher got there first) is left untouched.
+    """
+
+    if not deliveries:
+        return 0
+    notified_value = (notified_at or datetime.utcnow()).isoformat()
+    with _connection() as conn:
+        cur = conn.cursor()
+        updated = 0
+        for reminder_id, delivered_trigger_at, next_trigger_at in deliveries:
+            cur.execute(
+                """
+                UPDATE reminders
+                SET last_notified_at = ?, next_trigger_at = ?, next_trigger_epoch = ?
+                WHERE id = ? AND next_trigger_at = ?
+                """,
+                (
+                    notified_value,
+                    next_trigger_at.isoformat(),
+                    _to_epoch_seconds(next_trigger_at),
+                    reminder_id,
+                    delivered_trigger_at,
+                ),
+            )
+            updated += cur.rowcount
+    return updated
 
 
 def fetch_attempt_detail(attempt_id: int) -> Dict:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM attempts WHERE id = ?", (attempt_id,))
-    attempt = cur.fetchone()
-    if not attempt:
-        conn.close()
-        raise ValueError("Attempt not found")
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM attempts WHERE id = ?", (attempt_id,))
+        attempt = cur.fetchone()
+        if not attempt:
+            raise ValueError("Attempt not found")
 
-    cur.execute(
-        """
-        SELECT aa.*, q.prompt, q.max_score, q.model_answer, q.explanation,
-               q.keywords_json, q.intent_cards_json, q.video_url, q.diagram_path,
-               q.diagram_caption, q.question_order, p.year, p.case_label,
-               log.id AS scoring_log_id,
-               log.duration_seconds AS log_duration_seconds,
-               log.self_evaluation AS log_self_evaluation,
-               log.keyword_coverage AS log_keyword_coverage,
-               log.checkpoints_json AS log_checkpoints_json,
-               log.notes AS log_notes
-        FROM attempt_answers aa
-        JOIN questions q ON q.id = aa.question_id
-        JOIN problems p ON p.id = q.problem_id
-        LEFT JOIN attempt_scoring_logs log
-            ON log.attempt_id = aa.attempt_id AND log.question_id = aa.question_id
-        WHERE aa.attempt_id = ?
-        ORDER BY q.question_order
-        """,
-        (attempt_id,),
-    )
-    answers = cur.fetchall()
-    conn.close()
+        cur.execute(
+            """
+            SELECT aa.*, q.prompt, q.max_score, q.model_answer, q.explanation,
+                   q.keywords_json, q.intent_cards_json, q.video_url, q.diagram_path,
+                   q.diagram_caption, q.question_order, p.year, p.case_label,
+                   log.id AS scoring_log_id,
+                   log.duration_seconds AS log_duration_seconds,
+                   log.self_evaluation AS log_self_evaluation,
+                   log.keyword_coverage AS log_keyword_coverage,
+                   log.checkpoints_json AS log_checkpoints_json,
+                   log.notes AS log_notes
+            FROM attempt_answers aa
+            JOIN questions q ON q.id = aa.question_id
+            JOIN problems p ON p.id = q.problem_id
+            LEFT JOIN attempt_scoring_logs log
+                ON log.attempt_id = aa.attempt_id AND log.question_id = aa.question_id
+            WHERE aa.attempt_id = ?
+            ORDER BY q.question_order
+            """,
+            (attempt_id,),
+        )
+        answers = cur.fetchall()
 
     formatted_answers = []
     for row in answers:
@@ -2635,7 +5760,7 @@ def fetch_attempt_detail(attempt_id: int) -> Dict:
                 "answer_text": row["answer_text"],
                 "score": row["score"],
                 "max_score": row["max_score"],
-                "feedback": row["feedback"],
+                "feedback": _render_feedback(row["feedback"], row["feedback_packed"]),
                 "model_answer": row["model_answer"],
                 "explanation": row["explanation"],
                 "keyword_hits": json.loads(row["keyword_hits_json"]) if row["keyword_hits_json"] else {},
@@ -2662,13 +5787,11 @@ def fetch_attempt_detail(attempt_id: int) -> Dict:
     }
 
 
-def fetch_user_question_scores(user_id: int) -> List[Dict[str, Any]]:
-    """Return historical question-level scores for a user."""
-
-    conn = get_connection()
-    cur = conn.cursor()
+def _select_user_question_score_rows(
+    cur: sqlite3.Cursor, where_sql: str, params: Tuple[Any, ...], order_sql: str
+) -> List[sqlite3.Row]:
     cur.execute(
-        """
+        f"""
         SELECT
             aa.attempt_id,
             aa.question_id,
@@ -2686,74 +5809,126 @@ def fetch_user_question_scores(user_id: int) -> List[Dict[str, Any]]:
         JOIN problems p ON p.id = q.problem_id
         LEFT JOIN attempt_scoring_logs log
             ON log.attempt_id = aa.attempt_id AND log.question_id = aa.question_id
-        WHERE a.user_id = ?
-        ORDER BY a.submitted_at ASC, q.question_order ASC
+        WHERE {where_sql}
+        ORDER BY {order_sql}
         """,
-        (user_id,),
+        params,
     )
-    rows = cur.fetchall()
-    conn.close()
+    return cur.fetchall()
 
-    history: List[Dict[str, Any]] = []
-    for row in rows:
-        history.append(
-            {
-                "attempt_id": row["attempt_id"],
-                "question_id": row["question_id"],
-                "score": row["score"],
-                "max_score": row["question_max_score"],
-                "question_order": row["question_order"],
-                "case_label": row["case_label"],
-                "year": row["year"],
-                "submitted_at": row["submitted_at"],
-                "keyword_coverage": row["keyword_coverage"],
-                "duration_seconds": row["duration_seconds"],
-            }
+
+def _format_user_question_score_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "attempt_id": row["attempt_id"],
+        "question_id": row["question_id"],
+        "score": row["score"],
+        "max_score": row["question_max_score"],
+        "question_order": row["question_order"],
+        "case_label": row["case_label"],
+        "year": row["year"],
+        "submitted_at": row["submitted_at"],
+        "keyword_coverage": row["keyword_coverage"],
+        "duration_seconds": row["duration_seconds"],
+    }
+
+
+def fetch_user_question_scores(user_id: int) -> List[Dict[str, Any]]:
+    """Return historical question-level scores for a user."""
+
+    with _connection() as conn:
+        cur = conn.cursor()
+        rows = _select_user_question_score_rows(
+            cur,
+            "a.user_id = ?",
+            (user_id,),
+            "a.submitted_at ASC, q.question_order ASC",
         )
 
-    return history
+    return [_format_user_question_score_row(row) for row in rows]
+
 
+def fetch_user_question_scores_page(
+    user_id: int,
+    *,
+    limit: int = 50,
+    cursor: Optional[AttemptCursor] = None,
+    descending: bool = False,
+) -> Dict[str, Any]:
+    """Return question-level scores for one keyset page of submitted attempts.
 
-def fetch_user_question_history_summary(user_id: int) -> List[Dict[str, Any]]:
-    """Return aggregated metrics per question for a specific user."""
+    ``limit`` counts attempts.  Returns ``{"items": [...], "next_cursor": ...}``.
+    """
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT
-            q.id AS question_id,
-            p.year,
-            p.case_label,
-            q.question_order,
-            MAX(p.difficulty) AS problem_difficulty,
-            MAX(q.question_difficulty) AS question_difficulty,
-            MAX(p.theme_tags_json) AS theme_tags_json,
-            MAX(p.tendency_tags_json) AS tendency_tags_json,
-            MAX(p.topic_tags_json) AS topic_tags_json,
-            MAX(q.skill_tags_json) AS skill_tags_json,
-            COUNT(aa.id) AS attempt_count,
-            AVG(aa.score) AS avg_score,
-            MAX(aa.score) AS best_score,
-            MIN(aa.score) AS worst_score,
-            AVG(CASE WHEN q.max_score > 0 THEN aa.score / q.max_score END) AS avg_ratio,
-            MAX(COALESCE(a.submitted_at, a.started_at)) AS last_attempt_at,
-            AVG(log.keyword_coverage) AS avg_keyword_coverage,
-            MAX(q.max_score) AS max_score
-        FROM attempt_answers aa
-        JOIN attempts a ON a.id = aa.attempt_id
-        JOIN questions q ON q.id = aa.question_id
-        JOIN problems p ON p.id = q.problem_id
-        LEFT JOIN attempt_scoring_logs log
-            ON log.attempt_id = aa.attempt_id AND log.question_id = aa.question_id
-        WHERE a.user_id = ?
-        GROUP BY q.id, p.year, p.case_label, q.question_order
-        ORDER BY p.year DESC, p.case_label, q.question_order
-        """,
-        (user_id,),
+    subquery, params = _attempt_page_subquery(
+        user_id, limit=limit, cursor=cursor, descending=descending
     )
-    rows = cur.fetchall()
-    conn.close()
+    direction = "DESC" if descending else "ASC"
+    with _connection() as conn:
+        cur = conn.cursor()
+        rows = _select_user_question_score_rows(
+            cur,
+            f"a.id IN ({subquery})",
+            params,
+            f"a.submitted_at {direction}, a.id {direction}, q.question_order ASC",
+        )
+    return {
+        "items": [_format_user_question_score_row(row) for row in rows],
+        "next_cursor": _next_attempt_cursor(
+            [(row["submitted_at"], row["attempt_id"]) for row in rows], limit=limit
+        ),
+    }
+
+
+def fetch_user_question_history_summary(
+    user_id: int, *, snapshot: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """Return aggregated metrics per question for a specific user.
+
+    Read from the live database unless ``snapshot=True`` (or
+    :data:`ANALYTICS_SNAPSHOT_FUNCTIONS`) asks for the analytics snapshot, in
+    which case answers submitted within
+    :data:`ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS` may not be counted yet.
+    """
+
+    with _analytics_connection("fetch_user_question_history_summary", snapshot) as (
+        conn,
+        _from_snapshot,
+    ):
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT
+                q.id AS question_id,
+                p.year,
+                p.case_label,
+                q.question_order,
+                MAX(p.difficulty) AS problem_difficulty,
+                MAX(q.question_difficulty) AS question_difficulty,
+                MAX(p.theme_tags_json) AS theme_tags_json,
+                MAX(p.tendency_tags_json) AS tendency_tags_json,
+                MAX(p.topic_tags_json) AS topic_tags_json,
+                MAX(q.skill_tags_json) AS skill_tags_json,
+                COUNT(aa.id) AS attempt_count,
+                AVG(aa.score) AS avg_score,
+                MAX(aa.score) AS best_score,
+                MIN(aa.score) AS worst_score,
+                AVG(CASE WHEN q.max_score > 0 THEN aa.score / q.max_score END) AS avg_ratio,
+                MAX(COALESCE(a.submitted_at, a.started_at)) AS last_attempt_at,
+                AVG(log.keyword_coverage) AS avg_keyword_coverage,
+                MAX(q.max_score) AS max_score
+            FROM attempt_answers aa
+            JOIN attempts a ON a.id = aa.attempt_id
+            JOIN questions q ON q.id = aa.question_id
+            JOIN problems p ON p.id = q.problem_id
+            LEFT JOIN attempt_scoring_logs log
+                ON log.attempt_id = aa.attempt_id AND log.question_id = aa.question_id
+            WHERE a.user_id = ?
+            GROUP BY q.id, p.year, p.case_label, q.question_order
+            ORDER BY p.year DESC, p.case_label, q.question_order
+            """,
+            (user_id,),
+        )
+        rows = cur.fetchall()
 
     summary: List[Dict[str, Any]] = []
     for row in rows:
@@ -2783,20 +5958,20 @@ def fetch_user_question_history_summary(user_id: int) -> List[Dict[str, Any]]:
 
 
 def fetch_attempt_activity(attempt_id: int) -> List[Dict[str, Any]]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT aqa.*, q.question_order
-        FROM attempt_question_activity aqa
-        JOIN questions q ON q.id = aqa.question_id
-        WHERE aqa.attempt_id = ?
-        ORDER BY q.question_order
-        """,
-        (attempt_id,),
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT aqa.*, q.question_order, arc.edit_history_packed
+            FROM attempt_question_activity aqa
+            JOIN questions q ON q.id = aqa.question_id
+            LEFT JOIN attempt_question_activity_archive arc ON arc.activity_id = aqa.id
+            WHERE aqa.attempt_id = ?
+            ORDER BY q.question_order
+            """,
+            (attempt_id,),
+        )
+        rows = cur.fetchall()
     activities: List[Dict[str, Any]] = []
     for row in rows:
         activities.append(
@@ -2808,29 +5983,191 @@ def fetch_attempt_activity(attempt_id: int) -> List[Dict[str, Any]]:
                 "last_updated_at": row["last_updated_at"],
                 "total_duration_seconds": row["total_duration_seconds"],
                 "revision_count": row["revision_count"],
-                "edit_history": json.loads(row["edit_history_json"])
-                if row["edit_history_json"]
-                else [],
+                "edit_history": _load_edit_history(
+                    row["edit_history_json"], row["edit_history_packed"]
+                ),
             }
         )
     return activities
 
 
-def aggregate_statistics(user_id: int) -> Dict[str, Dict[str, float]]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT p.case_label, AVG(a.total_score) AS avg_score, AVG(a.total_max_score) AS avg_max
-        FROM attempts a
-        JOIN problems p ON p.id = a.problem_id
-        WHERE a.user_id = ? AND a.total_score IS NOT NULL
-        GROUP BY p.case_label
-        """,
-        (user_id,),
+# Version byte of archived edit histories: 0 is zlib-compressed JSON as
+# stored, 1 is the delta-encoded form written by _pack_edit_history.
+_EDIT_HISTORY_RAW = 0
+_EDIT_HISTORY_DELTA = 1
+
+
+def _encode_edit_history_deltas(history: Any) -> Optional[Dict[str, Any]]:
+    """Return ``history`` as microsecond/length deltas, or ``None`` if irregular."""
+
+    if not isinstance(history, list) or not history:
+        return None
+    previous_time: Optional[datetime] = None
+    previous_length = 0
+    time_deltas: List[int] = []
+    length_deltas: List[int] = []
+    for entry in history:
+        if not isinstance(entry, dict) or set(entry) != {"timestamp", "length"}:
+            return None
+        timestamp, length = entry["timestamp"], entry["length"]
+        if not isinstance(timestamp, str) or type(length) is not int:
+            return None
+        try:
+            current = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return None
+        if previous_time is None:
+            first = current
+        elif current.utcoffset() != first.utcoffset():
+            return None
+        else:
+            time_deltas.append((current - previous_time) // timedelta(microseconds=1))
+        length_deltas.append(length - previous_length)
+        previous_time, previous_length = current, length
+    return {"t0": history[0]["timestamp"], "dt": time_deltas, "dl": length_deltas}
+
+
+def _decode_edit_history_deltas(encoded: Dict[str, Any]) -> List[Dict[str, Any]]:
+    current = datetime.fromisoformat(encoded["t0"])
+    length = 0
+    history: List[Dict[str, Any]] = []
+    for index, length_delta in enumerate(encoded["dl"]):
+        if index:
+            current += timedelta(microseconds=encoded["dt"][index - 1])
+        length += length_delta
+        history.append({"timestamp": current.isoformat(), "length": length})
+    return history
+
+
+def _pack_edit_history(history: Any) -> bytes:
+    """Return an archived (version byte + zlib) form of an edit history.
+
+    Regular ``{timestamp, length}`` histories are delta-encoded; anything that
+    would not decode back to the identical list is stored as plain JSON.
+    """
+
+    encoded = _encode_edit_history_deltas(history)
+    if encoded is not None and _decode_edit_history_deltas(encoded) == history:
+        version, payload = _EDIT_HISTORY_DELTA, encoded
+    else:
+        version, payload = _EDIT_HISTORY_RAW, history
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return bytes([version]) + zlib.compress(raw, 9)
+
+
+def _load_edit_history(history_json: Optional[str], packed: Optional[bytes]) -> List[Dict[str, Any]]:
+    """Return an edit history from the live JSON column or its archived form."""
+
+    if history_json:
+        return json.loads(history_json)
+    if not packed:
+        return []
+    payload = json.loads(zlib.decompress(packed[1:]).decode("utf-8"))
+    if packed[0] == _EDIT_HISTORY_DELTA:
+        return _decode_edit_history_deltas(payload)
+    return payload
+
+
+def compact_attempt_activity(
+    older_than_days: int = ACTIVITY_ARCHIVE_AFTER_DAYS,
+    *,
+    batch_size: int = 500,
+    vacuum: bool = True,
+) -> int:
+    """Archive edit histories of attempts submitted more than ``older_than_days`` ago.
+
+    Each history moves from ``attempt_question_activity.edit_history_json`` to
+    ``attempt_question_activity_archive`` in packed form; the timing columns
+    stay where they are.  :func:`fetch_attempt_activity` reads both
+    transparently.  With ``vacuum`` the freed pages are then returned to the
+    filesystem with an incremental VACUUM (switching the database to
+    ``auto_vacuum=INCREMENTAL`` with a one-off full VACUUM the first time).
+    Returns the number of histories archived.
+    """
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    cutoff_epoch = _to_epoch_seconds(cutoff)
+    archived = 0
+    # Each batch commits on its own so a long run never holds the write lock
+    # for long; call this outside any open transaction.
+    with _connection() as conn:
+        cur = conn.cursor()
+        while True:
+            cur.execute(
+                """
+                SELECT aqa.id, aqa.edit_history_json
+                FROM attempt_question_activity aqa
+                JOIN attempts a ON a.id = aqa.attempt_id
+                WHERE aqa.edit_history_json IS NOT NULL AND a.submitted_epoch < ?
+                LIMIT ?
+                """,
+                (cutoff_epoch, batch_size),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            archived_at = datetime.utcnow().isoformat()
+            archive_rows = []
+            for row in rows:
+                try:
+                    history = json.loads(row["edit_history_json"])
+                except (TypeError, ValueError):
+                    history = row["edit_history_json"]
+                archive_rows.append((row["id"], archived_at, _pack_edit_history(history)))
+            cur.executemany(
+                """
+                INSERT OR REPLACE INTO attempt_question_activity_archive (
+                    activity_id, archived_at, edit_history_packed
+                ) VALUES (?, ?, ?)
+                """,
+                archive_rows,
+            )
+            cur.executemany(
+                "UPDATE attempt_question_activity SET edit_history_json = NULL WHERE id = ?",
+                [(row["id"],) for row in rows],
+            )
+            _set_maintenance_value(cur, "activity_compacted_at", archived_at)
+            conn.commit()
+            archived += len(rows)
+
+        if vacuum and archived:
+            _incremental_vacuum(conn)
+    logger.info(
+        "Archived %s activity edit history row(s) older than %s", archived, cutoff.isoformat()
     )
-    rows = cur.fetchall()
-    conn.close()
+    return archived
+
+
+def _incremental_vacuum(conn: sqlite3.Connection) -> None:
+    """Release free pages and truncate the WAL so the database file shrinks."""
+
+    if conn.in_transaction:
+        conn.commit()
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode != 2:
+        # auto_vacuum can only be switched on an existing database by a full
+        # VACUUM; afterwards every run is incremental.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        conn.execute("PRAGMA incremental_vacuum")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def aggregate_statistics(user_id: int) -> Dict[str, Dict[str, float]]:
+    with _connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT p.case_label, AVG(a.total_score) AS avg_score, AVG(a.total_max_score) AS avg_max
+            FROM attempts a
+            JOIN problems p ON p.id = a.problem_id
+            WHERE a.user_id = ? AND a.total_score IS NOT NULL
+            GROUP BY p.case_label
+            """,
+            (user_id,),
+        )
+        rows = cur.fetchall()
 
     stats: Dict[str, Dict[str, float]] = {}
     for row in rows:
@@ -2841,6 +6178,130 @@ def aggregate_statistics(user_id: int) -> Dict[str, Dict[str, float]]:
     return stats
 
 
+def _aggregate_statistics_from_attempts(
+    attempts: Sequence[Dict[str, Any]]
+) -> Dict[str, Dict[str, float]]:
+    """Compute :func:`aggregate_statistics` from already loaded attempt rows."""
+
+    totals: Dict[str, List[float]] = {}
+    for attempt in attempts:
+        if attempt.get("total_score") is None:
+            continue
+        bucket = totals.setdefault(attempt["case_label"], [0.0, 0, 0.0, 0])
+        bucket[0] += attempt["total_score"]
+        bucket[1] += 1
+        if attempt.get("total_max_score") is not None:
+            bucket[2] += attempt["total_max_score"]
+            bucket[3] += 1
+
+    return {
+        case_label: {
+            "avg_score": (score_sum / score_count) if score_count else 0,
+            "avg_max": (max_sum / max_count) if max_count else 0,
+        }
+        for case_label, (score_sum, score_count, max_sum, max_count) in totals.items()
+    }
+
+
+def _load_sections_in_read_transaction(
+    loaders: Dict[str, Callable[[], Any]], deadline: float
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Run ``loaders`` on this thread's connection inside one read transaction.
+
+    The helpers called by the loaders check out the same pooled connection,
+    so every section sees the same database snapshot.  Once ``deadline``
+    (a :func:`time.monotonic` value) has passed, the running section's query
+    is interrupted through SQLite's progress handler and the sections not yet
+    started are skipped; both are reported as ``"timeout"``.
+    """
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    with _connection() as conn:
+        started_transaction = not conn.in_transaction
+        try:
+            if started_transaction:
+                conn.execute("BEGIN")
+            for name, loader in loaders.items():
+                if time.monotonic() >= deadline:
+                    errors[name] = "timeout"
+                    continue
+                interrupted = [False]
+
+                def _check_deadline() -> int:
+                    # Interrupt once; the rollback that follows must still run.
+                    if interrupted[0] or time.monotonic() < deadline:
+                        return 0
+                    interrupted[0] = True
+                    return 1
+
+                conn.set_progress_handler(_check_deadline, DASHBOARD_PROGRESS_CHECK_STEPS)
+                try:
+                    results[name] = loader()
+                except Exception as exc:
+                    if interrupted[0]:
+                        logger.warning("Dashboard section %s ran past its deadline", name)
+                        errors[name] = "timeout"
+                    else:
+                        logger.exception("Failed to load dashboard section %s", name)
+                        errors[name] = str(exc)
+                finally:
+                    conn.set_progress_handler(None, 0)
+        finally:
+            if started_transaction and conn.in_transaction:
+                conn.rollback()
+    return results, errors
+
+
+def get_dashboard_snapshot(
+    user_id: int,
+    *,
+    recent_limit: int = 5,
+    missed_keyword_limit: int = 5,
+    section_timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Return every dataset the home dashboard needs in one call.
+
+    The result holds ``attempts``, ``stats``, ``keyword_records``,
+    ``missed_keywords``, ``question_progress``, ``problem_catalog`` and
+    ``rating_records`` (the cross-user scores used for recommendations), plus
+    ``errors`` mapping a section name to why it is missing.  A missing
+    section is ``None`` so callers can fetch it themselves.  ``stats`` is
+    derived from the loaded attempts rather than queried again.
+
+    All sections are read on the calling thread within a single read
+    transaction, except ``rating_records`` when it is served from the
+    analytics snapshot.  Sections still loading ``section_timeout`` seconds
+    after the call started (default :data:`DASHBOARD_SECTION_TIMEOUT_SECONDS`)
+    have their query interrupted and are reported as ``"timeout"``.
+    """
+
+    loaders: Dict[str, Callable[[], Any]] = {
+        "attempts": lambda: list_attempts(user_id),
+        "keyword_records": lambda: fetch_keyword_performance(user_id),
+        "missed_keywords": lambda: fetch_most_missed_keywords(user_id, limit=missed_keyword_limit),
+        "question_progress": lambda: get_question_progress_summary(
+            user_id, recent_limit=recent_limit
+        ),
+        "problem_catalog": list_problems,
+        "rating_records": lambda: fetch_all_attempt_scores(user_id=user_id),
+    }
+
+    timeout = DASHBOARD_SECTION_TIMEOUT_SECONDS if section_timeout is None else section_timeout
+    results, errors = _load_sections_in_read_transaction(
+        loaders, time.monotonic() + timeout
+    )
+
+    snapshot: Dict[str, Any] = {name: results.get(name) for name in loaders}
+    snapshot["stats"] = (
+        _aggregate_statistics_from_attempts(snapshot["attempts"])
+        if snapshot["attempts"] is not None
+        else None
+    )
+    snapshot["errors"] = errors
+    return snapshot
+
+
 def _default_seed_payload() -> Dict:
     """Return a minimal seed payload with representative problems."""
     return {
@@ -3104,3 +6565,66 @@ def _parse_iso_datetime(value: Any, *, field: str) -> Optional[datetime]:
 
     logger.warning("Failed to parse %s value '%s' as ISO timestamp", field, text)
     return None
+
+
+def _to_epoch_seconds(value: Any, *, field: str = "timestamp") -> Optional[int]:
+    """Return ``value`` as integer Unix seconds; naive values are taken as UTC."""
+
+    parsed = _parse_iso_datetime(value, field=field)
+    if parsed is None:
+        return None
+    return int(parsed.timestamp())
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point for maintenance tasks (``python -m database``)."""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m database", description=main.__doc__)
+    parser.add_argument("--db", type=Path, default=None, help="SQLite file (default: data/app.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser(
+        "rebuild-question-stats",
+        help="Recompute user_question_stats from recorded answers.",
+    )
+    rebuild_parser.add_argument("--user-id", type=int, default=None)
+    subparsers.add_parser(
+        "refresh-global-stats",
+        help="Recompute question_global_stats across all learners.",
+    )
+    compact_parser = subparsers.add_parser(
+        "compact-activity",
+        help="Archive old answer edit histories and shrink the database file.",
+    )
+    compact_parser.add_argument(
+        "--older-than-days", type=int, default=ACTIVITY_ARCHIVE_AFTER_DAYS
+    )
+    compact_parser.add_argument("--no-vacuum", action="store_true")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    global DB_PATH
+    if args.db is not None:
+        DB_PATH = args.db
+    initialize_database()
+
+    if args.command == "rebuild-question-stats":
+        count = rebuild_user_question_stats(args.user_id)
+        logger.info("Rebuilt %s user_question_stats row(s)", count)
+    elif args.command == "refresh-global-stats":
+        count = refresh_question_global_stats()
+        logger.info("Refreshed %s question_global_stats row(s)", count)
+    elif args.command == "compact-activity":
+        compact_attempt_activity(args.older_than_days, vacuum=not args.no_vacuum)
+    return 0
+
+
+if QUERY_INSTRUMENTATION_ENABLED:
+    enable_query_instrumentation()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
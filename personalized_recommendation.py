@@ -46,6 +46,8 @@ def generate_personalised_learning_plan(
     top_problem_limit: int = 5,
     top_question_limit: int = 5,
     top_resource_limit: int = 5,
+    keyword_records: Optional[Sequence[Dict[str, Any]]] = None,
+    rating_records: Optional[Sequence[Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     """Return a bundle of personalised learning recommendations.
 
@@ -66,13 +68,19 @@ def generate_personalised_learning_plan(
         supporting materials when weaknesses are detected.
     top_problem_limit / top_question_limit / top_resource_limit:
         Limits for each recommendation bucket.
+    keyword_records / rating_records:
+        Optional pre-fetched results of :func:`database.fetch_keyword_performance`
+        and :func:`database.fetch_all_attempt_scores` (for example from
+        :func:`database.get_dashboard_snapshot`).  Fetched when omitted.
     """
 
     problem_catalog = list(problem_catalog or database.list_problems())
     catalog_lookup = {item["id"]: item for item in problem_catalog if "id" in item}
 
-    rating_records = database.fetch_all_attempt_scores()
-    keyword_records = database.fetch_keyword_performance(user_id)
+    if rating_records is None:
+        rating_records = database.fetch_all_attempt_scores(user_id=user_id)
+    if keyword_records is None:
+        keyword_records = database.fetch_keyword_performance(user_id)
 
     rating_df = _prepare_rating_frame(rating_records)
     user_attempt_df = rating_df[rating_df["user_id"] == user_id]
@@ -421,10 +429,9 @@ def _derive_question_recommendations(
                 score_ratio = None
 
         keyword_hits = record.get("keyword_hits") or {}
-        total_keywords = len(keyword_hits)
-        coverage_ratio = None
-        if total_keywords:
-            coverage_ratio = sum(1 for hit in keyword_hits.values() if hit) / total_keywords
+        coverage_ratio = record.get("keyword_coverage")
+        if coverage_ratio is None and keyword_hits:
+            coverage_ratio = sum(1 for hit in keyword_hits.values() if hit) / len(keyword_hits)
 
         duration_minutes = None
         duration_seconds = record.get("duration_seconds")
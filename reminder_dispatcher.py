@@ -0,0 +1,271 @@
+"""Background dispatcher for learner study reminders.
+
+The dispatcher polls the ``reminders`` table for triggers that are due,
+hands each one to a channel sender and then advances the reminder to its
+next trigger in bulk.  Delivery is at-least-once: a reminder is only
+advanced after its sender returned, so a crash between the two steps
+re-sends the same trigger on the next poll.  Every delivery carries a
+``delivery_key`` that is stable for one trigger so receivers can drop
+duplicates.
+
+Run it as a separate process next to the Streamlit app::
+
+    python -m reminder_dispatcher --sender stdout
+    python -m reminder_dispatcher --sender file:data/reminders.jsonl --once
+
+Trigger times are stored as naive local datetimes, matching what the
+settings page writes, so the dispatcher compares them with naive
+``datetime.now()``.
+"""
+from __future__ import annotations
+
+from datetime import datetime, time as dt_time, timedelta
+import importlib
+import json
+import logging
+from pathlib import Path
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, TextIO
+
+import database
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_POLL_INTERVAL_SECONDS = 60.0
+
+
+def calculate_next_reminder(
+    reference: datetime,
+    interval_days: int,
+    reminder_time: dt_time,
+    *,
+    now: Optional[datetime] = None,
+) -> datetime:
+    """Return the first trigger at ``reminder_time`` ``interval_days`` after ``reference``.
+
+    Triggers that would already be in the past are moved forward by whole
+    intervals so a dispatcher that was down for a while sends one catch-up
+    reminder rather than one per missed interval.
+    """
+
+    interval_days = max(1, interval_days)
+    minimum_dt = reference + timedelta(days=interval_days)
+    candidate = datetime.combine(minimum_dt.date(), reminder_time)
+    if candidate < minimum_dt:
+        candidate += timedelta(days=1)
+
+    now = now or datetime.now()
+    if candidate <= now:
+        delta = now - candidate
+        periods = int(delta.total_seconds() // (interval_days * 24 * 60 * 60)) + 1
+        candidate += timedelta(days=interval_days * periods)
+
+    return candidate
+
+
+def _parse_reminder_time(value: Optional[str]) -> dt_time:
+    try:
+        return dt_time.fromisoformat(value) if value else dt_time(20, 0)
+    except ValueError:
+        logger.warning("Invalid reminder_time %r; falling back to 20:00", value)
+        return dt_time(20, 0)
+
+
+class ReminderSender:
+    """Base class for channel senders.
+
+    ``send`` receives one batch of deliveries and must raise if any of them
+    could not be handed off; the whole batch is then retried on the next
+    poll.
+    """
+
+    def send(self, deliveries: Sequence[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class StreamSender(ReminderSender):
+    """Write deliveries as JSON lines to stdout or an append-only file."""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path
+        self._stream: Optional[TextIO] = None
+
+    def _open(self) -> TextIO:
+        if self._stream is None:
+            if self.path is None:
+                self._stream = sys.stdout
+            else:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._stream = self.path.open("a", encoding="utf-8")
+        return self._stream
+
+    def send(self, deliveries: Sequence[Dict[str, Any]]) -> None:
+        stream = self._open()
+        for delivery in deliveries:
+            stream.write(json.dumps(delivery, ensure_ascii=False) + "\n")
+        stream.flush()
+
+    def close(self) -> None:
+        if self._stream is not None and self._stream is not sys.stdout:
+            self._stream.close()
+        self._stream = None
+
+
+def load_sender(spec: str) -> ReminderSender:
+    """Build a sender from ``stdout``, ``file:PATH`` or ``module:attr``.
+
+    ``module:attr`` may name a :class:`ReminderSender` subclass or instance,
+    or a plain callable taking the delivery batch.
+    """
+
+    if spec == "stdout":
+        return StreamSender()
+    if spec.startswith("file:"):
+        return StreamSender(Path(spec[len("file:"):]))
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown sender spec: {spec!r}")
+    target = getattr(importlib.import_module(module_name), attr)
+    if isinstance(target, type) and issubclass(target, ReminderSender):
+        return target()
+    if isinstance(target, ReminderSender):
+        return target
+    if callable(target):
+        return _CallableSender(target)
+    raise TypeError(f"{spec!r} is not a sender")
+
+
+class _CallableSender(ReminderSender):
+    def __init__(self, func: Callable[[Sequence[Dict[str, Any]]], Any]) -> None:
+        self._func = func
+
+    def send(self, deliveries: Sequence[Dict[str, Any]]) -> None:
+        self._func(deliveries)
+
+
+def _build_delivery(reminder: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "delivery_key": f"{reminder['id']}:{reminder['next_trigger_at']}",
+        "reminder_id": reminder["id"],
+        "user_id": reminder["user_id"],
+        "email": reminder["email"],
+        "name": reminder["name"],
+        "channels": reminder["preferred_channels"],
+        "cadence": reminder["cadence"],
+        "trigger_at": reminder["next_trigger_at"],
+    }
+
+
+def dispatch_due_reminders(
+    sender: ReminderSender,
+    *,
+    now: Optional[datetime] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[str, int]:
+    """Send every reminder due at ``now`` and advance it to its next trigger.
+
+    Reminders are read in ``(next_trigger_epoch, id)`` batches.  Each batch
+    is sent first and marked second; a reminder whose trigger was changed by
+    someone else between the two steps is counted as ``skipped``.
+    """
+
+    now = now or datetime.now()
+    summary = {"due": 0, "sent": 0, "skipped": 0}
+    cursor = None
+    while True:
+        batch = database.fetch_due_reminders(now, limit=batch_size, after=cursor)
+        if not batch:
+            break
+        cursor = (batch[-1]["next_trigger_epoch"], batch[-1]["id"])
+        summary["due"] += len(batch)
+
+        sender.send([_build_delivery(reminder) for reminder in batch])
+
+        updates = []
+        for reminder in batch:
+            reference = datetime.fromisoformat(reminder["next_trigger_at"])
+            next_trigger = calculate_next_reminder(
+                reference,
+                reminder["interval_days"],
+                _parse_reminder_time(reminder["reminder_time"]),
+                now=now,
+            )
+            updates.append((reminder["id"], reminder["next_trigger_at"], next_trigger))
+        marked = database.mark_reminders_sent(updates)
+        summary["sent"] += marked
+        summary["skipped"] += len(batch) - marked
+        if len(batch) < batch_size:
+            break
+    return summary
+
+
+def run(
+    sender: ReminderSender,
+    *,
+    interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    once: bool = False,
+) -> None:
+    """Poll for due reminders every ``interval`` seconds until interrupted."""
+
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                summary = dispatch_due_reminders(sender, batch_size=batch_size)
+            except Exception:
+                if once:
+                    raise
+                logger.exception("Reminder dispatch failed; retrying next poll")
+            else:
+                if summary["due"]:
+                    logger.info(
+                        "Dispatched reminders: due=%(due)d sent=%(sent)d skipped=%(skipped)d",
+                        summary,
+                    )
+            if once:
+                return
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        sender.close()
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    """Command line entry point (``python -m reminder_dispatcher``)."""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m reminder_dispatcher", description=main.__doc__)
+    parser.add_argument("--db", type=Path, default=None, help="SQLite file (default: data/app.db)")
+    parser.add_argument(
+        "--sender",
+        default="stdout",
+        help="stdout, file:PATH or module:attr (default: stdout)",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL_SECONDS)
+    parser.add_argument("--once", action="store_true", help="Dispatch once and exit.")
+    args = parser.parse_args(None if argv is None else list(argv))
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.db is not None:
+        database.DB_PATH = args.db
+    database.initialize_database()
+
+    run(
+        load_sender(args.sender),
+        interval=args.interval,
+        batch_size=args.batch_size,
+        once=args.once,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,288 @@
+"""Re-score recorded answers with the current scoring rubric.
+
+Tuning ``scoring.EVALUATION_AXES``, question keywords or model answers leaves
+the scores stored in ``attempt_answers`` stale.  This module streams every
+recorded answer in id order, scores the batches on a process pool and writes
+scores, feedback, keyword hits and scoring logs back in one transaction per
+batch together with a checkpoint, so an interrupted run resumes after the
+last written batch.  Per-user and global question statistics are rebuilt once
+at the end.
+
+    python -m rescoring                  # re-score everything (resumes if interrupted)
+    python -m rescoring --dry-run        # report how scores would shift, write nothing
+    python -m rescoring --restart --workers 8
+"""
+from __future__ import annotations
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+import hashlib
+import json
+import logging
+from pathlib import Path
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import database
+import scoring
+from scoring import QuestionSpec
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_CHUNK_SIZE = 250
+
+_WORKER_SPECS: Dict[int, QuestionSpec] = {}
+
+
+def load_question_specs() -> Dict[int, QuestionSpec]:
+    """Return the current scoring spec of every stored question keyed by id."""
+
+    specs: Dict[int, QuestionSpec] = {}
+    for problem in database.list_problems():
+        detail = database.fetch_problem(problem["id"])
+        if not detail:
+            continue
+        for question in detail.get("questions", []):
+            specs[question["id"]] = QuestionSpec(
+                id=question["id"],
+                prompt=question["prompt"],
+                max_score=question["max_score"],
+                model_answer=question["model_answer"],
+                keywords=list(question["keywords"]),
+            )
+    return specs
+
+
+def run_fingerprint(specs: Dict[int, QuestionSpec]) -> str:
+    """Fingerprint of the rubric plus every question spec a run scores against."""
+
+    payload = json.dumps(
+        [
+            scoring.rubric_version(),
+            [
+                [spec.id, spec.max_score, spec.model_answer, list(spec.keywords)]
+                for _, spec in sorted(specs.items())
+            ],
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _init_worker(specs: Dict[int, QuestionSpec]) -> None:
+    global _WORKER_SPECS
+    _WORKER_SPECS = specs
+
+
+def _score_rows(rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Score one chunk of answer rows inside a worker process."""
+
+    rows = [row for row in rows if row["question_id"] in _WORKER_SPECS]
+    results = scoring.score_answers_batch(
+        [row["answer_text"] or "" for row in rows],
+        [_WORKER_SPECS[row["question_id"]] for row in rows],
+    )
+    return [
+        {
+            "answer_id": row["id"],
+            "attempt_id": row["attempt_id"],
+            "question_id": row["question_id"],
+            "max_score": row["max_score"],
+            "previous_score": row["score"],
+            "score": result.score,
+            "feedback": result.feedback,
+            "keyword_hits": result.keyword_hits,
+            "axis_breakdown": result.axis_breakdown,
+        }
+        for row, result in zip(rows, results)
+    ]
+
+
+class ScoreShift:
+    """Summary of how re-scoring moved the stored score ratios."""
+
+    BANDS = 10
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.changed = 0
+        self.raised = 0
+        self.lowered = 0
+        self.before_total = 0.0
+        self.after_total = 0.0
+        self.before_bands = [0] * self.BANDS
+        self.after_bands = [0] * self.BANDS
+
+    def _band(self, ratio: float) -> int:
+        return min(self.BANDS - 1, max(0, int(ratio * self.BANDS)))
+
+    def observe(self, results: Iterable[Dict[str, Any]]) -> None:
+        for result in results:
+            max_score = result["max_score"] or 0
+            if not max_score:
+                continue
+            before = (result["previous_score"] or 0.0) / max_score
+            after = (result["score"] or 0.0) / max_score
+            self.count += 1
+            self.before_total += before
+            self.after_total += after
+            self.before_bands[self._band(before)] += 1
+            self.after_bands[self._band(after)] += 1
+            if result["score"] != result["previous_score"]:
+                self.changed += 1
+                if (result["score"] or 0.0) > (result["previous_score"] or 0.0):
+                    self.raised += 1
+                else:
+                    self.lowered += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        mean_before = self.before_total / self.count if self.count else 0.0
+        mean_after = self.after_total / self.count if self.count else 0.0
+        return {
+            "answers": self.count,
+            "changed": self.changed,
+            "raised": self.raised,
+            "lowered": self.lowered,
+            "mean_ratio_before": round(mean_before, 4),
+            "mean_ratio_after": round(mean_after, 4),
+            "bands": [
+                {
+                    "range": f"{index / self.BANDS:.1f}-{(index + 1) / self.BANDS:.1f}",
+                    "before": before,
+                    "after": after,
+                }
+                for index, (before, after) in enumerate(zip(self.before_bands, self.after_bands))
+            ],
+        }
+
+    def format(self) -> str:
+        data = self.as_dict()
+        lines = [
+            f"answers: {data['answers']}  changed: {data['changed']} "
+            f"(raised {data['raised']} / lowered {data['lowered']})",
+            f"mean score ratio: {data['mean_ratio_before']:.3f} -> {data['mean_ratio_after']:.3f} "
+            f"({data['mean_ratio_after'] - data['mean_ratio_before']:+.3f})",
+            f"{'ratio':<10}{'before':>10}{'after':>10}",
+        ]
+        for band in data["bands"]:
+            lines.append(f"{band['range']:<10}{band['before']:>10}{band['after']:>10}")
+        return "\n".join(lines)
+
+
+def rescore_answers(
+    *,
+    workers: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dry_run: bool = False,
+    restart: bool = False,
+) -> ScoreShift:
+    """Re-score every recorded answer and return how the scores shifted.
+
+    The next batch is read and handed to the pool while the previous one is
+    being written.  A checkpoint is only resumed when it was written for the
+    same rubric and question specs; otherwise the run starts over.
+    """
+
+    specs = load_question_specs()
+    fingerprint = run_fingerprint(specs)
+    after_id = 0
+    processed = 0
+    if not dry_run and not restart:
+        checkpoint = database.get_rescoring_checkpoint()
+        if checkpoint and checkpoint.get("fingerprint") == fingerprint:
+            after_id = int(checkpoint.get("last_answer_id") or 0)
+            processed = int(checkpoint.get("processed") or 0)
+            logger.info("Resuming re-scoring after answer %s (%s already written)", after_id, processed)
+        elif checkpoint:
+            logger.info("Rubric changed since the stored checkpoint; starting over")
+
+    shift = ScoreShift()
+    started = time.monotonic()
+    started_at = datetime.utcnow().isoformat()
+
+    def finish(batch: Tuple[List[Future], int]) -> None:
+        nonlocal processed
+        futures, last_id = batch
+        results = [result for future in futures for result in future.result()]
+        shift.observe(results)
+        processed += len(results)
+        if not dry_run:
+            database.apply_rescored_answers(
+                results,
+                checkpoint={
+                    "fingerprint": fingerprint,
+                    "last_answer_id": last_id,
+                    "processed": processed,
+                    "started_at": started_at,
+                },
+            )
+        elapsed = time.monotonic() - started
+        logger.info(
+            "%s %s answers (last id %s, %.0f/s)",
+            "Scored" if dry_run else "Re-scored",
+            processed,
+            last_id,
+            shift.count / elapsed if elapsed else 0.0,
+        )
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(specs,)) as pool:
+        in_flight: Optional[Tuple[List[Future], int]] = None
+        while True:
+            rows = database.fetch_answers_for_rescoring(after_id, limit=batch_size)
+            submitted = None
+            if rows:
+                after_id = rows[-1]["id"]
+                submitted = (
+                    [
+                        pool.submit(_score_rows, rows[offset : offset + chunk_size])
+                        for offset in range(0, len(rows), chunk_size)
+                    ],
+                    after_id,
+                )
+            if in_flight is not None:
+                finish(in_flight)
+            in_flight = submitted
+            if in_flight is None:
+                break
+
+    if not dry_run:
+        database.rebuild_user_question_stats()
+        database.refresh_question_global_stats()
+        database.clear_rescoring_checkpoint()
+    return shift
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    """Command line entry point (``python -m rescoring``)."""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m rescoring", description=main.__doc__)
+    parser.add_argument("--db", type=Path, default=None, help="SQLite file (default: data/app.db)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Report the score shift without writing.")
+    parser.add_argument("--restart", action="store_true", help="Ignore a stored checkpoint.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args(None if argv is None else list(argv))
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.db is not None:
+        database.DB_PATH = args.db
+    database.initialize_database()
+
+    shift = rescore_answers(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        restart=args.restart,
+    )
+    print(json.dumps(shift.as_dict(), ensure_ascii=False, indent=2) if args.json else shift.format())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,13 +1,23 @@
 """Scoring utilities for the Streamlit application."""
 from __future__ import annotations
 
+from collections import Counter, OrderedDict
+from dataclasses import asdict, dataclass, field, replace
+from functools import lru_cache
+import hashlib
+import json
+import logging
 import math
+import os
+from pathlib import Path
 import re
-from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+import sqlite3
+from threading import Lock, local
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+import unicodedata
 
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -52,6 +62,38 @@ EVALUATION_AXES: List[Dict[str, object]] = [
 _AXIS_LOOKUP = {axis["label"]: axis for axis in EVALUATION_AXES}
 
 
+def _scoring_source_digest() -> str:
+    """Return a digest of this module's code so any edit changes the rubric."""
+
+    try:
+        source = Path(__file__).read_bytes()
+    except OSError:
+        logger.warning("Could not read %s; rubric_version() ignores code changes", __file__)
+        return ""
+    return hashlib.sha1(source).hexdigest()
+
+
+# Digest of the scoring code itself.  score_answer's heuristics live in code,
+# so rubric_version() folds this in and cached or stored scores produced by an
+# older scoring.py stop matching as soon as the file changes.
+SCORING_SOURCE_DIGEST = _scoring_source_digest()
+
+# Japanese answers have no word boundaries, so the similarity axis compares
+# overlapping character n-grams of these lengths instead of words.
+SIMILARITY_NGRAM_SIZES = (2, 3)
+
+# Model answer vectors kept by the similarity index.
+SIMILARITY_INDEX_MAX_ENTRIES = 1024
+
+# Compiled keyword automata kept for reuse (one per distinct keyword set).
+KEYWORD_AUTOMATON_MAX_ENTRIES = 512
+
+# Score results kept in process by the score cache, and the rows kept by its
+# optional shared SQLite tier (see configure_score_cache).
+SCORE_CACHE_MAX_ENTRIES = 4096
+SCORE_CACHE_SQLITE_MAX_ROWS = 200_000
+
+
 CAUSAL_CONNECTORS: List[str] = [
     "ため",
     "ので",
@@ -90,30 +132,190 @@ class BundleEvaluation:
     recommendations: List[str]
 
 
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds many literal patterns in one pass.
+
+    Failure links are folded into each state's transition table, so scanning
+    costs one dictionary lookup per character regardless of how many patterns
+    were compiled.  Use :func:`keyword_automaton` to share automata between
+    calls.
+    """
+
+    __slots__ = ("patterns", "_transitions", "_output", "_lengths")
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns: Tuple[str, ...] = tuple(dict.fromkeys(pattern for pattern in patterns if pattern))
+        children: List[Dict[str, int]] = [{}]
+        output: List[Tuple[int, ...]] = [()]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = children[state].get(char)
+                if next_state is None:
+                    next_state = len(children)
+                    children[state][char] = next_state
+                    children.append({})
+                    output.append(())
+                state = next_state
+            output[state] += (index,)
+
+        delta: List[Dict[str, int]] = [dict() for _ in children]
+        delta[0] = dict(children[0])
+        fail = [0] * len(children)
+        queue = list(children[0].values())
+        for state in queue:
+            for char, child in children[state].items():
+                fail[child] = delta[fail[state]].get(char, 0) if state else 0
+                output[child] += output[fail[child]]
+                queue.append(child)
+            if state:
+                delta[state] = {**delta[fail[state]], **children[state]}
+        self._transitions = [table.get for table in delta]
+        self._output = output
+        self._lengths = [len(pattern) for pattern in self.patterns]
+
+    def finditer(self, text: str) -> Iterable[Tuple[int, str]]:
+        """Yield ``(start, pattern)`` for every occurrence, ordered by end position."""
+
+        transitions = self._transitions
+        output = self._output
+        patterns = self.patterns
+        state = 0
+        for position, char in enumerate(text):
+            state = transitions[state](char, 0)
+            for index in output[state]:
+                pattern = patterns[index]
+                yield position - len(pattern) + 1, pattern
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Return non-overlapping occurrence counts per pattern (``str.count`` semantics)."""
+
+        transitions = self._transitions
+        output = self._output
+        lengths = self._lengths
+        counts = [0] * len(self.patterns)
+        next_start = [0] * len(self.patterns)
+        state = 0
+        for position, char in enumerate(text):
+            state = transitions[state](char, 0)
+            for index in output[state]:
+                start = position - lengths[index] + 1
+                if start >= next_start[index]:
+                    counts[index] += 1
+                    next_start[index] = position + 1
+        return {pattern: count for pattern, count in zip(self.patterns, counts) if count}
+
+    def present(self, text: str) -> set[str]:
+        """Return the set of patterns that occur in ``text``."""
+
+        transitions = self._transitions
+        output = self._output
+        found: set[int] = set()
+        state = 0
+        for char in text:
+            state = transitions[state](char, 0)
+            if output[state]:
+                found.update(output[state])
+        return {self.patterns[index] for index in found}
+
+
+@lru_cache(maxsize=KEYWORD_AUTOMATON_MAX_ENTRIES)
+def keyword_automaton(patterns: Tuple[str, ...]) -> KeywordAutomaton:
+    """Return the cached automaton for ``patterns``."""
+
+    return KeywordAutomaton(patterns)
+
+
+@lru_cache(maxsize=KEYWORD_AUTOMATON_MAX_ENTRIES)
+def _keyword_matcher(keywords: Tuple[str, ...]) -> Tuple[Tuple[Tuple[str, str], ...], KeywordAutomaton]:
+    """Return ``(keyword, normalised keyword)`` pairs and their automaton."""
+
+    normalized = tuple((keyword, _normalize(keyword)) for keyword in keywords)
+    return normalized, KeywordAutomaton(pattern for _, pattern in normalized)
+
+
+def _rubric_fingerprint() -> str:
+    payload = json.dumps(
+        [
+            SCORING_SOURCE_DIGEST,
+            EVALUATION_AXES,
+            CAUSAL_CONNECTORS,
+            list(SIMILARITY_NGRAM_SIZES),
+        ],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+# Every input of the fingerprint is a module constant, so it is computed once.
+_RUBRIC_VERSION = _rubric_fingerprint()
+
+
+def rubric_version() -> str:
+    """Return a short fingerprint of the rubric :func:`score_answer` applies.
+
+    Covers the scoring code, the axis weights, the connector list and the
+    similarity settings; scores stored under a different fingerprint are stale.
+    """
+
+    return _RUBRIC_VERSION
+
+
 def keyword_match_score(answer: str, keywords: Iterable[str]) -> Dict[str, bool]:
     """Return a dictionary showing whether each keyword appears in the answer."""
-    hits: Dict[str, bool] = {}
-    normalized_answer = _normalize(answer)
-    for keyword in keywords:
-        pattern = _normalize(keyword)
-        hits[keyword] = pattern in normalized_answer
-    return hits
+    return _keyword_hits(_normalize(answer), keywords)
+
+
+def _keyword_hits(normalized_answer: str, keywords: Iterable[str]) -> Dict[str, bool]:
+    return _match_keywords(normalized_answer, _keyword_matcher(tuple(keywords)))
+
+
+def _match_keywords(
+    normalized_answer: str,
+    matcher: Tuple[Tuple[Tuple[str, str], ...], KeywordAutomaton],
+) -> Dict[str, bool]:
+    normalized, automaton = matcher
+    found = automaton.present(normalized_answer)
+    # An empty keyword trivially "appears", as with a substring test.
+    return {keyword: not pattern or pattern in found for keyword, pattern in normalized}
 
 
 def cosine_similarity_score(answer: str, reference: str) -> float:
-    """Compute cosine similarity between the answer and the model reference."""
-    vectorizer = TfidfVectorizer(stop_words=None)
-    try:
-        tfidf = vectorizer.fit_transform([reference, answer])
-    except ValueError:
-        return 0.0
-    matrix = tfidf.toarray()
-    ref_vec, ans_vec = matrix[0], matrix[1]
-    numerator = float(np.dot(ref_vec, ans_vec))
-    denominator = float(np.linalg.norm(ref_vec) * np.linalg.norm(ans_vec))
-    if denominator == 0:
-        return 0.0
-    return numerator / denominator
+    """Compute cosine similarity between the answer and the model reference.
+
+    Both texts are compared as sublinear-TF vectors of character n-grams.  The
+    reference vector comes from the similarity index, so repeated scoring
+    against the same model answer only vectorises the answer.
+    """
+    return _vector_cosine(_char_ngram_vector(answer), _model_answer_vector(reference))
+
+
+def _char_ngram_vector(text: str) -> Dict[str, float]:
+    """Return the L2-normalised character n-gram vector of ``text``."""
+
+    text = _WHITESPACE_PATTERN.sub("", unicodedata.normalize("NFKC", text or "").lower())
+    counts: Counter[str] = Counter()
+    for size in SIMILARITY_NGRAM_SIZES:
+        counts.update(text[start : start + size] for start in range(len(text) - size + 1))
+    weights = {gram: 1.0 + math.log(count) for gram, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    if not norm:
+        return {}
+    return {gram: weight / norm for gram, weight in weights.items()}
+
+
+@lru_cache(maxsize=SIMILARITY_INDEX_MAX_ENTRIES)
+def _model_answer_vector(reference: str) -> Dict[str, float]:
+    """Similarity index entry: the cached n-gram vector of one model answer."""
+
+    return _char_ngram_vector(reference)
+
+
+def _vector_cosine(left: Mapping[str, float], right: Mapping[str, float]) -> float:
+    if len(left) > len(right):
+        left, right = right, left
+    return float(sum(weight * right.get(gram, 0.0) for gram, weight in left.items()))
 
 
 def analyze_causal_connectors(answer: str) -> Dict[str, object]:
@@ -121,13 +323,9 @@ def analyze_causal_connectors(answer: str) -> Dict[str, object]:
 
     sentences = [segment for segment in re.split(r"[。\.!?！？]\s*", answer) if segment.strip()]
     sentence_count = max(len(sentences), 1)
-    connector_counts: Dict[str, int] = {}
-    total_hits = 0
-    for connector in CAUSAL_CONNECTORS:
-        count = answer.count(connector)
-        if count:
-            connector_counts[connector] = count
-            total_hits += count
+    found = keyword_automaton(tuple(CAUSAL_CONNECTORS)).counts(answer)
+    connector_counts = {connector: found[connector] for connector in CAUSAL_CONNECTORS if connector in found}
+    total_hits = sum(connector_counts.values())
     connector_ratio = total_hits / sentence_count if sentence_count else 0.0
     return {
         "total_hits": total_hits,
@@ -161,21 +359,375 @@ def _estimate_clarity_score(answer: str) -> Dict[str, object]:
     return {"score": clarity_score, "detail": detail}
 
 
+class _ScoreCache:
+    """Content-addressed cache of :class:`ScoreResult` objects.
+
+    Keys are ``(question id, answer hash, rubric version, question hash)``.
+    The answer hash covers the stripped answer exactly as :func:`score_answer`
+    scores it, and the question hash covers the model answer, keywords and
+    max score, so editing a question, the rubric or the scoring code changes
+    the key instead of serving a stale score.  The first store under a new
+    question hash also drops the entries left for the old one, and attaching
+    the SQLite tier drops rows left by another rubric version.
+
+    An optional SQLite file sits behind the in-process LRU so worker
+    processes share results.  Its failures are logged and count as misses;
+    the cache never makes scoring fail.  Cached results share their nested
+    dicts and must be treated as read-only.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS score_cache (
+            question_id INTEGER NOT NULL,
+            answer_hash TEXT NOT NULL,
+            rubric_version TEXT NOT NULL,
+            question_hash TEXT NOT NULL,
+            result TEXT NOT NULL,
+            UNIQUE (question_id, answer_hash, rubric_version, question_hash)
+        )
+    """
+    _PRUNE_EVERY = 1000
+
+    def __init__(self, *, max_entries: int, sqlite_max_rows: int) -> None:
+        self.max_entries = max_entries
+        self.sqlite_max_rows = sqlite_max_rows
+        self._lock = Lock()
+        self._entries: "OrderedDict[Tuple[int, str, str, str], ScoreResult]" = OrderedDict()
+        self._question_hashes: Dict[int, Tuple[str, str]] = {}
+        self._sqlite_path: Optional[str] = None
+        self._local = local()
+        self._stores_since_prune = 0
+        self._stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "sqlite_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "sqlite_errors": 0,
+        }
+
+    def configure(
+        self, *, max_entries: Optional[int], sqlite_path: Union[str, Path, None, bool]
+    ) -> None:
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max(0, max_entries)
+                self._evict()
+            path = None
+            if sqlite_path is not False:
+                requested = str(sqlite_path) if sqlite_path else None
+                if requested != self._sqlite_path:
+                    self._sqlite_path = path = requested
+        if path is not None:
+            # Rows written under another rubric can never match again; drop
+            # them when the file is attached, not on every configure call.
+            try:
+                self._connection(path).execute(
+                    "DELETE FROM score_cache WHERE rubric_version <> ?", (rubric_version(),)
+                )
+            except sqlite3.Error as exc:
+                self._sqlite_failed("purge", exc)
+
+    @staticmethod
+    def question_hash(question: QuestionSpec) -> str:
+        question_payload = json.dumps(
+            [question.model_answer, list(question.keywords), question.max_score],
+            ensure_ascii=False,
+        )
+        return hashlib.sha1(question_payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def key(
+        cls,
+        answer: str,
+        question: QuestionSpec,
+        version: str,
+        question_hash: Optional[str] = None,
+    ) -> Tuple[int, str, str, str]:
+        return (
+            question.id if question.id is not None else 0,
+            hashlib.sha1(answer.encode("utf-8")).hexdigest(),
+            version,
+            question_hash if question_hash is not None else cls.question_hash(question),
+        )
+
+    def get(self, key: Tuple[int, str, str, str]) -> Optional[ScoreResult]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return replace(result)
+            path = self._sqlite_path
+
+        if path is not None:
+            result = self._sqlite_get(path, key)
+            if result is not None:
+                with self._lock:
+                    self._stats["sqlite_hits"] += 1
+                    self._remember(key, result)
+                return replace(result)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key: Tuple[int, str, str, str], result: ScoreResult) -> None:
+        with self._lock:
+            question_changed = self._remember(key, result)
+            self._stats["stores"] += 1
+            path = self._sqlite_path
+        if path is not None:
+            self._sqlite_put(path, key, result, purge_question=question_changed)
+
+    def _remember(self, key: Tuple[int, str, str, str], result: ScoreResult) -> bool:
+        """Store ``result`` in memory; return True when its question hash is new."""
+
+        question_id, _answer_hash, version, question_hash = key
+        current = self._question_hashes.get(question_id)
+        question_changed = current != (version, question_hash)
+        if question_changed:
+            if current is not None:
+                stale = [cached for cached in self._entries if cached[0] == question_id]
+                for cached in stale:
+                    del self._entries[cached]
+                self._stats["invalidations"] += 1
+            self._question_hashes[question_id] = (version, question_hash)
+        if self.max_entries:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            self._evict()
+        return question_changed
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _connection(self, path: str) -> sqlite3.Connection:
+        state = self._local
+        if getattr(state, "key", None) == (path, os.getpid()):
+            return state.conn
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(self._SCHEMA)
+        state.conn = conn
+        state.key = (path, os.getpid())
+        return conn
+
+    def _sqlite_failed(self, action: str, exc: sqlite3.Error) -> None:
+        logger.warning("Score cache %s failed: %s", action, exc)
+        with self._lock:
+            self._stats["sqlite_errors"] += 1
+
+    def _sqlite_get(self, path: str, key: Tuple[int, str, str, str]) -> Optional[ScoreResult]:
+        try:
+            row = self._connection(path).execute(
+                """
+                SELECT result FROM score_cache
+                WHERE question_id = ? AND answer_hash = ? AND rubric_version = ? AND question_hash = ?
+                """,
+                key,
+            ).fetchone()
+        except sqlite3.Error as exc:
+            self._sqlite_failed("lookup", exc)
+            return None
+        return ScoreResult(**json.loads(row[0])) if row else None
+
+    def _sqlite_put(
+        self,
+        path: str,
+        key: Tuple[int, str, str, str],
+        result: ScoreResult,
+        *,
+        purge_question: bool,
+    ) -> None:
+        with self._lock:
+            self._stores_since_prune += 1
+            prune = self._stores_since_prune >= self._PRUNE_EVERY
+            if prune:
+                self._stores_since_prune = 0
+        try:
+            conn = self._connection(path)
+            if purge_question:
+                conn.execute(
+                    """
+                    DELETE FROM score_cache
+                    WHERE question_id = ? AND (rubric_version <> ? OR question_hash <> ?)
+                    """,
+                    (key[0], key[2], key[3]),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO score_cache VALUES (?, ?, ?, ?, ?)",
+                (*key, json.dumps(asdict(result), ensure_ascii=False)),
+            )
+            if prune:
+                conn.execute(
+                    "DELETE FROM score_cache WHERE rowid <= (SELECT MAX(rowid) FROM score_cache) - ?",
+                    (self.sqlite_max_rows,),
+                )
+        except sqlite3.Error as exc:
+            self._sqlite_failed("store", exc)
+
+    def clear(self, *, shared: bool = False) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._question_hashes.clear()
+            path = self._sqlite_path
+        if shared and path is not None:
+            try:
+                self._connection(path).execute("DELETE FROM score_cache")
+            except sqlite3.Error as exc:
+                self._sqlite_failed("clear", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot: Dict[str, Any] = dict(self._stats)
+            snapshot.update(
+                {
+                    "entries": len(self._entries),
+                    "max_entries": self.max_entries,
+                    "sqlite_path": self._sqlite_path,
+                }
+            )
+        lookups = snapshot["memory_hits"] + snapshot["sqlite_hits"] + snapshot["misses"]
+        hits = snapshot["memory_hits"] + snapshot["sqlite_hits"]
+        snapshot["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return snapshot
+
+
+_SCORE_CACHE = _ScoreCache(
+    max_entries=SCORE_CACHE_MAX_ENTRIES, sqlite_max_rows=SCORE_CACHE_SQLITE_MAX_ROWS
+)
+
+
+def configure_score_cache(
+    *,
+    max_entries: Optional[int] = None,
+    sqlite_path: Union[str, Path, None, bool] = False,
+) -> None:
+    """Resize the score cache or attach/detach its shared SQLite tier.
+
+    ``sqlite_path`` names a cache file shared by every process that
+    configures the same path; ``None`` detaches it and the default leaves it
+    unchanged.  ``max_entries=0`` disables the in-process tier.  Passing the
+    path that is already attached does nothing, so Streamlit can call this
+    on every rerun.
+    """
+
+    _SCORE_CACHE.configure(max_entries=max_entries, sqlite_path=sqlite_path)
+
+
+def clear_score_cache(*, shared: bool = False) -> None:
+    """Drop cached score results; ``shared=True`` empties the SQLite tier too."""
+
+    _SCORE_CACHE.clear(shared=shared)
+
+
+def get_score_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters and the hit rate of the score cache."""
+
+    return _SCORE_CACHE.stats()
+
+
 def score_answer(answer: str, question: QuestionSpec) -> ScoreResult:
     """Score a single answer using heuristics that mimic the AI workflow."""
     answer = answer.strip()
     if not answer:
-        return ScoreResult(
-            score=0.0,
-            feedback="回答が入力されていません。",
-            keyword_hits={},
-            axis_breakdown={},
-        )
+        return _empty_score_result()
+    key = _SCORE_CACHE.key(answer, question, rubric_version())
+    cached = _SCORE_CACHE.get(key)
+    if cached is not None:
+        return cached
+    result = _score_prepared(answer, _normalize(answer), _char_ngram_vector(answer), question)
+    _SCORE_CACHE.put(key, result)
+    return result
+
+
+def score_answers_batch(
+    answers: Sequence[str], specs: Sequence[QuestionSpec]
+) -> List[ScoreResult]:
+    """Score a whole submission (one case or a mock exam) in a single pass.
+
+    ``answers[i]`` is scored against ``specs[i]`` and the results equal those
+    of :func:`score_answer`.  Work is shared across the batch: each distinct
+    answer text is normalised and vectorised once, and each distinct question
+    has its cache hash, keyword matcher and model answer vector resolved once
+    however many answers are scored against it.  Answers already scored
+    against the same question come from the score cache.
+    """
+    if len(answers) != len(specs):
+        raise ValueError("answers and specs must have the same length")
+
+    version = rubric_version()
+    prepared: Dict[str, Tuple[str, Dict[str, float]]] = {}
+    question_features: Dict[Tuple[Any, ...], Tuple[str, _QuestionFeatures]] = {}
+    results: List[ScoreResult] = []
+    for answer, spec in zip(answers, specs):
+        text = answer.strip()
+        if not text:
+            results.append(_empty_score_result())
+            continue
+        spec_key = (spec.model_answer, tuple(spec.keywords), spec.max_score)
+        spec_entry = question_features.get(spec_key)
+        if spec_entry is None:
+            spec_entry = question_features[spec_key] = (
+                _ScoreCache.question_hash(spec),
+                _question_features(spec),
+            )
+        key = _SCORE_CACHE.key(text, spec, version, spec_entry[0])
+        cached = _SCORE_CACHE.get(key)
+        if cached is not None:
+            results.append(cached)
+            continue
+        features = prepared.get(text)
+        if features is None:
+            features = prepared[text] = (_normalize(text), _char_ngram_vector(text))
+        result = _score_prepared(text, features[0], features[1], spec, spec_entry[1])
+        _SCORE_CACHE.put(key, result)
+        results.append(result)
+    return results
+
+
+def _empty_score_result() -> ScoreResult:
+    return ScoreResult(
+        score=0.0,
+        feedback="回答が入力されていません。",
+        keyword_hits={},
+        axis_breakdown={},
+    )
 
-    keyword_hits = keyword_match_score(answer, question.keywords)
+
+# Per-question scoring inputs: the keyword matcher and the model answer vector.
+_QuestionFeatures = Tuple[
+    Tuple[Tuple[Tuple[str, str], ...], KeywordAutomaton], Dict[str, float]
+]
+
+
+def _question_features(question: QuestionSpec) -> _QuestionFeatures:
+    return (
+        _keyword_matcher(tuple(question.keywords)),
+        _model_answer_vector(question.model_answer),
+    )
+
+
+def _score_prepared(
+    answer: str,
+    normalized_answer: str,
+    answer_vector: Mapping[str, float],
+    question: QuestionSpec,
+    question_features: Optional[_QuestionFeatures] = None,
+) -> ScoreResult:
+    if question_features is None:
+        question_features = _question_features(question)
+    matcher, model_vector = question_features
+    keyword_hits = _match_keywords(normalized_answer, matcher)
     keyword_ratio = sum(keyword_hits.values()) / max(len(keyword_hits), 1)
 
-    similarity = cosine_similarity_score(answer, question.model_answer)
+    similarity = _vector_cosine(answer_vector, model_vector)
 
     logic_axis = _estimate_logic_score(answer, similarity)
     clarity_axis = _estimate_clarity_score(answer)
@@ -331,69 +883,77 @@ def evaluate_case_bundle(
     return None
 
 
+_CASE2_TARGET_KEYWORDS: Tuple[str, ...] = (
+    "ターゲット",
+    "顧客",
+    "客層",
+    "既存",
+    "新規",
+    "リピーター",
+    "ファミリー",
+    "シニア",
+    "訪日",
+    "観光客",
+    "法人",
+    "若年",
+)
+_CASE2_ACTION_VERBS: Tuple[str, ...] = (
+    "強化",
+    "拡大",
+    "導入",
+    "実施",
+    "構築",
+    "連携",
+    "提携",
+    "活用",
+    "展開",
+    "運用",
+    "改善",
+    "最適化",
+    "設計",
+    "企画",
+    "実装",
+    "訴求",
+    "提供",
+    "育成",
+)
+_CASE2_CHANNEL_TERMS: Tuple[str, ...] = (
+    "SNS",
+    "EC",
+    "OMO",
+    "イベント",
+    "キャンペーン",
+    "アプリ",
+    "会員",
+    "サブスク",
+    "メール",
+    "DM",
+    "LINE",
+    "コミュニティ",
+    "レビュー",
+)
+
+
 def _evaluate_case2_bundle(answers: Sequence[Mapping[str, object]]) -> Optional[BundleEvaluation]:
     texts = [str(answer.get("answer_text", "")).strip() for answer in answers]
     texts = [text for text in texts if text]
     if not texts:
         return None
 
-    target_keywords = [
-        "ターゲット",
-        "顧客",
-        "客層",
-        "既存",
-        "新規",
-        "リピーター",
-        "ファミリー",
-        "シニア",
-        "訪日",
-        "観光客",
-        "法人",
-        "若年",
-    ]
-    action_verbs = [
-        "強化",
-        "拡大",
-        "導入",
-        "実施",
-        "構築",
-        "連携",
-        "提携",
-        "活用",
-        "展開",
-        "運用",
-        "改善",
-        "最適化",
-        "設計",
-        "企画",
-        "実装",
-        "訴求",
-        "提供",
-        "育成",
-    ]
-    channel_terms = [
-        "SNS",
-        "EC",
-        "OMO",
-        "イベント",
-        "キャンペーン",
-        "アプリ",
-        "会員",
-        "サブスク",
-        "メール",
-        "DM",
-        "LINE",
-        "コミュニティ",
-        "レビュー",
-    ]
+    # One scan per text finds every rubric term; the ratios below work on the
+    # matched sets.
+    automaton = keyword_automaton(
+        _CASE2_TARGET_KEYWORDS + _CASE2_ACTION_VERBS + _CASE2_CHANNEL_TERMS
+    )
+    matches = [automaton.present(text) for text in texts]
 
-    target_coverage = _coverage_ratio(texts, target_keywords)
+    target_coverage = _coverage_ratio(matches, _CASE2_TARGET_KEYWORDS)
     segment_ratio = _segment_pattern_ratio(texts)
-    target_variety = _variety_ratio(texts, target_keywords, baseline=4)
+    target_variety = _variety_ratio(matches, _CASE2_TARGET_KEYWORDS, baseline=4)
     target_score = min(1.0, 0.6 * target_coverage + 0.25 * segment_ratio + 0.15 * target_variety)
 
-    verb_density = _density_score(texts, action_verbs)
-    channel_density = _density_score(texts, channel_terms)
+    verb_density = _density_score(matches, _CASE2_ACTION_VERBS)
+    channel_density = _density_score(matches, _CASE2_CHANNEL_TERMS)
     numeric_ratio = _numeric_presence_ratio(texts)
     specificity_score = min(1.0, 0.45 * verb_density + 0.3 * channel_density + 0.25 * numeric_ratio)
 
@@ -458,14 +1018,11 @@ def _evaluate_case2_bundle(answers: Sequence[Mapping[str, object]]) -> Optional[
     )
 
 
-def _coverage_ratio(texts: Sequence[str], keywords: Sequence[str]) -> float:
-    if not texts:
+def _coverage_ratio(matches: Sequence[set[str]], keywords: Sequence[str]) -> float:
+    if not matches:
         return 0.0
-    hits = 0
-    for text in texts:
-        if any(keyword in text for keyword in keywords):
-            hits += 1
-    return hits / len(texts)
+    hits = sum(1 for found in matches if not found.isdisjoint(keywords))
+    return hits / len(matches)
 
 
 def _segment_pattern_ratio(texts: Sequence[str]) -> float:
@@ -476,26 +1033,20 @@ def _segment_pattern_ratio(texts: Sequence[str]) -> float:
     return hits / len(texts)
 
 
-def _variety_ratio(texts: Sequence[str], keywords: Sequence[str], *, baseline: int) -> float:
-    if not texts:
+def _variety_ratio(matches: Sequence[set[str]], keywords: Sequence[str], *, baseline: int) -> float:
+    if not matches:
         return 0.0
-    unique: set[str] = set()
-    for text in texts:
-        for keyword in keywords:
-            if keyword in text:
-                unique.add(keyword)
+    unique = set(keywords).intersection(set().union(*matches))
     if not unique:
         return 0.0
     return min(1.0, len(unique) / max(baseline, 1))
 
 
-def _density_score(texts: Sequence[str], keywords: Sequence[str]) -> float:
-    if not texts:
+def _density_score(matches: Sequence[set[str]], keywords: Sequence[str]) -> float:
+    if not matches:
         return 0.0
-    total_hits = 0
-    for text in texts:
-        total_hits += sum(1 for keyword in keywords if keyword in text)
-    average_hits = total_hits / len(texts)
+    total_hits = sum(len(found.intersection(keywords)) for found in matches)
+    average_hits = total_hits / len(matches)
     return min(1.0, average_hits / 2)
 
 
@@ -547,6 +1098,9 @@ def _recommendations_from_criteria(criteria: Sequence[CriterionInsight]) -> List
     return recommendations
 
 
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
 def _normalize(text: str) -> str:
     text = text.lower()
     text = re.sub(r"\s+", "", text)